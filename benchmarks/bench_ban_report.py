@@ -0,0 +1,139 @@
+"""
+Ban report: SQL scan + format vs the rolling in-memory window.
+
+  python -m benchmarks.bench_ban_report [--bans 5000] [--days 30] [--reports 200]
+
+before: build_ban_report_last24h as it was (query bans_log, format every row)
+after:  utils.ban_report.BanReportWindow.render (newest rows only, up to limit)
+
+Also checks that
+- both produce the same report text at several points in time
+- the report query is answered from idx_bans_log_type_started
+  (EXPLAIN QUERY PLAN must show the index and no full table scan / temp b-tree)
+and exits with status 1 if not.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+from utils.ban_report import BanReportWindow, REPORT_QUERY, fmt_secs
+from utils.state_db import db_init
+
+
+def _legacy_report(con, now_unix: int, limit: int = 15) -> str:
+    """build_ban_report_last24h before the window (same query, all rows fetched and walked)."""
+    rows = con.execute(REPORT_QUERY, (int(now_unix) - 86400,)).fetchall()
+    if not rows:
+        return "Bans letzte 24h (Bot-Log):\n- (keine)"
+    lines = ["Bans letzte 24h (Bot-Log):"]
+    shown = 0
+    for (_, label, started, dur, due, unbanned) in rows:
+        if shown >= limit:
+            break
+        started = int(started)
+        if dur is None and due is None:
+            if unbanned:
+                line = f"- {label} — WAR gebannt {fmt_secs(int(unbanned) - started)}"
+            else:
+                line = f"- {label} — AKTIV PERM (seit {fmt_secs(now_unix - started)})"
+        else:
+            if unbanned:
+                line = f"- {label} — WAR gebannt {fmt_secs(int(unbanned) - started)}"
+            else:
+                if due and now_unix < int(due):
+                    line = f"- {label} — AKTIV REST {fmt_secs(int(due) - now_unix)} (seit {fmt_secs(now_unix - started)})"
+                elif due and now_unix >= int(due):
+                    line = f"- {label} — FÄLLIG seit {fmt_secs(now_unix - int(due))}"
+        lines.append(line)
+        shown += 1
+    return "\n".join(lines)
+
+
+def _fill(con, window: BanReportWindow, n: int, days: int, now: int, rnd: random.Random):
+    """Same writes as log_ban_event / mark_unbanned_in_log, mirrored into the window."""
+    start = now - days * 86400
+    with con.batch():
+        for i in range(n):
+            started = start + (i * days * 86400) // n + rnd.randrange(30)
+            started = min(started, now)
+            dur = rnd.choice((None, 300, 3600, 86400))
+            due = started + dur if dur else None
+            stype = "user" if rnd.random() < 0.95 else "ip"
+            bid = str(92090000 + i)
+            con.execute(
+                """
+                INSERT OR REPLACE INTO bans_log
+                (blacklist_id, thread_id, ban_cmd_post_id, target_post_id, subject_type, subject_label,
+                 started_at_unix, duration_secs, due_unix, unbanned_at_unix)
+                VALUES (?, 't1', 'c', 'p', ?, ?, ?, ?, ?, NULL)
+                """,
+                (bid, stype, f"User {i}", started, dur, due),
+            )
+            window.add(bid, stype, f"User {i}", started, dur, due)
+            if due and due < now and rnd.random() < 0.8:
+                unbanned = due + rnd.randrange(60)
+                con.execute("UPDATE bans_log SET unbanned_at_unix=? WHERE blacklist_id=?", (unbanned, bid))
+                window.mark_unbanned(bid, unbanned)
+
+
+def check_plan(con) -> tuple[bool, list[str]]:
+    plan = [row[-1] for row in con.execute("EXPLAIN QUERY PLAN " + REPORT_QUERY, (0,)).fetchall()]
+    text = " | ".join(plan)
+    ok = "idx_bans_log_type_started" in text and "SCAN bans_log" not in text.replace("USING INDEX", "") \
+        and "TEMP B-TREE" not in text
+    return ok, plan
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--bans", type=int, default=5000)
+    ap.add_argument("--days", type=int, default=30)
+    ap.add_argument("--reports", type=int, default=200)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    rnd = random.Random(args.seed)
+    now = int(time.time())
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        con = db_init(os.path.join(tmp, "state.db"))
+        live = BanReportWindow()
+        _fill(con, live, args.bans, args.days, now, rnd)
+
+        ok, plan = check_plan(con)
+        print("query plan: " + " | ".join(plan) + ("" if ok else "   <-- NOT INDEXED"))
+        failed |= not ok
+
+        loaded = BanReportWindow()
+        loaded.load(con, now)
+        for t in (now, now + 600, now + 3600, now + 43200):
+            expect = _legacy_report(con, t)
+            for name, window in (("live", live), ("loaded", loaded)):
+                if window.render(t) != expect:
+                    print(f"MISMATCH ({name} window) at now+{t - now}s:\n{window.render(t)}\n--- expected ---\n{expect}")
+                    failed = True
+
+        t0 = time.perf_counter()
+        for _ in range(args.reports):
+            _legacy_report(con, now)
+        before = (time.perf_counter() - t0) * 1e6 / args.reports
+
+        t0 = time.perf_counter()
+        for _ in range(args.reports):
+            live.render(now)
+        after = (time.perf_counter() - t0) * 1e6 / args.reports
+        rows_24h = len(con.execute(REPORT_QUERY, (now - 86400,)).fetchall())
+        con.close()
+
+    print(f"bans_log rows={args.bans} rows_24h={rows_24h} window={len(live)}")
+    print(f"before  {before:8.1f} us/report")
+    print(f"after   {after:8.1f} us/report")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Ban throughput (bans per minute) against the local Disqus stand-in.
+
+  uvicorn mock_api:app --port 8000
+  API_BASE=http://127.0.0.1:8000/api/3.0 DISQUS_FORUM=mockforum DISQUS_PUBLIC_KEY=x DISQUS_ACCESS_TOKEN=x \\
+      python -m benchmarks.bench_bans [--bans 50] [--threads 5] [--rounds 3]
+
+Every round posts --bans target comments plus one "ban" reply per target
+from a stand-in moderator, spread over --threads threads, then bans them:
+
+serial:   the old per-command flow, one ban after the other
+          (posts/details, banPostAuthor, log rows, "OK." reply, ban report)
+pipeline: bot.make_ban_pipeline, the whole burst in one flush
+          (index lookups, concurrent bans, one transaction, one reply and
+          one report per thread)
+
+The posts are ingested into bot.POST_INDEX first, as poll_posts would.
+Both modes go through bot.OUTBOUND. Its pacing defaults to 1000/s here so
+the numbers show the ban path rather than the token bucket; set
+OUTBOUND_RATE_PER_SECOND / OUTBOUND_BURST to measure production pacing.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+os.environ.setdefault("OUTBOUND_RATE_PER_SECOND", "1000")
+os.environ.setdefault("OUTBOUND_BURST", "1000")
+os.environ.setdefault("OUTBOUND_CONCURRENCY", "16")
+
+import requests  # noqa: E402
+
+import bot  # noqa: E402
+from utils.state_db import db_init  # noqa: E402
+
+MOD = {"author_id": "2000", "author_username": "mod_anna", "author_name": "Anna (Mod)"}
+
+
+def _stand_in_url() -> str:
+    return bot.API_BASE.rsplit("/api/", 1)[0]
+
+
+def _make_burst(session, base: str, thread_ids: list[str], n_bans: int, round_no: int) -> list[dict]:
+    """Target comments + moderator "ban" replies; returns the ban requests."""
+    out = []
+    for i in range(n_bans):
+        thread_id = thread_ids[i % len(thread_ids)]
+        user = 5000 + round_no * n_bans + i
+        r = session.post(
+            f"{base}/test/posts",
+            data={"thread": thread_id, "message": "Spam spam spam", "author_id": str(user),
+                  "author_username": f"raider{user}", "author_name": f"Raider {user}"},
+            timeout=10,
+        )
+        r.raise_for_status()
+        target_post_id = r.json()["id"]
+        r = session.post(
+            f"{base}/test/posts",
+            data={"thread": thread_id, "message": "ban 1h", "parent": target_post_id, **MOD},
+            timeout=10,
+        )
+        r.raise_for_status()
+        out.append({"post_id": r.json()["id"], "thread_id": thread_id, "target_post_id": target_post_id,
+                    "secs": 3600, "is_perm": False})
+    return out
+
+
+def _ingest(since: int):
+    cursor = None
+    while True:
+        posts, cursor = bot.list_forum_posts_since(bot.FORUMS[0], since, cursor, 100)
+        bot.POST_INDEX.add_many(posts)
+        if not (cursor or {}).get("hasNext"):
+            return
+        cursor = cursor.get("next")
+
+
+async def _serial(con, mods, me_id: str, me_username: str, reqs: list[dict]):
+    """The ban handler as it was before the pipeline (minus parsing / issuer check)."""
+    for req in reqs:
+        target_post = await bot.aget_post_details(req["target_post_id"])
+        author = target_post.get("author") or {}
+        if str(author.get("id") or "") == me_id or mods.is_moderator(str(author.get("id") or ""), (author.get("username") or "").lower()):
+            continue
+        started = int(time.time())
+        resp = await bot.aban_post_author_permanent(req["target_post_id"], ban_user=True)
+        for s in bot.extract_ban_subjects_user_only(resp):
+            bot.schedule_unban(con, s["blacklist_id"], started + req["secs"])
+            bot.log_ban_event(
+                con,
+                blacklist_id=s["blacklist_id"],
+                thread_id=req["thread_id"],
+                ban_cmd_post_id=req["post_id"],
+                target_post_id=req["target_post_id"],
+                subject_type="user",
+                subject_label=s["subject_label"],
+                started_at_unix=started,
+                duration_secs=req["secs"],
+                due_unix=started + req["secs"],
+            )
+        confirm = bot.ensure_not_duplicate(con, req["thread_id"], "OK.")
+        await bot.safe_reply(con, req["thread_id"], req["post_id"], confirm, priority=bot.MODERATION)
+        await bot.post_ban_report(con, thread_id=req["thread_id"], now_unix=int(time.time()), log=lambda *_: None)
+
+
+async def _run(args) -> dict:
+    base = _stand_in_url()
+    session = requests.Session()
+    thread_ids = []
+    for i in range(args.threads):
+        r = session.post(f"{base}/test/threads", data={"title": f"Raid thread {i + 1}"}, timeout=10)
+        r.raise_for_status()
+        thread_ids.append(r.json()["id"])
+
+    outbound = asyncio.create_task(bot.OUTBOUND.run())
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            con = db_init(os.path.join(tmp, "state.db"), forum=bot.FORUMS[0])
+            me = await bot.awhoami()
+            me_id, me_username = str(me.get("id") or ""), str(me.get("username") or "")
+            mods = bot.load_mod_registry(con)
+            await bot.refresh_mod_registry(con, mods, log=lambda *_: None)
+
+            for mode in ("serial", "pipeline"):
+                elapsed = 0.0
+                for round_no in range(args.rounds):
+                    since = int(time.time()) - 1
+                    reqs = _make_burst(session, base, thread_ids, args.bans, round_no + (args.rounds if mode == "pipeline" else 0))
+                    await asyncio.to_thread(_ingest, since)
+
+                    t0 = time.perf_counter()
+                    if mode == "serial":
+                        await _serial(con, mods, me_id, me_username, reqs)
+                    else:
+                        bans = bot.make_ban_pipeline(mods, me_id, me_username)
+                        bans.log = lambda *_: None
+                        for req in reqs:
+                            bans.request(req)
+                        await bans.flush(con)
+                    elapsed += time.perf_counter() - t0
+                total = args.bans * args.rounds
+                results[mode] = {"bans": total, "seconds": elapsed, "bans_per_min": total / elapsed * 60.0 if elapsed else 0.0}
+            con.close()
+    finally:
+        outbound.cancel()
+    results["stand_in"] = session.get(f"{base}/test/stats", timeout=10).json()
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--bans", type=int, default=50, help="ban commands per burst")
+    ap.add_argument("--threads", type=int, default=5, help="threads the burst is spread over")
+    ap.add_argument("--rounds", type=int, default=3)
+    args = ap.parse_args()
+
+    results = asyncio.run(_run(args))
+    for mode in ("serial", "pipeline"):
+        r = results[mode]
+        print(f"{mode:8} bans={r['bans']} time={r['seconds']:.2f}s bans/min={r['bans_per_min']:.0f}")
+    print(f"stand-in requests={results['stand_in']['requests']} blacklist={results['stand_in']['blacklist']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+Command router: the single compiled matcher vs the old chain of regexes.
+
+  python -m benchmarks.bench_router [--synthetic 20000] [--variants 20] [--capture FILE ...]
+
+before: dispatch_command as it was (one re.match / re.search per command,
+        tried in priority order), copied below as _legacy_dispatch
+after:  commands.router.dispatch_command (P_COMMAND + COMMAND_HANDLERS)
+
+Corpus: synthetic posts and listPosts captures (as in bench_text_path), every
+command phrase, and --variants generated variants of each of them (case,
+umlauts, whitespace / nbsp, punctuation, "ban" inside words, the non-ASCII
+letters IGNORECASE folds onto s / i, command words mixed into text).
+
+Handlers are stubbed on both sides with functions that echo their arguments,
+and random is reseeded per post, so the two dispatchers must return the same
+string for every text. Prints the first mismatches and exits with status 1
+if there are any.
+"""
+import argparse
+import glob
+import os
+import random
+import re
+import statistics
+import sys
+import time
+
+from benchmarks.bench_text_path import CORPUS_DIR, _COMMANDS, _WORDS, load_capture, synthetic_posts
+from commands import router
+from utils.text import normalize_post_text
+
+
+# --- dispatch_command before the single compiled matcher ---
+P_TEST = re.compile(r"^test\b.*$", re.IGNORECASE)
+P_GREET = re.compile(r"^(moin|hallo|guten\s+morgen|hey)\b.*$", re.IGNORECASE)
+P_HELP_1 = re.compile(r"^bot\s+sag\s+befehle\b.*$", re.IGNORECASE)
+P_HELP_2 = re.compile(r"^bot\s+hilfe\b.*$", re.IGNORECASE)
+P_MODS = re.compile(r"^bot\s+sag\s+mods\b.*$", re.IGNORECASE)
+P_WEATHER = re.compile(r"^bot\s+sag\s+wetter(?:\s+in)?\s+(.+)$", re.IGNORECASE)
+P_FRONT = re.compile(r"^bot\s+sag\s+front(?:\s+(an|zu|gegen))?(?:\s+(\S+))?(?:\s+.*)?$", re.IGNORECASE)
+P_STORY_31GG = re.compile(r"^bot\s+erzaehl(?:e)?\s+mir\s+die\s+geschichte\s+von\s+31gg\s*$", re.IGNORECASE)
+P_SIZE = re.compile(r"^bot\s+sag\s+schwanzl(?:aenge|ange)?\b.*$", re.IGNORECASE)
+P_JOKE_1 = re.compile(r"^bot\s+sag\s+witz\b.*$", re.IGNORECASE)
+P_JOKE_2 = re.compile(r"^bot\s+erzaehl(?:e)?(?:\s+mir)?(?:\s+einen)?\s+witz\b.*$", re.IGNORECASE)
+P_LIEBESTEST = re.compile(r"^bot\s+sag\s+liebestest\b\s*(.*)$", re.IGNORECASE)
+P_BAN = re.compile(r"\bban(?:\s+(\d+)\s*([smhd]))?\b", re.IGNORECASE)
+P_LLM = re.compile(
+    r"^bot\s+(?:"
+    r"(?:sag\s+)?erklaer(?:e)?|"
+    r"(?:sag\s+)?meinung\s+zu|"
+    r"was\s+sind|was\s+ist"
+    r")\s+(.+)$",
+    re.IGNORECASE
+)
+P_SAG_ANY = re.compile(r"^bot\s+sag\s+(.+)$", re.IGNORECASE)
+
+
+def _legacy_dispatch(text: str) -> str | None:
+    t = router._normalize(text)
+    if not t:
+        return None
+
+    if P_TEST.match(t):
+        return "bestanden."
+    if P_GREET.match(t):
+        return "moin"
+
+    if P_HELP_1.match(t) or P_HELP_2.match(t):
+        return router._help_text()
+
+    if P_MODS.match(t):
+        return "__MODS__"
+
+    m = P_BAN.search(t)
+    if m:
+        num = m.group(1)
+        unit = m.group(2)
+        if not num or not unit:
+            return "__BAN__:PERM"
+        try:
+            n = int(num)
+        except Exception:
+            return "__BAN__:PERM"
+        unit = unit.lower()
+        mult = {"s": 1, "m": 60, "h": 3600, "d": 86400}.get(unit)
+        if not mult or n <= 0:
+            return "__BAN__:PERM"
+        return f"__BAN__:{n * mult}"
+
+    if P_JOKE_1.match(t) or P_JOKE_2.match(t):
+        return router.handle_joke()
+
+    m = P_WEATHER.match(t)
+    if m:
+        return router.handle_weather(m.group(1).strip())
+
+    m = P_FRONT.match(t)
+    if m:
+        mode = (m.group(1) or "").strip().lower()
+        target = (m.group(2) or "").strip()
+        if not mode and not target:
+            return random.choice(router.GENERIC_FRONTS)
+        if mode and target:
+            name = router._strip_trailing_punct(target).lstrip("@")
+            if not name:
+                return "Usage: bot sag front an|zu|gegen <user> oder nur: bot sag front"
+            tpl = random.choice(router.TARGETED_FRONTS)
+            return tpl.format(name=name)
+        return "Usage: bot sag front an|zu|gegen <user> oder nur: bot sag front"
+
+    if P_STORY_31GG.match(t):
+        return router.handle_story_31gg()
+
+    if P_SIZE.match(t):
+        return router.handle_size()
+
+    m = P_LIEBESTEST.match(t)
+    if m:
+        payload = (m.group(1) or "").strip()
+        payload = payload.replace(",", " ").replace("+", " ").replace("&", " ")
+        parts = [p for p in payload.split() if p]
+        if len(parts) < 2:
+            return router.handle_liebestest("", "")
+        user_a = router._strip_trailing_punct(parts[0]).lstrip("@")
+        user_b = router._strip_trailing_punct(parts[1]).lstrip("@")
+        return router.handle_liebestest(user_a, user_b)
+
+    m = P_LLM.match(t)
+    if m:
+        query = m.group(1).strip()
+        if "meinung" in t:
+            return router.handle_opinion(query)
+        return router.handle_explain(query)
+
+    m = P_SAG_ANY.match(t)
+    if m:
+        query = (m.group(1) or "").strip()
+        if query:
+            return router.handle_explain(query)
+
+    return None
+
+
+def _stub_handlers():
+    """Echo stubs: a different argument or handler shows up as a different reply."""
+    router.handle_weather = lambda city: f"<weather {city!r}>"
+    router.handle_opinion = lambda q: f"<opinion {q!r}>"
+    router.handle_explain = lambda q: f"<explain {q!r}>"
+    router.handle_joke = lambda: "<joke>"
+    router.handle_story_31gg = lambda: "<story>"
+    router.handle_size = lambda: "<size>"
+    router.handle_liebestest = lambda a, b: f"<liebestest {a!r} {b!r}>"
+
+
+_EXTRA_PHRASES = (
+    "bot sag", "bot sag ", "bot", "bot sag front an", "bot sag front zu @x!", "bot sag front gegen",
+    "bot sag front foo bar baz", "bot sag wetter", "bot sag wetter in", "bot sag wetter in ",
+    "bot sag liebestest", "bot sag liebestest Anna", "bot sag liebestest @a+@b", "bot sag schwanzl",
+    "bot sag schwanzlange", "bot sag schwanzlängen", "bot erzaehle mir einen witz", "bot erzähl mir witz",
+    "bot erzähle mir die geschichte von 31gg ", "bot erklaer", "bot erkläre Quanten", "bot sag erklär mal",
+    "bot sag meinung zu", "bot was sind", "bot was ist los", "bot hilfeee", "bot sag modsen",
+    "ban 0m", "ban 5x", "ban 10 h", "ban10m", "urban 5m", "banane", "BAN 2D", "das war ein ban 3s!",
+    "abandon", "ban-5m", "ban_5m", "tests", "testen", "test!", "heyho", "hey!", "guten  morgen", "gutenmorgen",
+    "moinsen", "Hallo?", "ſag", "bot ſag witz", "bot sag wıtz", "bot hılfe", "teſt", "baſe", "ban ſ",
+)
+
+_NOISE = ("", "!", "?", ".", "...", " :)", ",", " 🙂", " @user", " <3", " ", "  ")
+
+
+def _variants(text: str, n: int, rnd: random.Random) -> list[str]:
+    out = []
+    for _ in range(n):
+        t = text
+        r = rnd.random()
+        if r < 0.15:
+            t = t.upper()
+        elif r < 0.3:
+            t = "".join(c.upper() if rnd.random() < 0.5 else c for c in t)
+        if rnd.random() < 0.2:
+            t = t.replace("ae", "ä").replace("oe", "ö").replace("ue", "ü").replace("ss", "ß")
+        if rnd.random() < 0.2:
+            t = t.replace("ä", "ae").replace("ö", "oe").replace("ü", "ue")
+        if rnd.random() < 0.3:
+            t = t.replace(" ", rnd.choice(("  ", " ", "\n", "\t", "   ")))
+        if rnd.random() < 0.1:
+            t = t.replace("s", "ſ", 1) if rnd.random() < 0.5 else t.replace("i", "ı", 1)
+        r = rnd.random()
+        if r < 0.2:
+            t = " ".join(rnd.choice(_WORDS) for _ in range(rnd.randint(1, 5))) + " " + t
+        elif r < 0.4:
+            t = t + " " + " ".join(rnd.choice(_WORDS) for _ in range(rnd.randint(1, 8)))
+        elif r < 0.5:
+            t = t[: rnd.randint(0, len(t))]
+        if rnd.random() < 0.1:
+            t = t + rnd.choice((" ban", " ban 5m", " urban", " ban 99d"))
+        out.append(rnd.choice(("", " ", " ")) + t + rnd.choice(_NOISE))
+    return out
+
+
+def build_texts(n_synthetic: int, n_variants: int, captures: list[str], seed: int = 10) -> list[str]:
+    rnd = random.Random(seed)
+    posts = synthetic_posts(n_synthetic)
+    for path in captures:
+        posts.extend(load_capture(path))
+    base = [normalize_post_text(p.get("message", "") or "") for p in posts]
+    phrases = list(_COMMANDS) + list(_EXTRA_PHRASES) + [p for p, _ in router.COMMANDS]
+
+    texts = list(base) + phrases
+    for t in phrases + [t for t in base if len(t) < 200]:
+        texts.extend(_variants(t, n_variants, rnd))
+    return texts
+
+
+def compare(texts: list[str]) -> list[tuple[str, str | None, str | None]]:
+    mismatches = []
+    for i, t in enumerate(texts):
+        random.seed(i)
+        before = _legacy_dispatch(t)
+        random.seed(i)
+        after = router.dispatch_command(t)
+        if before != after:
+            mismatches.append((t, before, after))
+    return mismatches
+
+
+def _time(fns: list, texts: list[str], rounds: int = 7) -> list[float]:
+    """Median ns per text for each fn; the fns take turns per round (machine drift hits both)."""
+    times = [[] for _ in fns]
+    for _ in range(rounds):
+        for i, fn in enumerate(fns):
+            t0 = time.perf_counter_ns()
+            for t in texts:
+                fn(t)
+            times[i].append((time.perf_counter_ns() - t0) / len(texts))
+    return [statistics.median(ts) for ts in times]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--synthetic", type=int, default=20000)
+    ap.add_argument("--variants", type=int, default=20, help="generated variants per command phrase / short post")
+    ap.add_argument("--rounds", type=int, default=7, help="timed rounds (median reported)")
+    ap.add_argument("--capture", action="append", default=None,
+                    help="listPosts JSON capture (default: benchmarks/corpus/*.json)")
+    args = ap.parse_args()
+
+    captures = args.capture if args.capture is not None else sorted(glob.glob(os.path.join(CORPUS_DIR, "*.json")))
+    _stub_handlers()
+    texts = build_texts(args.synthetic, args.variants, captures)
+
+    mismatches = compare(texts)
+    matched = [t for t in texts if _legacy_dispatch(t) is not None]
+    before, after = _time([_legacy_dispatch, router.dispatch_command], texts, args.rounds)
+    before_cmd, after_cmd = _time([_legacy_dispatch, router.dispatch_command], matched, args.rounds)
+
+    print(f"texts={len(texts)} commands={len(matched)} captures={[os.path.basename(c) for c in captures]}")
+    print(f"before  {before:8.0f} ns/post  {before_cmd:8.0f} ns/command")
+    print(f"after   {after:8.0f} ns/post  {after_cmd:8.0f} ns/command")
+    if mismatches:
+        print(f"MISMATCH in {len(mismatches)} texts:")
+        for t, b, a in mismatches[:20]:
+            print(f"  {t!r}\n    before={b!r}\n    after ={a!r}")
+        sys.exit(1)
+    print("old and new dispatch agree on every text")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+State DB write benchmark: one poll batch of new posts that each get a
+reply, baseline vs current write path.
+
+  python -m benchmarks.bench_state_writes [--posts 50] [--rounds 20] [--runs 5]
+
+before: the baseline's statements per post (seen check, mark seen,
+        last_seen_thread_id, ensure_not_duplicate, self like, parent like;
+        SELECT per check, commit per write) on the baseline schema and the
+        default journal (DELETE, synchronous=FULL)
+after:  utils.state_db as the bot uses it now: poll_posts' batch
+        transaction (kv writes flushed into it), write-behind kv on the
+        reply side, liked_posts marked by one LikePipeline flush
+
+commits/batch is counted by StateConnection; time/batch is the measured
+wall time (median of --runs), which is where the fsyncs show up. A replied
+post cost 5 commits before (250 per 50-post batch); after, the batch
+takes 2 (poll batch + like flush).
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from utils import state_db
+from utils.state_db import StateConnection, db_init
+from utils.likes import LikePipeline
+
+# db_init() of the baseline (tables the batch touches)
+BASELINE_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS seen_posts (post_id TEXT PRIMARY KEY)",
+    "CREATE TABLE IF NOT EXISTS seen_threads (thread_id TEXT PRIMARY KEY)",
+    "CREATE TABLE IF NOT EXISTS kv (k TEXT PRIMARY KEY, v TEXT)",
+    "CREATE TABLE IF NOT EXISTS liked_posts (post_id TEXT PRIMARY KEY)",
+)
+
+
+class _Legacy:
+    """The state helpers of the baseline bot.py."""
+
+    @staticmethod
+    def kv_get(con, k):
+        row = con.execute("SELECT v FROM kv WHERE k = ?", (k,)).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def kv_set(con, k, v):
+        con.execute(
+            "INSERT INTO kv(k, v) VALUES(?, ?) ON CONFLICT(k) DO UPDATE SET v=excluded.v",
+            (k, v),
+        )
+        con.commit()
+
+    @staticmethod
+    def seen_post(con, post_id):
+        return con.execute("SELECT 1 FROM seen_posts WHERE post_id = ?", (post_id,)).fetchone() is not None
+
+    @staticmethod
+    def mark_seen_post(con, post_id):
+        con.execute("INSERT OR IGNORE INTO seen_posts(post_id) VALUES(?)", (post_id,))
+        con.commit()
+
+    @staticmethod
+    def liked(con, post_id):
+        return con.execute("SELECT 1 FROM liked_posts WHERE post_id = ?", (post_id,)).fetchone() is not None
+
+    @staticmethod
+    def mark_liked(con, post_id):
+        con.execute("INSERT OR IGNORE INTO liked_posts(post_id) VALUES(?)", (post_id,))
+        con.commit()
+
+
+def _process_batch_legacy(con, posts: list[str]):
+    """The baseline main loop's DB calls, post by post (reply and likes inline)."""
+    h = _Legacy
+    for post_id in posts:
+        if h.seen_post(con, post_id):
+            continue
+        h.mark_seen_post(con, post_id)
+        h.kv_set(con, "last_seen_thread_id", "t1")
+
+        # ensure_not_duplicate
+        key = "last_bot_message::t1"
+        last = h.kv_get(con, key) or ""
+        h.kv_set(con, key, "reply " + post_id if last != "reply " + post_id else "reply " + post_id + " ")
+
+        # like_own_post_if_needed, then the parent like
+        bot_post_id = "b" + post_id
+        if not h.liked(con, bot_post_id):
+            h.mark_liked(con, bot_post_id)
+        if not h.liked(con, post_id):
+            h.mark_liked(con, post_id)
+
+
+def _process_batch(con, likes: LikePipeline, loop, posts: list[str]):
+    """The same batch through the current path: poll_posts, reply handlers, LikePipeline flush."""
+    # poll_posts: one transaction, kv writes of the last cycle flushed into it
+    with con.batch():
+        for i, post_id in enumerate(posts):
+            if state_db.seen_post(con, post_id):
+                continue
+            state_db.kv_set(con, "ingest_hwm_unix", str(1700000000 + i))
+            state_db.kv_set(con, "ingest_hwm_post_id", post_id)
+            state_db.mark_seen_post(con, post_id, 1700000000 + i)
+            state_db.kv_set(con, "last_seen_thread_id", "t1")
+        state_db.flush_kv(con)
+
+    # handle_command_result: ensure_not_duplicate (write-behind kv), self + parent like requests
+    for post_id in posts:
+        key = "last_bot_message::t1"
+        last = state_db.kv_get(con, key) or ""
+        state_db.kv_set(con, key, "reply " + post_id if last != "reply " + post_id else "reply " + post_id + " ")
+        likes.request(con, "b" + post_id, "self")
+        likes.request(con, post_id, "parent")
+
+    # LIKES.run(): votes sent, liked_posts marked in one transaction
+    loop.run_until_complete(likes.flush())
+
+
+async def _vote(post_id: str):
+    return None
+
+
+def run(mode: str, n_posts: int, rounds: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "state.db")
+        if mode == "before":
+            con = sqlite3.connect(path, factory=StateConnection)
+            for ddl in BASELINE_SCHEMA:
+                con.execute(ddl)
+            con.commit()
+        else:
+            con = db_init(path, log=lambda *_: None)
+
+        loop = asyncio.new_event_loop()
+        likes = LikePipeline(state_db.liked, state_db.mark_liked, _vote, log=lambda *_: None)
+
+        con.commits = 0
+        t0 = time.perf_counter()
+        for r in range(rounds):
+            posts = [f"{r:04d}{i:05d}" for i in range(n_posts)]
+            if mode == "before":
+                _process_batch_legacy(con, posts)
+            else:
+                _process_batch(con, likes, loop, posts)
+        wall = time.perf_counter() - t0
+        loop.close()
+
+        mode_row = con.execute("PRAGMA journal_mode").fetchone()[0]
+        sync_row = con.execute("PRAGMA synchronous").fetchone()[0]
+        con.close()
+
+    return {
+        "mode": mode,
+        "journal_mode": mode_row,
+        "synchronous": sync_row,
+        "commits_per_batch": con.commits / rounds,
+        "ms_per_batch": wall * 1000.0 / rounds,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--posts", type=int, default=50)
+    ap.add_argument("--rounds", type=int, default=20)
+    ap.add_argument("--runs", type=int, default=5, help="fresh DB per run, median time reported")
+    args = ap.parse_args()
+
+    for mode in ("before", "after"):
+        runs = [run(mode, args.posts, args.rounds) for _ in range(max(1, args.runs))]
+        times = [r["ms_per_batch"] for r in runs]
+        r = runs[0]
+        print(
+            f"{r['mode']:6} journal={r['journal_mode']:6} sync={r['synchronous']} "
+            f"commits/batch={r['commits_per_batch']:.0f} "
+            f"time/batch={statistics.median(times):.1f}ms (min {min(times):.1f} max {max(times):.1f})"
+        )
+
+
+if __name__ == "__main__":
+    main()
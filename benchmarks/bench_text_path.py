@@ -0,0 +1,244 @@
+"""
+Text / dispatch hot-path micro-benchmarks.
+
+  python -m benchmarks.bench_text_path [--synthetic 5000] [--capture FILE ...]
+                                       [--repeat 15] [--min-time 0.1]
+                                       [--out results.json]
+                                       [--compare baseline.json] [--threshold 0.15]
+
+Corpus: synthetic Disqus-style HTML messages plus captured listPosts
+responses (benchmarks/corpus/*.json, same shape as the API: {"response": [...]}
+or a plain list of post dicts).
+
+Timed cases (ns per post, median of --repeat rounds). A round runs every
+case once, so a slow phase of the machine hits all cases instead of one;
+each run loops over the corpus as often as timeit's autorange needs for
+at least --min-time seconds:
+  strip_html           utils.text.strip_html
+  normalize            commands.router._normalize
+  dispatch             commands.router.dispatch_command, network handlers stubbed
+  created_at_to_unix   utils.text.created_at_to_unix
+  preprocess           per-post work of poll_posts before dispatch
+                       (createdAt parse + message -> text)
+
+--compare exits with status 1 if any case's median is slower than the
+baseline's by more than --threshold (relative). Expected noise: unchanged
+code against its own baseline stayed within +-10% per case on a shared
+single-CPU VM with the defaults (up to +-36% with best-of-7 single passes,
+which is why the gate uses rounds and medians). On noisier runners raise
+--repeat / --min-time before raising --threshold.
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import timeit
+
+from commands import router
+from utils.text import strip_html, normalize_post_text, created_at_to_unix
+
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), "corpus")
+
+_WORDS = (
+    "moin das ist doch alles quatsch schaut euch mal die zahlen an ich finde den beitrag gut aber "
+    "der zweite teil ist schwach grüße straße gesperrt umleitung über bundesstraße typisch "
+    "früher war alles besser nein war es nicht stream morgen um uhr wichtig kann jemand erklären "
+    "warum die seite so langsam lädt bei mir dauert das ewig urban banane"
+).split()
+
+_COMMANDS = (
+    "test", "moin", "Hallo", "guten morgen", "hey", "bot hilfe", "bot sag befehle", "bot sag mods",
+    "ban", "ban 10m", "bot erzähl einen Witz", "bot sag wetter in München", "bot sag front",
+    "bot sag front gegen @Heinz", "bot erzähl mir die geschichte von 31gg", "bot sag schwanzlänge",
+    "bot sag liebestest Anna, Ben", "bot sag meinung zu Ananas", "bot was ist ein Schwarzes Loch?",
+    "bot sag irgendwas",
+)
+
+_LINK = (
+    '<a href="https://disq.us/url?url=https%3A%2F%2Fwww.example.de%2F{n}%3Aabc&amp;cuid=123" '
+    'rel="nofollow noopener" target="_blank" title="https://www.example.de/{n}">https://www.example.de/...</a>'
+)
+
+
+def synthetic_posts(n: int, seed: int = 31) -> list[dict]:
+    """Disqus-shaped posts: <p> blocks, links, <br>, nbsp, umlauts, ~15% commands."""
+    rnd = random.Random(seed)
+    t0 = 1760000000
+    posts = []
+    for i in range(n):
+        if rnd.random() < 0.15:
+            body = f"<p>{rnd.choice(_COMMANDS)}</p>"
+        else:
+            paras = []
+            for _ in range(rnd.randint(1, 4)):
+                words = [rnd.choice(_WORDS) for _ in range(rnd.randint(3, 40))]
+                if rnd.random() < 0.2:
+                    words.insert(rnd.randint(0, len(words)), _LINK.format(n=i))
+                if rnd.random() < 0.2:
+                    words.insert(rnd.randint(0, len(words)), "<br>")
+                if rnd.random() < 0.3:
+                    words.insert(rnd.randint(0, len(words)), " ")
+                paras.append("<p>" + " ".join(words) + "</p>")
+            body = "".join(paras)
+        created = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(t0 + i * 37))
+        posts.append({"id": str(6800000000 + i), "createdAt": created, "message": body})
+    return posts
+
+
+def load_capture(path: str) -> list[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("response") or []
+    return [p for p in data if isinstance(p, dict) and "message" in p]
+
+
+def load_corpus(n_synthetic: int, captures: list[str]) -> list[dict]:
+    posts = synthetic_posts(n_synthetic)
+    for path in captures:
+        posts.extend(load_capture(path))
+    return posts
+
+
+def _stub_network_handlers():
+    """Weather / LLM handlers would hit the network (jokes: background refill); replace them with constants."""
+    router.handle_weather = lambda city: f"Wetter {city}"
+    router.handle_opinion = lambda q: "Meinung"
+    router.handle_explain = lambda q: "Erklärung"
+    router.handle_joke = lambda: "Witz"
+
+
+def _cases(posts: list[dict]) -> dict:
+    messages = [p.get("message", "") or "" for p in posts]
+    created = [p.get("createdAt") for p in posts]
+    texts = [normalize_post_text(m) for m in messages]
+
+    def bench_strip_html():
+        for m in messages:
+            strip_html(m)
+
+    def bench_normalize():
+        for t in texts:
+            router._normalize(t)
+
+    def bench_dispatch():
+        for t in texts:
+            router.dispatch_command(t)
+
+    def bench_created_at():
+        for c in created:
+            created_at_to_unix(c)
+
+    def bench_preprocess():
+        for p in posts:
+            created_at_to_unix(p.get("createdAt"))
+            normalize_post_text(p.get("message", ""))
+
+    return {
+        "strip_html": bench_strip_html,
+        "normalize": bench_normalize,
+        "dispatch": bench_dispatch,
+        "created_at_to_unix": bench_created_at,
+        "preprocess": bench_preprocess,
+    }
+
+
+def _loops_for(fn, min_time: float) -> int:
+    """Corpus passes per run so one run takes at least min_time (timeit autorange, scaled up)."""
+    loops, elapsed = timeit.Timer(fn).autorange()  # >= 0.2 s
+    if elapsed < min_time:
+        loops = int(loops * min_time / max(elapsed, 1e-9)) + 1
+    return loops
+
+
+def run(posts: list[dict], repeat: int, min_time: float = 0.1) -> dict:
+    _stub_network_handlers()
+    cases = _cases(posts)
+    loops = {name: _loops_for(fn, min_time) for name, fn in cases.items()}  # also the warm-up
+    times = {name: [] for name in cases}
+    for _ in range(max(1, repeat)):
+        for name, fn in cases.items():
+            times[name].append(timeit.Timer(fn).timeit(loops[name]))
+
+    results = {}
+    for name in cases:
+        per_post = [t * 1e9 / (loops[name] * len(posts)) for t in times[name]]
+        results[name] = {
+            "ns_per_post": statistics.median(per_post),
+            "min_ns_per_post": min(per_post),
+            "max_ns_per_post": max(per_post),
+            "loops": loops[name],
+            "posts": len(posts),
+        }
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Returns one line per case slower than baseline * (1 + threshold)."""
+    regressions = []
+    for name, r in results.items():
+        base = (baseline.get(name) or {}).get("ns_per_post")
+        if not base:
+            continue
+        ratio = r["ns_per_post"] / base
+        if ratio > 1.0 + threshold:
+            regressions.append(f"{name}: {base:.0f} -> {r['ns_per_post']:.0f} ns/post ({(ratio - 1) * 100:+.1f}%)")
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--synthetic", type=int, default=5000)
+    ap.add_argument("--capture", action="append", default=None,
+                    help="listPosts JSON capture (default: benchmarks/corpus/*.json)")
+    ap.add_argument("--repeat", type=int, default=15, help="timed rounds (median per case is reported / compared)")
+    ap.add_argument("--min-time", type=float, default=0.1, help="seconds per run (more corpus passes per run)")
+    ap.add_argument("--out", default=None)
+    ap.add_argument("--compare", default=None)
+    ap.add_argument("--threshold", type=float, default=0.15)
+    args = ap.parse_args()
+
+    captures = args.capture if args.capture is not None else sorted(glob.glob(os.path.join(CORPUS_DIR, "*.json")))
+    posts = load_corpus(args.synthetic, captures)
+    results = run(posts, args.repeat, args.min_time)
+
+    for name, r in results.items():
+        print(f"{name:20} {r['ns_per_post']:9.0f} ns/post  (min {r['min_ns_per_post']:.0f} max {r['max_ns_per_post']:.0f}, {r['loops']} loops)")
+
+    if args.out:
+        doc = {
+            "meta": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "posts": len(posts),
+                "synthetic": args.synthetic,
+                "captures": [os.path.basename(c) for c in captures],
+                "repeat": args.repeat,
+                "min_time": args.min_time,
+                "unix": int(time.time()),
+            },
+            "results": results,
+        }
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(doc, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f).get("results") or {}
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"REGRESSION (> {args.threshold * 100:.0f}%):")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"no regressions above {args.threshold * 100:.0f}% vs {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,58 @@
 import os
 import time
+import asyncio
+import signal
 import json
-import sqlite3
-import requests
 import secrets
+import functools
 from datetime import datetime, timezone
 from zoneinfo import ZoneInfo
 
-from commands.router import dispatch_command
-from utils.text import strip_html
-from utils.hourly_posts import init_hourly_schedule, tick_hourly_posts
+from concurrent.futures import ThreadPoolExecutor
 
-API_BASE = "https://disqus.com/api/3.0"
+import requests
+from urllib3.exceptions import NewConnectionError
 
-DISQUS_FORUM_SHORTNAME = os.environ.get("DISQUS_FORUM", "").strip()
+from commands.router import dispatch_command, COMMAND_LATENCY
+from commands.joke import JOKES
+from utils.text import normalize_post_text, created_at_to_unix
+from utils.hourly_posts import init_hourly_schedule, tick_hourly_posts
+from utils.ingest import init_ingest_state, fetch_new_posts, advance_high_water_mark
+from utils.poll_scheduler import AdaptivePollInterval, parse_rate_limit_headers
+from utils.http_client import HttpClient
+from utils.command_pool import KeyedCommandPool
+from utils.outbound import OutboundQueue, MODERATION, REPLY, BACKGROUND
+from utils.likes import LikePipeline
+from utils.unbans import UnbanScheduler
+from utils.bans import BanPipeline
+from utils.forum_scheduler import FairScheduler
+from utils.post_index import PostIndex
+from utils.migrations import run_backfills
+from utils.moderators import ModeratorRegistry
+from utils import weather_cache, llm_groq
+from utils.circuit_breaker import BREAKERS
+from utils.state_db import (
+    db_init,
+    forum_db_path,
+    kv_get,
+    kv_set,
+    seen_post,
+    mark_seen_post,
+    seen_thread,
+    mark_seen_thread,
+    liked,
+    mark_liked,
+    prune_seen,
+    flush_kv,
+)
+
+# Point at a local stand-in (mock_api.py) for offline load tests
+API_BASE = os.environ.get("API_BASE", "https://disqus.com/api/3.0").strip().rstrip("/")
+
+# Forums served by this process: DISQUS_FORUMS="forum1,forum2" (or a single DISQUS_FORUM)
+FORUMS = list(dict.fromkeys(
+    f.strip() for f in (os.environ.get("DISQUS_FORUMS") or os.environ.get("DISQUS_FORUM", "")).split(",") if f.strip()
+))
 DISQUS_PUBLIC_KEY = os.environ.get("DISQUS_PUBLIC_KEY", "").strip()
 DISQUS_SECRET_KEY = os.environ.get("DISQUS_SECRET_KEY", "").strip()
 DISQUS_ACCESS_TOKEN = os.environ.get("DISQUS_ACCESS_TOKEN", "").strip()
@@ -21,8 +60,13 @@ DISQUS_ACCESS_TOKEN = os.environ.get("DISQUS_ACCESS_TOKEN", "").strip()
 POLL_SECONDS = int(os.environ.get("POLL_SECONDS", "4"))
 POST_LIMIT = int(os.environ.get("POST_LIMIT", "50"))
 
+# Adaptive polling: interval shrinks while posts arrive, backs off when idle
+POLL_MIN_SECONDS = float(os.environ.get("POLL_MIN_SECONDS", "2"))
+POLL_MAX_SECONDS = float(os.environ.get("POLL_MAX_SECONDS", "60"))
+
 # Thread polling for welcome without user comments
 THREAD_POLL_SECONDS = int(os.environ.get("THREAD_POLL_SECONDS", "20"))
+THREAD_POLL_MAX_SECONDS = float(os.environ.get("THREAD_POLL_MAX_SECONDS", "300"))
 THREAD_LIMIT = int(os.environ.get("THREAD_LIMIT", "25"))
 
 # If 1: welcome also for existing threads (not only created after start)
@@ -33,141 +77,92 @@ DEBUG_TRIGGERS = (os.environ.get("DEBUG_TRIGGERS", "0").strip() == "1")
 # Moderator cache refresh interval (seconds)
 MOD_CACHE_TTL_SECONDS = int(os.environ.get("MOD_CACHE_TTL_SECONDS", "43200"))
 
-# Welcome text (neutral default). You can use "{HEX}" placeholder.
-WELCOME_TEXT = (os.environ.get("WELCOME_TEXT", "Hallo #{HEX}") or "Hallo #{HEX}").strip()
+# Min seconds between refreshes forced by a ban from an author not in the cache
+MOD_FORCE_REFRESH_MIN_SECONDS = int(os.environ.get("MOD_FORCE_REFRESH_MIN_SECONDS", "60"))
 
-if not DISQUS_FORUM_SHORTNAME or not DISQUS_PUBLIC_KEY or not DISQUS_ACCESS_TOKEN:
-    raise SystemExit("Missing env vars. Set DISQUS_FORUM, DISQUS_PUBLIC_KEY, DISQUS_ACCESS_TOKEN.")
+# Disqus HTTP client: keep-alive pool size, GET retries, stats log interval (seconds)
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", "10"))
+HTTP_GET_RETRIES = int(os.environ.get("HTTP_GET_RETRIES", "2"))
+HTTP_STATS_LOG_SECONDS = int(os.environ.get("HTTP_STATS_LOG_SECONDS", "600"))
 
-_BERLIN = ZoneInfo("Europe/Berlin")
+# Worker threads for blocking I/O (Disqus + third-party APIs) under the asyncio runtime
+IO_WORKERS = int(os.environ.get("IO_WORKERS", "16"))
 
+# Worker threads for command handlers (weather, jokes, LLM, ...)
+COMMAND_WORKERS = int(os.environ.get("COMMAND_WORKERS", "4"))
 
-def ts() -> str:
-    return datetime.now(_BERLIN).isoformat(timespec="milliseconds")
+# Outbound writes (posts/create, posts/vote, ban, blacklist): pacing, parallel sends, attempts per write
+OUTBOUND_RATE_PER_SECOND = float(os.environ.get("OUTBOUND_RATE_PER_SECOND", "2"))
+OUTBOUND_BURST = int(os.environ.get("OUTBOUND_BURST", "4"))
+OUTBOUND_CONCURRENCY = int(os.environ.get("OUTBOUND_CONCURRENCY", "4"))
+OUTBOUND_MAX_ATTEMPTS = int(os.environ.get("OUTBOUND_MAX_ATTEMPTS", "3"))
 
+# Ban commands arriving within this many seconds are executed as one batch
+BAN_BATCH_WINDOW_SECONDS = float(os.environ.get("BAN_BATCH_WINDOW_SECONDS", "1"))
 
-# -------------------------
-# DB helpers
-# -------------------------
-def db_init():
-    con = sqlite3.connect("disqus_state.db")
-    con.execute("CREATE TABLE IF NOT EXISTS seen_posts (post_id TEXT PRIMARY KEY)")
-    con.execute("CREATE TABLE IF NOT EXISTS seen_threads (thread_id TEXT PRIMARY KEY)")
-    con.execute("CREATE TABLE IF NOT EXISTS kv (k TEXT PRIMARY KEY, v TEXT)")
-    con.execute("CREATE TABLE IF NOT EXISTS liked_posts (post_id TEXT PRIMARY KEY)")
-    con.execute("CREATE TABLE IF NOT EXISTS pending_unbans (blacklist_id TEXT PRIMARY KEY, due_unix INTEGER NOT NULL)")
-
-    # Ban history (only what THIS bot triggers)
-    con.execute("""
-        CREATE TABLE IF NOT EXISTS bans_log (
-            blacklist_id TEXT PRIMARY KEY,
-            thread_id TEXT,
-            ban_cmd_post_id TEXT,
-            target_post_id TEXT,
-            subject_type TEXT,
-            subject_label TEXT,
-            started_at_unix INTEGER NOT NULL,
-            duration_secs INTEGER,
-            due_unix INTEGER,
-            unbanned_at_unix INTEGER
-        )
-    """)
-    con.commit()
-    return con
+# Max blacklist ids per blacklists/remove call
+UNBAN_BATCH_MAX = int(os.environ.get("UNBAN_BATCH_MAX", "100"))
 
+# Max seconds a requested like waits before it is sent (poll cycles flush earlier)
+LIKE_FLUSH_SECONDS = float(os.environ.get("LIKE_FLUSH_SECONDS", "2"))
 
-def ensure_pending_unbans_schema(con):
-    con.execute("""
-        CREATE TABLE IF NOT EXISTS pending_unbans (
-            blacklist_id TEXT PRIMARY KEY,
-            due_unix INTEGER NOT NULL
-        )
-    """)
-    con.commit()
-
-    cols = [r[1] for r in con.execute("PRAGMA table_info(pending_unbans)").fetchall()]
-    if cols == ["blacklist_id", "due_unix"]:
-        return
-
-    print(f"{ts()} DB MIGRATION: pending_unbans columns={cols} -> rebuilding")
-    con.execute("ALTER TABLE pending_unbans RENAME TO pending_unbans_old")
-    con.execute("""
-        CREATE TABLE pending_unbans (
-            blacklist_id TEXT PRIMARY KEY,
-            due_unix INTEGER NOT NULL
-        )
-    """)
-
-    old_id_col = None
-    for c in ["blacklist_id", "id", "block_id", "blacklist"]:
-        if c in cols:
-            old_id_col = c
-            break
-
-    if old_id_col and "due_unix" in cols:
-        con.execute(f"""
-            INSERT OR IGNORE INTO pending_unbans(blacklist_id, due_unix)
-            SELECT CAST({old_id_col} AS TEXT), due_unix FROM pending_unbans_old
-        """)
-
-    con.execute("DROP TABLE pending_unbans_old")
-    con.commit()
+# Recently ingested posts kept for ban/like lookups (saves posts/details calls)
+POST_INDEX_MAX = int(os.environ.get("POST_INDEX_MAX", "5000"))
 
+# Online schema backfills: rows per chunk (one transaction) and pause between chunks
+BACKFILL_CHUNK = int(os.environ.get("BACKFILL_CHUNK", "2000"))
+BACKFILL_PAUSE_SECONDS = float(os.environ.get("BACKFILL_PAUSE_SECONDS", "0.5"))
 
-def kv_get(con, k: str):
-    cur = con.execute("SELECT v FROM kv WHERE k = ?", (k,))
-    row = cur.fetchone()
-    return row[0] if row else None
+# How often seen/liked rows older than SEEN_RETENTION_DAYS are pruned (seconds)
+SEEN_PRUNE_SECONDS = int(os.environ.get("SEEN_PRUNE_SECONDS", "3600"))
 
+# Per-forum jobs (post/thread polls, welcomes, hourly posts, ...) running at the same time
+FORUM_JOB_CONCURRENCY = int(os.environ.get("FORUM_JOB_CONCURRENCY", "4"))
 
-def kv_set(con, k: str, v: str):
-    con.execute(
-        "INSERT INTO kv(k, v) VALUES(?, ?) ON CONFLICT(k) DO UPDATE SET v=excluded.v",
-        (k, v),
-    )
-    con.commit()
+# Welcome text (neutral default). You can use "{HEX}" placeholder.
+WELCOME_TEXT = (os.environ.get("WELCOME_TEXT", "Hallo #{HEX}") or "Hallo #{HEX}").strip()
 
+if not FORUMS or not DISQUS_PUBLIC_KEY or not DISQUS_ACCESS_TOKEN:
+    raise SystemExit("Missing env vars. Set DISQUS_FORUM (or DISQUS_FORUMS), DISQUS_PUBLIC_KEY, DISQUS_ACCESS_TOKEN.")
 
-def seen_post(con, post_id: str) -> bool:
-    cur = con.execute("SELECT 1 FROM seen_posts WHERE post_id = ?", (post_id,))
-    return cur.fetchone() is not None
+_BERLIN = ZoneInfo("Europe/Berlin")
 
 
-def mark_seen_post(con, post_id: str):
-    con.execute("INSERT OR IGNORE INTO seen_posts(post_id) VALUES(?)", (post_id,))
-    con.commit()
+def ts() -> str:
+    return datetime.now(_BERLIN).isoformat(timespec="milliseconds")
 
 
-def seen_thread(con, thread_id: str) -> bool:
-    cur = con.execute("SELECT 1 FROM seen_threads WHERE thread_id = ?", (thread_id,))
-    return cur.fetchone() is not None
+def log_ts(msg: str):
+    print(f"{ts()} {msg}")
 
+# -------------------------
+# Disqus API helpers
+# -------------------------
+DISQUS_HTTP = HttpClient(API_BASE, pool_size=HTTP_POOL_SIZE, retries=HTTP_GET_RETRIES, log=log_ts)
 
-def mark_seen_thread(con, thread_id: str):
-    con.execute("INSERT OR IGNORE INTO seen_threads(thread_id) VALUES(?)", (thread_id,))
-    con.commit()
+# Last X-Ratelimit-* values seen (for the poll scheduler)
+_RATELIMIT = {"limit": None, "remaining": None, "reset": None}
 
 
-def liked(con, post_id: str) -> bool:
-    cur = con.execute("SELECT 1 FROM liked_posts WHERE post_id = ?", (post_id,))
-    return cur.fetchone() is not None
+def _note_rate_limit(r):
+    rl = parse_rate_limit_headers(r.headers)
+    if rl["remaining"] is not None:
+        _RATELIMIT.update(rl)
 
 
-def mark_liked(con, post_id: str):
-    con.execute("INSERT OR IGNORE INTO liked_posts(post_id) VALUES(?)", (post_id,))
-    con.commit()
+def disqus_get(path: str, params: dict):
+    return disqus_get_page(path, params)[0]
 
 
-# -------------------------
-# Disqus API helpers
-# -------------------------
-def disqus_get(path: str, params: dict):
+def disqus_get_page(path: str, params: dict):
+    """Like disqus_get, but also returns the list cursor ({"hasNext", "next", ...})."""
     p = dict(params or {})
     p.setdefault("api_key", DISQUS_PUBLIC_KEY)
     if DISQUS_ACCESS_TOKEN:
         p.setdefault("access_token", DISQUS_ACCESS_TOKEN)
 
-    r = requests.get(f"{API_BASE}{path}", params=p, timeout=15)
+    r = DISQUS_HTTP.get(path, params=p, timeout=15)
+    _note_rate_limit(r)
     try:
         data = r.json()
     except Exception:
@@ -177,7 +172,13 @@ def disqus_get(path: str, params: dict):
     if r.status_code >= 400 or data.get("code", 0) != 0:
         raise RuntimeError(f"Disqus API error (HTTP {r.status_code}): {data}")
 
-    return data["response"]
+    return data["response"], data.get("cursor") or {}
+
+
+class DisqusApiError(RuntimeError):
+    def __init__(self, status: int, data):
+        super().__init__(f"Disqus API error (HTTP {status}): {data}")
+        self.status = status
 
 
 def disqus_post(path: str, data: dict):
@@ -189,10 +190,14 @@ def disqus_post(path: str, data: dict):
     if DISQUS_ACCESS_TOKEN:
         payload.setdefault("access_token", DISQUS_ACCESS_TOKEN)
 
-    r = requests.post(f"{API_BASE}{path}", data=payload, timeout=20)
-    out = r.json()
+    r = DISQUS_HTTP.post(path, data=payload, timeout=20)
+    _note_rate_limit(r)
+    try:
+        out = r.json()
+    except Exception:
+        raise DisqusApiError(r.status_code, r.text[:200])
     if r.status_code >= 400 or out.get("code", 0) != 0:
-        raise RuntimeError(f"Disqus API error (HTTP {r.status_code}): {out}")
+        raise DisqusApiError(r.status_code, out)
     return out["response"]
 
 
@@ -213,6 +218,20 @@ def list_forum_recent_posts(forum_shortname: str, limit: int):
     )
 
 
+def list_forum_posts_since(forum_shortname: str, since_unix: int, cursor: str | None, limit: int):
+    params = {
+        "forum": forum_shortname,
+        "limit": int(limit),
+        "order": "asc",
+        "since": int(since_unix),
+        "include": ["approved", "unapproved"],
+        "related": ["thread"],
+    }
+    if cursor:
+        params["cursor"] = cursor
+    return disqus_get_page("/forums/listPosts.json", params)
+
+
 def list_forum_recent_threads(forum_shortname: str, limit: int):
     return disqus_get(
         "/forums/listThreads.json",
@@ -249,6 +268,80 @@ def get_post_details(post_id: str):
     return disqus_get("/posts/details.json", {"post": str(post_id)})
 
 
+# -------------------------
+# Async API helpers
+# -------------------------
+# The blocking helpers run on the loop's I/O thread pool. DB access stays
+# on the event loop thread (sqlite connection is not shared with workers).
+def _to_async(fn):
+    async def _run(*args, **kwargs):
+        return await asyncio.to_thread(fn, *args, **kwargs)
+    _run.__name__ = f"a{fn.__name__}"
+    return _run
+
+
+adisqus_get = _to_async(disqus_get)
+awhoami = _to_async(whoami)
+alist_forum_posts_since = _to_async(list_forum_posts_since)
+alist_forum_recent_threads = _to_async(list_forum_recent_threads)
+alist_forum_moderators = _to_async(list_forum_moderators)
+aget_post_details = _to_async(get_post_details)
+
+
+# -------------------------
+# Outbound writes
+# -------------------------
+def _never_sent(err: Exception) -> bool:
+    """The connection was never established (connect timeout, refused, DNS), so no request went out."""
+    if isinstance(err, requests.ConnectTimeout):
+        return True
+    reason = getattr(err.args[0], "reason", None) if isinstance(err, requests.ConnectionError) and err.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+def _outbound_retryable(err: Exception, idempotent: bool) -> bool:
+    """
+    429 and failed connects are safe to retry for every write (nothing was created).
+    5xx, read timeouts and dropped connections ("Connection aborted" after the
+    body was sent) may have gone through: only retried for idempotent writes.
+    """
+    if isinstance(err, DisqusApiError):
+        return err.status == 429 or (idempotent and err.status >= 500)
+    if _never_sent(err):
+        return True
+    return idempotent and isinstance(err, (requests.ConnectionError, requests.Timeout))
+
+
+OUTBOUND = OutboundQueue(
+    OUTBOUND_RATE_PER_SECOND,
+    OUTBOUND_BURST,
+    concurrency=OUTBOUND_CONCURRENCY,
+    max_attempts=OUTBOUND_MAX_ATTEMPTS,
+    is_retryable=_outbound_retryable,
+    log=log_ts,
+)
+
+
+# Recent posts from listPosts pages and our own replies; posts/details only on a miss
+POST_INDEX = PostIndex(POST_INDEX_MAX)
+
+
+# Deferred likes: collected by the handlers, sent in the background by LIKES.run()
+LIKES = LikePipeline(liked, mark_liked, lambda post_id: avote_post_like(post_id, vote=1), flush_s=LIKE_FLUSH_SECONDS, log=log_ts)
+
+
+async def areply(thread_id: str, parent_post_id: str, message: str, priority: int = REPLY):
+    return await OUTBOUND.submit(priority, "reply", reply, thread_id, parent_post_id, message, idempotent=False)
+
+
+async def acreate_root_post(thread_id: str, message: str, priority: int = BACKGROUND):
+    return await OUTBOUND.submit(priority, "post", create_root_post, thread_id, message, idempotent=False)
+
+
+async def avote_post_like(post_id: str, vote: int = 1, priority: int = BACKGROUND):
+    return await OUTBOUND.submit(priority, "vote", vote_post_like, post_id, vote)
+
+
 def dbg_trigger(text: str) -> bool:
     if not DEBUG_TRIGGERS:
         return False
@@ -270,109 +363,28 @@ def dbg_trigger(text: str) -> bool:
 # -------------------------
 # Moderator cache
 # -------------------------
-def _parse_mods(mods_response: list[dict]) -> dict:
-    mod_ids = set()
-    mod_usernames = set()
-    display_names = []
-
-    for item in mods_response or []:
-        if not isinstance(item, dict):
-            continue
-        user = item.get("user") if isinstance(item.get("user"), dict) else None
-        if not isinstance(user, dict):
-            continue
-
-        uid = str(user.get("id") or "").strip()
-        uname = str(user.get("username") or "").strip().lower()
-        dname = str(user.get("name") or "").strip()
+def load_mod_registry(con) -> ModeratorRegistry:
+    mods = ModeratorRegistry(MOD_CACHE_TTL_SECONDS, force_min_interval_s=MOD_FORCE_REFRESH_MIN_SECONDS)
+    mods.load_cached(kv_get(con, "mods_cache_json"), int(kv_get(con, "mods_cache_last_unix") or "0"))
+    return mods
 
-        if uid:
-            mod_ids.add(uid)
-        if uname:
-            mod_usernames.add(uname)
-
-        # Output requirement: ONLY display names
-        if dname:
-            display_names.append(dname)
-
-    uniq = []
-    seen = set()
-    for n in display_names:
-        k = n.lower()
-        if k in seen:
-            continue
-        seen.add(k)
-        uniq.append(n)
-
-    return {
-        "ids": sorted(mod_ids),
-        "usernames": sorted(mod_usernames),
-        "display_names": uniq,
-    }
-
-
-def refresh_mod_cache_if_needed(con, force: bool = False, log=print):
-    now = int(time.time())
-    last = int(kv_get(con, "mods_cache_last_unix") or "0")
-    if not force and (now - last) < MOD_CACHE_TTL_SECONDS:
-        return
 
+async def refresh_mod_registry(con, mods: ModeratorRegistry, log=print) -> bool:
     try:
-        mods = list_forum_moderators(DISQUS_FORUM_SHORTNAME, limit=100)
-        parsed = _parse_mods(mods)
+        resp = await alist_forum_moderators(con.forum, limit=100)
+        parsed = mods.apply(resp)
         kv_set(con, "mods_cache_json", json.dumps(parsed, ensure_ascii=False))
-        kv_set(con, "mods_cache_last_unix", str(now))
-        log(f"{ts()} MOD-CACHE refreshed count_display={len(parsed.get('display_names', []))} ids={len(parsed.get('ids', []))}")
+        kv_set(con, "mods_cache_last_unix", str(int(mods.refreshed_at)))
+        log(f"{ts()} MOD-CACHE refreshed forum={con.forum} count_display={len(parsed.get('display_names', []))} ids={len(parsed.get('ids', []))}")
+        return True
     except Exception as e:
-        log(f"{ts()} MOD-CACHE refresh failed: {e}")
-
-
-def _get_mod_cache(con) -> dict:
-    raw = kv_get(con, "mods_cache_json") or ""
-    try:
-        return json.loads(raw) if raw else {}
-    except Exception:
-        return {}
-
-
-def is_moderator(con, author_id: str, author_username: str) -> bool:
-    cache = _get_mod_cache(con)
-    ids = set(cache.get("ids") or [])
-    usernames = set(cache.get("usernames") or [])
-    aid = (author_id or "").strip()
-    aun = (author_username or "").strip().lower()
-    return (aid in ids) or (aun in usernames)
-
-
-def format_mods_bullets_display_names_only(con) -> str:
-    cache = _get_mod_cache(con)
-    names = cache.get("display_names") or []
-    if not names:
-        return "Mods:\n- (keine Anzeigenamen gefunden)"
-    lines = ["Mods:"]
-    for n in names:
-        lines.append(f"- {n}")
-    return "\n".join(lines)
+        log(f"{ts()} MOD-CACHE refresh failed forum={con.forum}: {e}")
+        return False
 
 
 # -------------------------
 # Bot helpers
 # -------------------------
-def created_at_to_unix(created_at: str) -> int | None:
-    if not created_at:
-        return None
-    try:
-        s = created_at.strip()
-        if s.endswith("Z"):
-            s = s[:-1] + "+00:00"
-        dt = datetime.fromisoformat(s)
-        if dt.tzinfo is None:
-            dt = dt.replace(tzinfo=timezone.utc)
-        return int(dt.timestamp())
-    except Exception:
-        return None
-
-
 def get_thread_id_from_post(p: dict) -> str:
     th = p.get("thread")
     if isinstance(th, dict):
@@ -396,40 +408,35 @@ def random_hex6() -> str:
     return secrets.token_hex(3).upper()
 
 
-def safe_reply(con, thread_id: str, parent_post_id: str, message: str) -> str | None:
+async def safe_reply(con, thread_id: str, parent_post_id: str, message: str, priority: int = REPLY) -> str | None:
     if not thread_id:
         return None
-    resp = reply(thread_id, parent_post_id, message)
+    resp = await areply(thread_id, parent_post_id, message, priority=priority)
+    POST_INDEX.add(resp)
     new_id = str(resp.get("id") or "").strip()
     return new_id or None
 
 
-def create_root_post_and_like(con, thread_id: str, message: str, log=print) -> str | None:
-    resp = create_root_post(thread_id, message)
+async def create_root_post_and_like(con, thread_id: str, message: str, log=print, priority: int = BACKGROUND) -> str | None:
+    resp = await acreate_root_post(thread_id, message, priority=priority)
+    POST_INDEX.add(resp)
     new_id = str(resp.get("id") or "").strip()
     if new_id:
-        try:
-            if not liked(con, new_id):
-                vote_post_like(new_id, vote=1)
-                mark_liked(con, new_id)
-                log(f"{ts()} SELF-LIKED root_post_id={new_id}")
-        except Exception as e:
-            log(f"{ts()} SELF-LIKE failed root_post_id={new_id}: {e}")
+        like_own_post_if_needed(con, new_id)
         return new_id
     return None
 
 
-def like_own_post_if_needed(con, post_id: str, log=print):
-    if not post_id:
-        return
-    if liked(con, post_id):
+def like_own_post_if_needed(con, post_id: str):
+    """Queues the self-like; LIKES sends it off the reply path."""
+    LIKES.request(con, post_id, "self")
+
+
+def like_parent_post(con, post_id: str):
+    known = POST_INDEX.get(post_id)
+    if known is not None and (known["isDeleted"] or known["isSpam"]):
         return
-    try:
-        vote_post_like(post_id, vote=1)
-        mark_liked(con, post_id)
-        log(f"{ts()} SELF-LIKED post_id={post_id}")
-    except Exception as e:
-        log(f"{ts()} SELF-LIKE failed post_id={post_id}: {e}")
+    LIKES.request(con, post_id, "parent")
 
 
 def should_like(text: str) -> bool:
@@ -471,55 +478,35 @@ def ban_post_author_permanent(
     return disqus_post("/forums/block/banPostAuthor.json", data)
 
 
-def blacklist_remove_by_id(blacklist_id: str):
-    return disqus_post("/blacklists/remove.json", {"forum": DISQUS_FORUM_SHORTNAME, "blacklist": [str(blacklist_id)]})
+def blacklist_remove(forum_shortname: str, blacklist_ids: list[str]):
+    """blacklists/remove.json takes a list of ids: one call for a whole batch of unbans."""
+    return disqus_post("/blacklists/remove.json", {"forum": forum_shortname, "blacklist": [str(b) for b in blacklist_ids]})
 
 
-def schedule_unban(con, blacklist_id: str, due_unix: int):
-    con.execute(
-        "INSERT OR REPLACE INTO pending_unbans(blacklist_id, due_unix) VALUES(?, ?)",
-        (str(blacklist_id), int(due_unix)),
-    )
-    con.commit()
+async def aban_post_author_permanent(post_id: str, **kwargs):
+    return await OUTBOUND.submit(MODERATION, "ban", functools.partial(ban_post_author_permanent, post_id, **kwargs))
 
 
-def tick_unbans(con, log=print):
-    now = int(time.time())
-    rows = con.execute(
-        "SELECT blacklist_id, due_unix FROM pending_unbans WHERE due_unix <= ? ORDER BY due_unix ASC LIMIT 50",
-        (now,),
-    ).fetchall()
+async def ablacklist_remove(forum_shortname: str, blacklist_ids: list[str]):
+    return await OUTBOUND.submit(MODERATION, "unban", blacklist_remove, forum_shortname, list(blacklist_ids))
 
-    for blacklist_id, due_unix in rows:
-        try:
-            blacklist_remove_by_id(str(blacklist_id))
-            mark_unbanned_in_log(con, str(blacklist_id), now)
-            log(f"{ts()} UNBANNED blacklist_id={blacklist_id}")
-            con.execute("DELETE FROM pending_unbans WHERE blacklist_id = ?", (str(blacklist_id),))
-            con.commit()
-        except Exception as e:
-            log(f"{ts()} UNBAN failed blacklist_id={blacklist_id}: {e}")
+
+# Timed unbans of all forums: heap of due times, loaded from each forum's pending_unbans in run_bot()
+UNBANS = UnbanScheduler(
+    ablacklist_remove,
+    lambda con, blacklist_id, unix: mark_unbanned_in_log(con, blacklist_id, unix),
+    batch_max=UNBAN_BATCH_MAX,
+    log=log_ts,
+)
+
+
+def schedule_unban(con, blacklist_id: str, due_unix: int):
+    UNBANS.schedule(con, blacklist_id, due_unix)
 
 
 # -------------------------
 # Ban log + report
 # -------------------------
-def _fmt_secs(secs: int) -> str:
-    secs = int(secs)
-    if secs < 0:
-        secs = 0
-    d, rem = divmod(secs, 86400)
-    h, rem = divmod(rem, 3600)
-    m, s = divmod(rem, 60)
-    if d:
-        return f"{d}d{h:02}h{m:02}m{s:02}s"
-    if h:
-        return f"{h}h{m:02}m{s:02}s"
-    if m:
-        return f"{m}m{s:02}s"
-    return f"{s}s"
-
-
 def extract_ban_subjects_user_only(resp: dict) -> list[dict]:
     out = []
     updated = (resp or {}).get("updated") or []
@@ -583,6 +570,9 @@ def log_ban_event(
         ),
     )
     con.commit()
+    con.after_commit(
+        lambda: con.ban_report.add(blacklist_id, subject_type, subject_label, started_at_unix, duration_secs, due_unix)
+    )
 
 
 def mark_unbanned_in_log(con, blacklist_id: str, unbanned_at_unix: int):
@@ -591,61 +581,19 @@ def mark_unbanned_in_log(con, blacklist_id: str, unbanned_at_unix: int):
         (int(unbanned_at_unix), str(blacklist_id)),
     )
     con.commit()
+    con.after_commit(lambda: con.ban_report.mark_unbanned(blacklist_id, unbanned_at_unix))
 
 
 def build_ban_report_last24h(con, now_unix: int, limit: int = 15) -> str:
-    since = int(now_unix) - 86400
-    rows = con.execute(
-        """
-        SELECT subject_label, started_at_unix, duration_secs, due_unix, unbanned_at_unix
-        FROM bans_log
-        WHERE started_at_unix >= ?
-          AND subject_type = 'user'
-        ORDER BY started_at_unix DESC
-        """,
-        (since,),
-    ).fetchall()
-
-    if not rows:
-        return "Bans letzte 24h (Bot-Log):\n- (keine)"
-
-    lines = ["Bans letzte 24h (Bot-Log):"]
-    shown = 0
-
-    for (label, started, dur, due, unbanned) in rows:
-        if shown >= limit:
-            break
-
-        started = int(started)
-        if dur is None and due is None:
-            if unbanned:
-                banned_for = int(unbanned) - started
-                line = f"- {label} — WAR gebannt {_fmt_secs(banned_for)}"
-            else:
-                line = f"- {label} — AKTIV PERM (seit {_fmt_secs(now_unix - started)})"
-        else:
-            if unbanned:
-                banned_for = int(unbanned) - started
-                line = f"- {label} — WAR gebannt {_fmt_secs(banned_for)}"
-            else:
-                if due and now_unix < int(due):
-                    rest = int(due) - now_unix
-                    line = f"- {label} — AKTIV REST {_fmt_secs(rest)} (seit {_fmt_secs(now_unix - started)})"
-                elif due and now_unix >= int(due):
-                    overdue = now_unix - int(due)
-                    line = f"- {label} — FÄLLIG seit {_fmt_secs(overdue)}"
-
-        lines.append(line)
-        shown += 1
-
-    return "\n".join(lines)
+    """Rendered from con.ban_report (newest first, stops after `limit` rows), no bans_log scan."""
+    return con.ban_report.render(now_unix, limit=limit)
 
 
-def post_ban_report(con, thread_id: str, now_unix: int, log=print):
+async def post_ban_report(con, thread_id: str, now_unix: int, log=print):
     report = build_ban_report_last24h(con, now_unix=now_unix, limit=15)
     msg = ensure_not_duplicate(con, thread_id, report)
     try:
-        create_root_post_and_like(con, thread_id, msg, log=log)
+        await create_root_post_and_like(con, thread_id, msg, log=log, priority=MODERATION)
         log(f"{ts()} BAN-REPORT posted thread_id={thread_id}")
     except Exception as e:
         log(f"{ts()} BAN-REPORT failed thread_id={thread_id}: {e}")
@@ -654,20 +602,37 @@ def post_ban_report(con, thread_id: str, now_unix: int, log=print):
 # -------------------------
 # NEW THREAD WELCOME
 # -------------------------
-def tick_new_threads_and_welcome(con, start_unix: int, log=print):
-    now_unix = int(time.time())
-    last_poll = int(kv_get(con, "last_thread_poll_unix") or "0")
-    if now_unix - last_poll < THREAD_POLL_SECONDS:
-        return
+async def post_welcome(con, thread_id: str, welcome_msg: str, log=print):
+    try:
+        await create_root_post_and_like(con, thread_id, welcome_msg, log=log)
+        kv_set(con, f"welcomed::{thread_id}", "1")
+        mark_seen_thread(con, thread_id)
+        log(f"{ts()} WELCOME posted thread_id={thread_id}")
+    except Exception as e:
+        s = str(e).lower()
+        if "thread" in s and "closed" in s:
+            kv_set(con, f"welcomed::{thread_id}", "1")
+            mark_seen_thread(con, thread_id)
+        else:
+            log(f"{ts()} WELCOME error thread_id={thread_id}: {e}")
 
-    kv_set(con, "last_thread_poll_unix", str(now_unix))
+
+async def tick_new_threads_and_welcome(con, start_unix: int, log=print, spawn=None, welcoming=None) -> int | None:
+    """
+    Poll recent threads once and welcome new ones.
+    With spawn(thread_id, coro) the welcomes are posted in the background;
+    threads in `welcoming` (welcome still queued) are skipped.
+    Returns number of unseen threads found, or None if the poll failed.
+    """
+    kv_set(con, "last_thread_poll_unix", str(int(time.time())))
 
     try:
-        threads = list_forum_recent_threads(DISQUS_FORUM_SHORTNAME, THREAD_LIMIT)
+        threads = await alist_forum_recent_threads(con.forum, THREAD_LIMIT)
     except Exception as e:
-        log(f"{ts()} THREADS poll error: {e}")
-        return
+        log(f"{ts()} THREADS poll error forum={con.forum}: {e}")
+        return None
 
+    unseen = 0
     new_count = 0
 
     for th in reversed(threads):
@@ -675,9 +640,10 @@ def tick_new_threads_and_welcome(con, start_unix: int, log=print):
         if not thread_id:
             continue
 
-        if seen_thread(con, thread_id):
+        if seen_thread(con, thread_id) or (welcoming and thread_id in welcoming):
             continue
 
+        unseen += 1
         created_u = created_at_to_unix(th.get("createdAt"))
         if not WELCOME_EXISTING:
             if created_u is not None and created_u < start_unix:
@@ -696,253 +662,479 @@ def tick_new_threads_and_welcome(con, start_unix: int, log=print):
         welcome_text = WELCOME_TEXT.replace("{HEX}", random_hex6())
         welcome_msg = ensure_not_duplicate(con, thread_id, welcome_text)
 
-        try:
-            create_root_post_and_like(con, thread_id, welcome_msg, log=log)
-            kv_set(con, welcome_key, "1")
-            mark_seen_thread(con, thread_id)
-            new_count += 1
-            log(f"{ts()} WELCOME posted thread_id={thread_id}")
-            time.sleep(0.2)
-        except Exception as e:
-            s = str(e).lower()
-            if "thread" in s and "closed" in s:
-                kv_set(con, welcome_key, "1")
-                mark_seen_thread(con, thread_id)
-            else:
-                log(f"{ts()} WELCOME error thread_id={thread_id}: {e}")
+        welcome = post_welcome(con, thread_id, welcome_msg, log=log)
+        if spawn is not None:
+            spawn(thread_id, welcome)
+        else:
+            await welcome
+        new_count += 1
 
     if new_count:
         log(f"{ts()} THREADS scanned={len(threads)} new_welcomes={new_count}")
 
+    return unseen
+
+
+
 
 # -------------------------
-# MAIN
+# POST HANDLING
 # -------------------------
-def main():
-    con = db_init()
-    ensure_pending_unbans_schema(con)
+async def handle_ban_command(rt, p: dict, post_id: str, thread_id: str, response: str):
+    """Checks the issuing moderator and the target, then hands the ban to rt.bans."""
+    raw_arg = response.split(":", 1)[1].strip()
+
+    secs = 0
+    is_perm = False
+
+    if raw_arg.upper() == "PERM":
+        is_perm = True
+    else:
+        try:
+            secs = int(raw_arg)
+            if secs <= 0:
+                secs = 0
+        except Exception:
+            secs = 0
+
+    author = p.get("author") or {}
+    author_username = (author.get("username") or "").strip().lower()
+    author_id = str(author.get("id") or "").strip()
+
+    if not rt.mods.is_moderator(author_id, author_username) and rt.mods.allow_forced_refresh():
+        # maybe a new moderator: refresh once (rate limited) before rejecting
+        print(f"{ts()} BAN: author id={author_id} not in moderator cache, forcing refresh")
+        await rt.refresh_mods()
+
+    if not rt.mods.is_moderator(author_id, author_username):
+        print(f"{ts()} BAN ignored: author is not a forum moderator (id={author_id} username={author_username})")
+        return
+
+    target_post_id = str(p.get("parent") or "").strip()
+    if not target_post_id:
+        print(f"{ts()} BAN ignored: no parent post found (reply 'ban' to target comment).")
+        return
+
+    rt.bans.request(
+        {
+            "post_id": post_id,
+            "thread_id": thread_id,
+            "target_post_id": target_post_id,
+            "secs": secs,
+            "is_perm": is_perm,
+        }
+    )
+
+
+def make_ban_pipeline(mods: ModeratorRegistry, me_id: str, me_username: str) -> BanPipeline:
+    """Bot wiring of the ban pipeline: index-first lookups, outbound bans, per-thread confirmation."""
+
+    def protected(target_post: dict) -> str | None:
+        target_author = target_post.get("author") or {}
+        target_author_username = (target_author.get("username") or "").strip().lower()
+        target_author_id = str(target_author.get("id") or "").strip()
+        if (me_id and target_author_id == me_id) or (me_username and target_author_username == me_username.lower()):
+            return "target is bot itself"
+        if mods.is_moderator(target_author_id, target_author_username):
+            return "target is a forum moderator"
+        return None
+
+    async def ban(target_post_id: str) -> list[dict]:
+        resp = await aban_post_author_permanent(
+            target_post_id,
+            ban_user=True,
+            ban_email=False,
+            ban_ip=False,
+            shadow_ban=False,
+        )
+        return extract_ban_subjects_user_only(resp)
+
+    def record(con, req: dict, subjects: list[dict], started: int):
+        secs = req["secs"] if (req["secs"] > 0 and not req["is_perm"]) else None
+        due = (started + secs) if secs else None
+        for s in subjects:
+            if due:
+                schedule_unban(con, s["blacklist_id"], due)
+            log_ban_event(
+                con,
+                blacklist_id=s["blacklist_id"],
+                thread_id=req["thread_id"],
+                ban_cmd_post_id=req["post_id"],
+                target_post_id=req["target_post_id"],
+                subject_type="user",
+                subject_label=s["subject_label"],
+                started_at_unix=started,
+                duration_secs=secs,
+                due_unix=due,
+            )
+
+    async def confirm(con, thread_id: str, done: list):
+        # one reply (to the latest ban command of the thread) and one report for the whole batch
+        confirm_txt = "OK." if len(done) == 1 else f"OK. {len(done)} Bans."
+        confirm_msg = ensure_not_duplicate(con, thread_id, confirm_txt)
+        bot_post_id = await safe_reply(con, thread_id, done[-1][0]["post_id"], confirm_msg, priority=MODERATION)
+        if bot_post_id:
+            like_own_post_if_needed(con, bot_post_id)
+        await post_ban_report(con, thread_id=thread_id, now_unix=int(time.time()), log=print)
+
+    return BanPipeline(
+        lambda target_post_id: POST_INDEX.lookup(target_post_id, aget_post_details),
+        protected,
+        ban,
+        record,
+        confirm,
+        window_s=BAN_BATCH_WINDOW_SECONDS,
+        log=log_ts,
+    )
+
+
+async def handle_command_result(rt, p: dict, post_id: str, thread_id: str, text: str, response: str | None):
+    """Posts the reply for one dispatched command (chained after earlier replies in the thread)."""
+    con = rt.con
+    try:
+        if dbg_trigger(text):
+            print(f"{ts()} DISPATCH post_id={post_id} -> {response!r}")
+
+        # MODS marker
+        if response == "__MODS__":
+            msg = rt.mods.bullets
+            safe_msg = ensure_not_duplicate(con, thread_id, msg)
+            bot_post_id = await safe_reply(con, thread_id, post_id, safe_msg)
+            if bot_post_id:
+                like_own_post_if_needed(con, bot_post_id)
+            return
+
+        # BAN marker
+        if response and response.startswith("__BAN__:"):
+            await handle_ban_command(rt, p, post_id, thread_id, response)
+            return
+
+        # normal reply
+        bot_post_id = None
+        did_reply = False
+
+        if response:
+            safe_msg = ensure_not_duplicate(con, thread_id, response)
+            bot_post_id = await safe_reply(con, thread_id, post_id, safe_msg)
+            if bot_post_id:
+                did_reply = True
+                like_own_post_if_needed(con, bot_post_id)
+                print(f"{ts()} Replied post_id={post_id} (bot_post_id={bot_post_id})")
+
+        if did_reply or should_like(text):
+            like_parent_post(con, post_id)
+
+    except Exception as e:
+        print(f"{ts()} Error post_id={post_id}: {e}")
+
+
+# -------------------------
+# RUNTIME (asyncio)
+# -------------------------
+class Runtime:
+    """State of one forum, shared by its jobs and handlers (all on the event loop thread)."""
+
+    def __init__(self, forum: str, con, me_id: str, me_username: str, start_unix: int, commands: KeyedCommandPool):
+        self.forum = forum
+        self.con = con
+        self.me_id = me_id
+        self.me_username = me_username
+        self.start_unix = start_unix
+        self.ingest = init_ingest_state(con, kv_get, kv_set, start_unix, log=log_ts)
+        self.fetch_posts_page = functools.partial(list_forum_posts_since, forum)
+        self.post_tasks = set()
+        self.welcoming = set()  # thread ids whose welcome is still in the write queue
+
+        # Command handlers run on the shared pool; results come back per thread in order
+        self.commands = commands
+        self.reply_chains = {}  # thread_id -> last reply task of that thread
+
+        self.mods = load_mod_registry(con)
+        self._mods_refresh = None
+        self.bans = make_ban_pipeline(self.mods, me_id, me_username)
+        self.bans.load_recent(con, int(time.time()))
+
+        self.post_poll = AdaptivePollInterval(f"posts/{forum}", POLL_MIN_SECONDS, POLL_MAX_SECONDS, start_s=POLL_SECONDS, log=log_ts)
+        self.thread_poll = AdaptivePollInterval(f"threads/{forum}", THREAD_POLL_SECONDS, THREAD_POLL_MAX_SECONDS, log=log_ts)
+        self.next_hourly_post_unix = init_hourly_schedule(con, kv_get, kv_set, log=print)
+
+    async def refresh_mods(self) -> bool:
+        """Refresh the moderator registry; concurrent callers share one request."""
+        if self._mods_refresh is None or self._mods_refresh.done():
+            self._mods_refresh = asyncio.create_task(refresh_mod_registry(self.con, self.mods, log=print))
+        return await asyncio.shield(self._mods_refresh)
+
+    def spawn_post_task(self, coro):
+        task = asyncio.create_task(coro)
+        self.post_tasks.add(task)
+        task.add_done_callback(self.post_tasks.discard)
+        return task
+
+    def spawn_welcome(self, thread_id: str, coro):
+        self.welcoming.add(thread_id)
+        task = self.spawn_post_task(coro)
+        task.add_done_callback(lambda _t: self.welcoming.discard(thread_id))
+        return task
+
+    def chain_reply(self, thread_id: str, coro):
+        """Run coro after the previous reply task of the same thread finished."""
+        prev = self.reply_chains.get(thread_id)
+        task = self.spawn_post_task(_after(prev, coro))
+        self.reply_chains[thread_id] = task
+
+        def _cleanup(t):
+            if self.reply_chains.get(thread_id) is t:
+                del self.reply_chains[thread_id]
+
+        task.add_done_callback(_cleanup)
+        return task
+
+
+async def _after(prev, coro):
+    if prev is not None:
+        await asyncio.wait([prev])
+    await coro
+
 
-    print(f"{ts()} ForumShortname={DISQUS_FORUM_SHORTNAME} | Poll={POLL_SECONDS}s | Limit={POST_LIMIT}")
-    print(f"{ts()} ThreadPoll={THREAD_POLL_SECONDS}s | ThreadLimit={THREAD_LIMIT} | WelcomeExisting={WELCOME_EXISTING}")
+# -------------------------
+# PER-FORUM JOBS (run by the FairScheduler, each returns the delay until its next run)
+# -------------------------
+# Jobs never wait for the outbound queue: welcomes and hourly posts are
+# spawned as post tasks, so a BACKGROUND write waiting behind replies does
+# not hold a scheduler slot that other forums' post polls need.
+async def poll_posts(rt: Runtime) -> float:
+    con = rt.con
+    new_posts = 0
+    pages = 1
+    pause = 0.0
+
+    try:
+        posts, pages = await asyncio.to_thread(fetch_new_posts, rt.ingest, rt.fetch_posts_page, POST_LIMIT, log_ts)
+        POST_INDEX.add_many(posts)
+
+        jobs = []
+        own_posts = []
+
+        # One transaction for the whole batch; work is handed out after commit.
+        # A rollback also undoes the in-memory seen / kv / high-water-mark moves,
+        # so the next poll fetches and dispatches the batch again.
+        with con.batch():
+            con.on_rollback(functools.partial(rt.ingest.update, dict(rt.ingest)))
+            for p in posts:
+                post_id = str(p.get("id", "")).strip()
+                if not post_id or seen_post(con, post_id):
+                    continue
+
+                created_u = created_at_to_unix(p.get("createdAt"))
+                advance_high_water_mark(con, rt.ingest, created_u, post_id, kv_set)
+
+                mark_seen_post(con, post_id, created_u)
+                new_posts += 1
+
+                if p.get("isSpam") or p.get("isDeleted"):
+                    continue
+
+                thread_id = get_thread_id_from_post(p)
+                if not thread_id:
+                    continue
+
+                kv_set(con, "last_seen_thread_id", thread_id)
+
+                if is_own_post(p, me_id=rt.me_id, me_username=rt.me_username):
+                    own_posts.append(post_id)
+                    continue
+
+                text = normalize_post_text(p.get("message", ""))
+
+                if dbg_trigger(text):
+                    print(f"{ts()} SEEN forum={rt.forum} post_id={post_id} thread_id={thread_id} text={text!r}")
+
+                jobs.append((thread_id, (rt, p, post_id, thread_id, text)))
+
+            # kv writes of the last iteration (replies, welcomes, ...) go into this commit too
+            flush_kv(con)
+
+        for thread_id, meta in jobs:
+            rt.commands.submit(thread_id, dispatch_command, meta[4], meta=meta)
+        for post_id in own_posts:
+            like_own_post_if_needed(con, post_id)
+        LIKES.kick()
+
+    except Exception as e:
+        print(f"{ts()} Error forum={rt.forum}: {e}")
+        pause = 5.0
+
+    # every forum polls on the same token: this poll's own listPosts calls, scaled once by the forum count
+    return pause + rt.post_poll.update(new_posts, rate_limit=_RATELIMIT, calls_per_cycle=pages * len(FORUMS))
+
+
+async def poll_threads(rt: Runtime) -> float:
+    new_threads = await tick_new_threads_and_welcome(
+        rt.con, rt.start_unix, log=print, spawn=rt.spawn_welcome, welcoming=rt.welcoming
+    )
+    return rt.thread_poll.update(new_threads or 0, rate_limit=_RATELIMIT, calls_per_cycle=len(FORUMS))
+
+
+async def hourly_post(rt: Runtime) -> float:
+    con = rt.con
+    rt.next_hourly_post_unix = await tick_hourly_posts(
+        con=con,
+        next_hourly_post_unix=rt.next_hourly_post_unix,
+        kv_set=kv_set,
+        get_default_thread_id=lambda _con: (kv_get(_con, "last_seen_thread_id") or "").strip() or None,
+        ensure_not_duplicate=ensure_not_duplicate,
+        create_root_post=lambda thread_id, msg: create_root_post_and_like(con, thread_id, msg, log=print),
+        log=print,
+        spawn=rt.spawn_post_task,
+    )
+    return min(60, max(1, rt.next_hourly_post_unix - int(time.time())))
+
+
+async def refresh_stale_mods(rt: Runtime) -> float:
+    """Refreshes the moderator registry in the background once it goes stale."""
+    if rt.mods.stale():
+        await rt.refresh_mods()
+    # after a failed refresh the registry stays stale -> retry in 60s
+    return max(60.0, rt.mods.seconds_until_stale())
+
+
+async def prune_state(rt: Runtime) -> float:
+    try:
+        prune_seen(rt.con, rt.ingest["since_unix"], log=log_ts)
+    except Exception as e:
+        print(f"{ts()} DB PRUNE failed forum={rt.forum}: {e}")
+    return SEEN_PRUNE_SECONDS
+
+
+async def run_backfill_chunk(rt: Runtime) -> float | None:
+    """Online backfills registered by schema migrations, one chunk per run until done (then dropped)."""
+    try:
+        n = run_backfills(rt.con, chunk=BACKFILL_CHUNK, log=log_ts)
+    except Exception as e:
+        print(f"{ts()} DB BACKFILL failed forum={rt.forum}: {e}")
+        return 60
+    return BACKFILL_PAUSE_SECONDS if n else None
+
+
+def schedule_forum_jobs(sched: FairScheduler, rt: Runtime):
+    sched.add(rt.forum, "posts", lambda: poll_posts(rt))
+    sched.add(rt.forum, "threads", lambda: poll_threads(rt))
+    sched.add(rt.forum, "hourly", lambda: hourly_post(rt))
+    sched.add(rt.forum, "mods", lambda: refresh_stale_mods(rt), delay_s=max(60.0, rt.mods.seconds_until_stale()))
+    sched.add(rt.forum, "prune", lambda: prune_state(rt))
+    sched.add(rt.forum, "backfill", lambda: run_backfill_chunk(rt))
+
+
+# -------------------------
+# SHARED TASKS
+# -------------------------
+async def reply_task(commands: KeyedCommandPool, results_ready: asyncio.Event):
+    """Collects finished command results (all forums) and posts the replies."""
+    while True:
+        await results_ready.wait()
+        results_ready.clear()
+
+        for thread_id, meta, response, err in commands.collect():
+            rt, p, post_id, _, text = meta
+            if err is not None:
+                print(f"{ts()} Error forum={rt.forum} post_id={post_id}: {err}")
+                continue
+            rt.chain_reply(thread_id, handle_command_result(rt, p, post_id, thread_id, text, response))
+
+
+async def stats_task(runtimes: list[Runtime], commands: KeyedCommandPool, sched: FairScheduler):
+    while HTTP_STATS_LOG_SECONDS > 0:
+        await asyncio.sleep(HTTP_STATS_LOG_SECONDS)
+        print(f"{ts()} HTTP stats:\n{DISQUS_HTTP.format_stats()}")
+        print(f"{ts()} COMMAND pool: {commands.format_stats()}")
+        print(f"{ts()} SCHEDULER {sched.format_stats()}")
+        for rt in runtimes:
+            print(f"{ts()} [{rt.forum}] KV {rt.con.kv_cache.format_stats()}")
+            for seen_set in rt.con.seen.values():
+                print(f"{ts()} [{rt.forum}] SEEN {seen_set.format_stats()}")
+            print(f"{ts()} [{rt.forum}] BANS {rt.bans.format_stats()}")
+        print(f"{ts()} WEATHER cache: {weather_cache.format_stats()}")
+        print(f"{ts()} LLM cache: {llm_groq.CACHE.format_stats()}")
+        print(f"{ts()} JOKES {JOKES.format_stats()}")
+        print(f"{ts()} BREAKERS:\n{BREAKERS.format_stats()}")
+        print(f"{ts()} COMMAND latency:\n{COMMAND_LATENCY.format_stats()}")
+        print(f"{ts()} OUTBOUND {OUTBOUND.format_stats()}")
+        print(f"{ts()} LIKES {LIKES.format_stats()}")
+        print(f"{ts()} UNBANS {UNBANS.format_stats()}")
+        print(f"{ts()} POST index: {POST_INDEX.format_stats()}")
+
+
+# -------------------------
+# MAIN
+# -------------------------
+async def run_bot():
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="io"))
+
+    # one state DB per forum; HTTP pool, I/O threads, command pool and write queue are shared
+    cons = {}
+    for i, forum in enumerate(FORUMS):
+        con = db_init(forum_db_path(forum, primary=(i == 0)), forum=forum, log=log_ts)
+        UNBANS.load(con)
+        cons[forum] = con
+
+    print(f"{ts()} Forums={','.join(FORUMS)} | Poll={POLL_SECONDS}s ({POLL_MIN_SECONDS}-{POLL_MAX_SECONDS}s) | Limit={POST_LIMIT}")
+    print(f"{ts()} ThreadPoll={THREAD_POLL_SECONDS}-{THREAD_POLL_MAX_SECONDS}s | ThreadLimit={THREAD_LIMIT} | WelcomeExisting={WELCOME_EXISTING}")
     print(f"{ts()} Bot running. Ctrl+C to stop.")
 
-    me = whoami()
+    me = await awhoami()
     me_id = str(me.get("id") or "").strip()
     me_username = str(me.get("username") or "").strip()
     print(f"{ts()} AUTH user={me_username} id={me_id}")
 
-    start_unix = int(datetime.now(timezone.utc).timestamp())
-    kv_set(con, "start_unix", str(start_unix))
-
-    refresh_mod_cache_if_needed(con, force=True, log=print)
+    BREAKERS.log = log_ts
+    JOKES.prefetch()
 
-    next_hourly_post_unix = init_hourly_schedule(con, kv_get, kv_set, log=print)
+    start_unix = int(datetime.now(timezone.utc).timestamp())
 
+    results_ready = asyncio.Event()
+    commands = KeyedCommandPool(
+        COMMAND_WORKERS,
+        on_done=lambda: loop.call_soon_threadsafe(results_ready.set),
+    )
+    sched = FairScheduler(FORUM_JOB_CONCURRENCY, log=log_ts)
+
+    runtimes = []
+    for forum, con in cons.items():
+        kv_set(con, "start_unix", str(start_unix))
+        rt = Runtime(forum, con, me_id, me_username, start_unix, commands)
+        await rt.refresh_mods()
+        schedule_forum_jobs(sched, rt)
+        runtimes.append(rt)
+
+    # SIGTERM -> cancel like Ctrl+C so the finally below still flushes state
+    main_task = asyncio.current_task()
     try:
-        while True:
-            refresh_mod_cache_if_needed(con, force=False, log=print)
-
-            tick_new_threads_and_welcome(con, start_unix, log=print)
-
-            try:
-                posts = list_forum_recent_posts(DISQUS_FORUM_SHORTNAME, POST_LIMIT)
-
-                for p in reversed(posts):
-                    post_id = str(p.get("id", "")).strip()
-                    if not post_id or seen_post(con, post_id):
-                        continue
-
-                    created_u = created_at_to_unix(p.get("createdAt"))
-                    if created_u is not None and created_u < start_unix:
-                        mark_seen_post(con, post_id)
-                        continue
-
-                    mark_seen_post(con, post_id)
-
-                    if p.get("isSpam") or p.get("isDeleted"):
-                        continue
-
-                    thread_id = get_thread_id_from_post(p)
-                    if not thread_id:
-                        continue
-
-                    kv_set(con, "last_seen_thread_id", thread_id)
-
-                    if is_own_post(p, me_id=me_id, me_username=me_username):
-                        like_own_post_if_needed(con, post_id, log=print)
-                        continue
-
-                    raw = p.get("message", "") or ""
-                    text = strip_html(raw).replace("\u00a0", " ")
-                    text = " ".join(text.split())
-
-                    if dbg_trigger(text):
-                        print(f"{ts()} SEEN post_id={post_id} thread_id={thread_id} text={text!r}")
-
-                    response = dispatch_command(text)
-
-                    if dbg_trigger(text):
-                        print(f"{ts()} DISPATCH post_id={post_id} -> {response!r}")
-
-                    # MODS marker
-                    if response == "__MODS__":
-                        msg = format_mods_bullets_display_names_only(con)
-                        safe_msg = ensure_not_duplicate(con, thread_id, msg)
-                        bot_post_id = safe_reply(con, thread_id, post_id, safe_msg)
-                        if bot_post_id:
-                            like_own_post_if_needed(con, bot_post_id, log=print)
-                        continue
-
-                    # BAN marker
-                    if response and response.startswith("__BAN__:"):
-                        raw_arg = response.split(":", 1)[1].strip()
-
-                        secs = 0
-                        is_perm = False
-
-                        if raw_arg.upper() == "PERM":
-                            is_perm = True
-                        else:
-                            try:
-                                secs = int(raw_arg)
-                                if secs <= 0:
-                                    secs = 0
-                            except Exception:
-                                secs = 0
-
-                        author = p.get("author") or {}
-                        author_username = (author.get("username") or "").strip().lower()
-                        author_id = str(author.get("id") or "").strip()
-
-                        if not is_moderator(con, author_id=author_id, author_username=author_username):
-                            print(f"{ts()} BAN ignored: author is not a forum moderator (id={author_id} username={author_username})")
-                            continue
-
-                        target_post_id = str(p.get("parent") or "").strip()
-                        if not target_post_id:
-                            print(f"{ts()} BAN ignored: no parent post found (reply 'ban' to target comment).")
-                            continue
-
-                        try:
-                            target_post = get_post_details(target_post_id)
-                        except Exception as e:
-                            print(f"{ts()} BAN ignored: cannot fetch target post {target_post_id}: {e}")
-                            continue
-
-                        target_author = (target_post or {}).get("author") or {}
-                        target_author_username = (target_author.get("username") or "").strip().lower()
-                        target_author_id = str(target_author.get("id") or "").strip()
-
-                        if (me_id and target_author_id == me_id) or (me_username and target_author_username == me_username.lower()):
-                            print(f"{ts()} BAN ignored: target is bot itself")
-                            continue
-
-                        if is_moderator(con, author_id=target_author_id, author_username=target_author_username):
-                            print(f"{ts()} BAN ignored: target is a forum moderator")
-                            continue
-
-                        last_ban_target = (kv_get(con, "last_ban_target_post_id") or "").strip()
-                        last_ban_ts = int(kv_get(con, "last_ban_unix") or "0")
-                        now_unix = int(time.time())
-                        if last_ban_target == target_post_id and (now_unix - last_ban_ts) < 60:
-                            print(f"{ts()} BAN ignored: duplicate target within 60s target_post_id={target_post_id}")
-                            continue
-
-                        try:
-                            started = int(time.time())
-
-                            resp = ban_post_author_permanent(
-                                target_post_id,
-                                ban_user=True,
-                                ban_email=False,
-                                ban_ip=False,
-                                shadow_ban=False,
-                            )
-
-                            subjects = extract_ban_subjects_user_only(resp)
-                            if not subjects:
-                                print(f"{ts()} BAN ignored: no user blacklist entry returned")
-                                continue
-
-                            due = (started + secs) if (secs > 0 and not is_perm) else None
-
-                            if secs > 0 and not is_perm and due is not None:
-                                for s in subjects:
-                                    schedule_unban(con, s["blacklist_id"], int(due))
-
-                            for s in subjects:
-                                log_ban_event(
-                                    con,
-                                    blacklist_id=s["blacklist_id"],
-                                    thread_id=thread_id,
-                                    ban_cmd_post_id=post_id,
-                                    target_post_id=target_post_id,
-                                    subject_type="user",
-                                    subject_label=s["subject_label"],
-                                    started_at_unix=started,
-                                    duration_secs=(secs if (secs > 0 and not is_perm) else None),
-                                    due_unix=(int(due) if due else None),
-                                )
-
-                            confirm_txt = "OK."
-                            confirm = ensure_not_duplicate(con, thread_id, confirm_txt)
-                            bot_post_id = safe_reply(con, thread_id, post_id, confirm)
-                            if bot_post_id:
-                                like_own_post_if_needed(con, bot_post_id, log=print)
-
-                            post_ban_report(con, thread_id=thread_id, now_unix=int(time.time()), log=print)
-
-                            kv_set(con, "last_ban_target_post_id", target_post_id)
-                            kv_set(con, "last_ban_unix", str(int(time.time())))
-
-                            print(f"{ts()} BAN done target_post_id={target_post_id} secs={'PERM' if (is_perm or secs == 0) else secs}")
-
-                        except Exception as e:
-                            print(f"{ts()} BAN failed target_post_id={target_post_id}: {e}")
-
-                        continue
-
-                    # normal reply
-                    bot_post_id = None
-                    did_reply = False
-
-                    if response:
-                        safe_msg = ensure_not_duplicate(con, thread_id, response)
-                        bot_post_id = safe_reply(con, thread_id, post_id, safe_msg)
-                        if bot_post_id:
-                            did_reply = True
-                            like_own_post_if_needed(con, bot_post_id, log=print)
-                            print(f"{ts()} Replied post_id={post_id} (bot_post_id={bot_post_id})")
-                            time.sleep(0.2)
-
-                    if (did_reply or should_like(text)) and not liked(con, post_id):
-                        try:
-                            vote_post_like(post_id, vote=1)
-                            mark_liked(con, post_id)
-                            print(f"{ts()} Liked parent post_id={post_id}")
-                        except Exception as e:
-                            print(f"{ts()} Like failed parent post_id={post_id}: {e}")
-
-            except Exception as e:
-                print(f"{ts()} Error: {e}")
-                time.sleep(5)
-
-            next_hourly_post_unix = tick_hourly_posts(
-                con=con,
-                next_hourly_post_unix=next_hourly_post_unix,
-                kv_set=kv_set,
-                get_default_thread_id=lambda _con: (kv_get(_con, "last_seen_thread_id") or "").strip() or None,
-                ensure_not_duplicate=ensure_not_duplicate,
-                create_root_post=lambda thread_id, msg: create_root_post_and_like(con, thread_id, msg, log=print),
-                log=print,
-            )
+        loop.add_signal_handler(signal.SIGTERM, main_task.cancel)
+    except (NotImplementedError, AttributeError):
+        pass  # Windows
 
-            tick_unbans(con, log=print)
+    try:
+        await asyncio.gather(
+            OUTBOUND.run(),
+            LIKES.run(),
+            UNBANS.run(),
+            sched.run(),
+            reply_task(commands, results_ready),
+            *(rt.bans.run(rt.con) for rt in runtimes),
+            stats_task(runtimes, commands, sched),
+        )
+    finally:
+        for con in cons.values():
+            flush_kv(con)
 
-            time.sleep(POLL_SECONDS)
 
-    except KeyboardInterrupt:
+def main():
+    try:
+        asyncio.run(run_bot())
+    except (KeyboardInterrupt, asyncio.CancelledError):
         print(f"{ts()} Stopping...")
+        print(f"{ts()} HTTP stats:\n{DISQUS_HTTP.format_stats()}")
         return
 
 
@@ -1,40 +1,123 @@
-import requests
+import os
+import threading
+from collections import deque
+from urllib.parse import urlencode
 
+from utils.circuit_breaker import guarded_request
 
-def handle_joke() -> str:
+JOKE_API_URL = "https://v2.jokeapi.dev/joke/Any"
+JOKE_BLACKLIST_FLAGS = "nsfw,religious,political,racist,sexist,explicit"
+
+# Jokes kept in memory; a background refill starts below JOKE_BUFFER_LOW
+JOKE_BUFFER_SIZE = int(os.environ.get("JOKE_BUFFER_SIZE", "10"))
+JOKE_BUFFER_LOW = int(os.environ.get("JOKE_BUFFER_LOW", "3"))
+# Served joke ids remembered for dedupe
+JOKE_RECENT_MAX = int(os.environ.get("JOKE_RECENT_MAX", "30"))
+
+NO_JOKE_BUFFERED = "Kein Witz gefunden."
+
+
+def fetch_jokes(amount: int) -> list[tuple[int, str]]:
     """
-    Random German joke via JokeAPI.
-    Uses safe-mode + blacklistFlags to avoid NSFW/explicit content.
+    One JokeAPI request for up to 10 German jokes (safe-mode + blacklistFlags).
+    Returns [(joke id, text)].
     """
-    base = "https://v2.jokeapi.dev/joke/Any"
     params = {
         "lang": "de",
-        "blacklistFlags": "nsfw,religious,racist,sexist,explicit",
-        "format": "json",
+        "type": "single",
+        "blacklistFlags": JOKE_BLACKLIST_FLAGS,
+        "amount": max(1, min(10, int(amount))),
     }
+    # safe-mode is a bare flag without value
+    r = guarded_request("GET", f"{JOKE_API_URL}?{urlencode(params)}&safe-mode", timeout=10)
+    r.raise_for_status()
+    data = r.json()
+    if data.get("error"):
+        return []
+
+    items = data.get("jokes") if "jokes" in data else [data]
+    out = []
+    for item in items or []:
+        text = (item.get("joke") or "").strip()
+        if text:
+            out.append((int(item.get("id", -1)), text))
+    return out
+
+
+class JokeBuffer:
+    """
+    Small ring buffer of prefetched jokes.
+    take() never blocks on the network: it pops from memory and starts a
+    background refill (one batched request) when the buffer runs low.
+    Jokes served recently are skipped on refill as long as there are others.
+    """
 
-    try:
-        r = requests.get(base, params=params, timeout=10)
-        url = r.url
-        if "safe-mode" not in url:
-            url = url + "&safe-mode"
-        r = requests.get(url, timeout=10)
-
-        data = r.json()
-        if data.get("error"):
-            return "Kein Witz gefunden."
-
-        t = data.get("type")
-        if t == "single":
-            return (data.get("joke") or "Kein Witz gefunden.").strip()
-
-        if t == "twopart":
-            setup = (data.get("setup") or "").strip()
-            delivery = (data.get("delivery") or "").strip()
-            if setup and delivery:
-                return f"{setup}\n{delivery}"
-            return setup or delivery or "Kein Witz gefunden."
-
-        return "Kein Witz gefunden."
-    except Exception:
-        return "Witz-API gerade nicht erreichbar."
+    def __init__(self, size: int = JOKE_BUFFER_SIZE, low: int = JOKE_BUFFER_LOW, recent_max: int = JOKE_RECENT_MAX,
+                 fetch=fetch_jokes):
+        self.size = max(1, int(size))
+        self.low = max(0, min(int(low), self.size - 1))
+        self._fetch = fetch
+        self._buf = deque()
+        self._recent = deque(maxlen=max(1, int(recent_max)))
+        self._lock = threading.Lock()
+        self._refilling = False
+        self.stats = {"served": 0, "empty": 0, "refills": 0, "refill_errors": 0, "fetched": 0, "duplicates": 0}
+
+    def take(self) -> str | None:
+        with self._lock:
+            item = self._buf.popleft() if self._buf else None
+            if item is None:
+                self.stats["empty"] += 1
+            else:
+                self.stats["served"] += 1
+                self._recent.append(item[0])
+        self.prefetch()
+        return item[1] if item else None
+
+    def prefetch(self):
+        """Starts a background refill if the buffer is low and none is running."""
+        with self._lock:
+            if self._refilling or len(self._buf) > self.low:
+                return
+            self._refilling = True
+        threading.Thread(target=self._refill, name="joke-prefetch", daemon=True).start()
+
+    def _refill(self):
+        try:
+            with self._lock:
+                want = self.size - len(self._buf)
+            fetched = self._fetch(want) if want > 0 else []
+            with self._lock:
+                self.stats["refills"] += 1
+                self.stats["fetched"] += len(fetched)
+                buffered = {jid for jid, _ in self._buf}
+                fresh = [j for j in fetched if j[0] not in buffered and j[0] not in self._recent]
+                if not fresh and not self._buf:
+                    # small pool: a repeat is better than no joke
+                    fresh = [j for j in fetched if j[0] not in buffered]
+                self.stats["duplicates"] += len(fetched) - len(fresh)
+                for j in fresh[: self.size - len(self._buf)]:
+                    self._buf.append(j)
+        except Exception:
+            with self._lock:
+                self.stats["refill_errors"] += 1
+        finally:
+            with self._lock:
+                self._refilling = False
+
+    def format_stats(self) -> str:
+        with self._lock:
+            st = dict(self.stats)
+            n = len(self._buf)
+        return (
+            f"buffered={n}/{self.size} served={st['served']} empty={st['empty']} refills={st['refills']} "
+            f"refill_err={st['refill_errors']} fetched={st['fetched']} dupes={st['duplicates']}"
+        )
+
+
+JOKES = JokeBuffer()
+
+
+def handle_joke() -> str:
+    """Random German joke from the prefetch buffer (no network on the request path)."""
+    return JOKES.take() or NO_JOKE_BUFFERED
@@ -1,13 +1,18 @@
-import requests
 from utils.llm_groq import groq_chat
+from utils.circuit_breaker import guarded_request, CircuitOpenError
+from utils.deadline import DeadlineExceeded
 
 
 def _duckduckgo_instant_answer(query: str) -> str:
-    r = requests.get(
-        "https://api.duckduckgo.com/",
-        params={"q": query, "format": "json", "no_redirect": 1, "no_html": 1},
-        timeout=20,
-    )
+    try:
+        r = guarded_request(
+            "GET",
+            "https://api.duckduckgo.com/",
+            params={"q": query, "format": "json", "no_redirect": 1, "no_html": 1},
+            timeout=20,
+        )
+    except (CircuitOpenError, DeadlineExceeded):
+        return ""
     r.raise_for_status()
     j = r.json()
 
@@ -1,12 +1,44 @@
+import os
 import re
+import time
 import random
-import requests
 
-from commands.weather import handle_weather
+from commands.weather import handle_weather, WEATHER_FALLBACK
 from commands.story_31gg import handle_story_31gg
 from commands.size import handle_size
 from commands.opinion import handle_opinion, handle_explain
 from commands.liebestest import handle_liebestest
+from commands.joke import handle_joke
+from utils.deadline import deadline, DeadlineExceeded
+from utils.latency import LatencyTracker
+
+
+def _parse_deadlines(spec: str) -> dict:
+    """Parses "llm=8,weather=4" into {"llm": 8.0, "weather": 4.0}."""
+    out = {}
+    for part in (spec or "").split(","):
+        name, _, value = part.partition("=")
+        if name.strip() and value.strip():
+            out[name.strip()] = float(value)
+    return out
+
+
+# Latency budget per command in seconds (0 = none); COMMAND_DEADLINES overrides single commands
+COMMAND_DEADLINE_SECONDS = float(os.environ.get("COMMAND_DEADLINE_SECONDS", "5"))
+COMMAND_DEADLINES = _parse_deadlines(os.environ.get("COMMAND_DEADLINES", ""))
+
+# Reply when a handler runs out of budget before it could fall back itself
+COMMAND_FALLBACKS = {
+    "weather": WEATHER_FALLBACK,
+    "llm": "LLM gerade nicht verfügbar (API/Quota/Key).",
+    "sag_any": "LLM gerade nicht verfügbar (API/Quota/Key).",
+}
+
+COMMAND_LATENCY = LatencyTracker()
+
+# Commands whose handlers call external APIs: only these run under a deadline
+# and are latency-tracked, the others are pure string work
+IO_COMMANDS = frozenset(("weather", "llm", "sag_any"))
 
 
 def _normalize(text: str) -> str:
@@ -48,50 +80,64 @@ TARGETED_FRONTS = [
 ]
 
 
-# --- general triggers without "bot" prefix ---
-P_TEST = re.compile(r"^test\b.*$", re.IGNORECASE)
-P_GREET = re.compile(r"^(moin|hallo|guten\s+morgen|hey)\b.*$", re.IGNORECASE)
+# --- command table, in match priority order: (name, pattern) ---
+# Patterns are anchored at the start of the normalized text. "ban" is the
+# only command matched anywhere in the text (".*?" prefix = search).
+COMMANDS = [
+    # general triggers without "bot" prefix
+    ("test", r"test\b.*$"),
+    ("greet", r"(?:moin|hallo|guten\s+morgen|hey)\b.*$"),
+
+    # bot commands
+    ("help_1", r"bot\s+sag\s+befehle\b.*$"),
+    ("help_2", r"bot\s+hilfe\b.*$"),
+    ("mods", r"bot\s+sag\s+mods\b.*$"),
 
-# --- bot commands ---
-P_HELP_1 = re.compile(r"^bot\s+sag\s+befehle\b.*$", re.IGNORECASE)
-P_HELP_2 = re.compile(r"^bot\s+hilfe\b.*$", re.IGNORECASE)
+    # BAN: "ban" or "ban 5m" or "ban 1h" etc.
+    ("ban", r".*?\bban(?:\s+(?P<ban_num>\d+)\s*(?P<ban_unit>[smhd]))?\b"),
 
-P_MODS = re.compile(r"^bot\s+sag\s+mods\b.*$", re.IGNORECASE)
+    ("joke_1", r"bot\s+sag\s+witz\b.*$"),
+    ("joke_2", r"bot\s+erzaehl(?:e)?(?:\s+mir)?(?:\s+einen)?\s+witz\b.*$"),
+    ("weather", r"bot\s+sag\s+wetter(?:\s+in)?\s+(?P<weather_city>.+)$"),
 
-P_WEATHER = re.compile(r"^bot\s+sag\s+wetter(?:\s+in)?\s+(.+)$", re.IGNORECASE)
+    # "bot sag front" OR "bot sag front an|zu|gegen <user>"
+    ("front", r"bot\s+sag\s+front(?:\s+(?P<front_mode>an|zu|gegen))?(?:\s+(?P<front_target>\S+))?(?:\s+.*)?$"),
 
-# "bot sag front" OR "bot sag front an|zu|gegen <user>"
-P_FRONT = re.compile(
-    r"^bot\s+sag\s+front(?:\s+(an|zu|gegen))?(?:\s+(\S+))?(?:\s+.*)?$",
-    re.IGNORECASE
-)
+    ("story_31gg", r"bot\s+erzaehl(?:e)?\s+mir\s+die\s+geschichte\s+von\s+31gg\s*$"),
+    ("size", r"bot\s+sag\s+schwanzl(?:aenge|ange)?\b.*$"),
 
-P_STORY_31GG = re.compile(
-    r"^bot\s+erzaehl(?:e)?\s+mir\s+die\s+geschichte\s+von\s+31gg\s*$",
-    re.IGNORECASE
-)
+    # liebestest: expects 2 args
+    ("liebestest", r"bot\s+sag\s+liebestest\b\s*(?P<liebestest_args>.*)$"),
 
-P_SIZE = re.compile(r"^bot\s+sag\s+schwanzl(?:aenge|ange)?\b.*$", re.IGNORECASE)
+    ("llm", (
+        r"bot\s+(?:"
+        r"(?:sag\s+)?erklaer(?:e)?|"
+        r"(?:sag\s+)?meinung\s+zu|"
+        r"was\s+sind|was\s+ist"
+        r")\s+(?P<llm_query>.+)$"
+    )),
 
-P_JOKE_1 = re.compile(r"^bot\s+sag\s+witz\b.*$", re.IGNORECASE)
-P_JOKE_2 = re.compile(r"^bot\s+erzaehl(?:e)?(?:\s+mir)?(?:\s+einen)?\s+witz\b.*$", re.IGNORECASE)
+    # fallback "bot sag <x>" -> explain
+    ("sag_any", r"bot\s+sag\s+(?P<sag_query>.+)$"),
+]
 
-# liebestest: expects 2 args
-P_LIEBESTEST = re.compile(r"^bot\s+sag\s+liebestest\b\s*(.*)$", re.IGNORECASE)
+# One regex for the whole table: alternatives are tried in list order at
+# position 0, so the first matching command wins exactly like a chain of
+# re.match calls. Each command is the outermost group of its alternative,
+# which makes m.lastgroup the command name.
+P_COMMAND = re.compile("|".join(f"(?P<{name}>{pat})" for name, pat in COMMANDS), re.IGNORECASE)
 
-# BAN: "ban" or "ban 5m" or "ban 1h" etc.
-P_BAN = re.compile(r"\bban(?:\s+(\d+)\s*([smhd]))?\b", re.IGNORECASE)
+# Named argument groups per command: only the matched command's groups are
+# read (m.groupdict() would build all of them on every match).
+COMMAND_ARGS = {name: tuple(re.compile(pat).groupindex) for name, pat in COMMANDS}
 
-P_LLM = re.compile(
-    r"^bot\s+(?:"
-    r"(?:sag\s+)?erklaer(?:e)?|"
-    r"(?:sag\s+)?meinung\s+zu|"
-    r"was\s+sind|was\s+ist"
-    r")\s+(.+)$",
-    re.IGNORECASE
-)
+# Every command except "ban" starts with one of these; text that has neither
+# a prefix nor "ban" in it is rejected without running the regex.
+COMMAND_PREFIXES = ("test", "moin", "hallo", "guten", "hey", "bot")
 
-P_SAG_ANY = re.compile(r"^bot\s+sag\s+(.+)$", re.IGNORECASE)
+# Non-ASCII letters that IGNORECASE matches against ASCII s / i (ſ -> s, ı -> i):
+# text containing them skips the prefix shortcut and goes through the regex.
+_FOLDING_CHARS = ("\u017f", "\u0131")
 
 
 def _help_text() -> str:
@@ -116,131 +162,139 @@ def _help_text() -> str:
     )
 
 
-def _fetch_random_joke_de() -> str:
+def match_command(text: str) -> tuple[str, dict, str] | None:
+    """
+    Returns (command name, named args, normalized text) or None.
+    Pure string work, no handler is called.
+    """
+    t = _normalize(text)
+    if not t:
+        return None
+    if not t.startswith(COMMAND_PREFIXES) and "ban" not in t:
+        if t.isascii() or not any(c in t for c in _FOLDING_CHARS):
+            return None
+
+    m = P_COMMAND.match(t)
+    if not m:
+        return None
+
+    name = m.lastgroup
+    args = {}
+    for k in COMMAND_ARGS[name]:
+        v = m.group(k)
+        if v is not None:
+            args[k] = v
+    return name, args, t
+
+
+def _cmd_ban(args: dict, t: str) -> str:
+    num = args.get("ban_num")
+    unit = args.get("ban_unit")
+
+    if not num or not unit:
+        return "__BAN__:PERM"
+
     try:
-        url = "https://v2.jokeapi.dev/joke/Any"
-        params = {
-            "lang": "de",
-            "type": "single",
-            "blacklistFlags": "nsfw,religious,political,racist,sexist,explicit",
-        }
-        r = requests.get(url, params=params, timeout=10)
-        data = r.json()
-        if data.get("error"):
-            return "Kein Witz gefunden."
-        joke = (data.get("joke") or "").strip()
-        return joke or "Kein Witz gefunden."
+        n = int(num)
     except Exception:
-        return "Kein Witz gefunden."
+        return "__BAN__:PERM"
 
+    unit = unit.lower()
+    mult = {"s": 1, "m": 60, "h": 3600, "d": 86400}.get(unit)
+    if not mult or n <= 0:
+        return "__BAN__:PERM"
 
-def dispatch_command(text: str) -> str | None:
-    t = _normalize(text)
-    if not t:
-        return None
+    return f"__BAN__:{n * mult}"
 
-    # general triggers first
-    if P_TEST.match(t):
-        return "bestanden."
-    if P_GREET.match(t):
-        return "moin"
 
-    # help
-    if P_HELP_1.match(t) or P_HELP_2.match(t):
-        return _help_text()
+def _cmd_front(args: dict, t: str) -> str:
+    mode = (args.get("front_mode") or "").strip().lower()   # an|zu|gegen or ""
+    target = (args.get("front_target") or "").strip()       # username or ""
 
-    # mods list -> handled in bot.py (Forum/listModerators)
-    if P_MODS.match(t):
-        return "__MODS__"
+    # Case 1: "bot sag front" -> generic front
+    if not mode and not target:
+        return random.choice(GENERIC_FRONTS)
 
-    # BAN marker (handled in bot.py)
-    m = P_BAN.search(t)
-    if m:
-        num = m.group(1)
-        unit = m.group(2)
-
-        if not num or not unit:
-            return "__BAN__:PERM"
-
-        try:
-            n = int(num)
-        except Exception:
-            return "__BAN__:PERM"
-
-        unit = unit.lower()
-        mult = {"s": 1, "m": 60, "h": 3600, "d": 86400}.get(unit)
-        if not mult or n <= 0:
-            return "__BAN__:PERM"
-
-        return f"__BAN__:{n * mult}"
-
-    # jokes
-    if P_JOKE_1.match(t) or P_JOKE_2.match(t):
-        return _fetch_random_joke_de()
-
-    # weather
-    m = P_WEATHER.match(t)
-    if m:
-        return handle_weather(m.group(1).strip())
-
-    # front (generic or targeted)
-    m = P_FRONT.match(t)
-    if m:
-        mode = (m.group(1) or "").strip().lower()   # an|zu|gegen or ""
-        target = (m.group(2) or "").strip()         # username or ""
-
-        # Case 1: "bot sag front" -> generic front
-        if not mode and not target:
-            return random.choice(GENERIC_FRONTS)
-
-        # Case 2: "bot sag front an|zu|gegen <user>" -> targeted front (ignore mode in output)
-        if mode and target:
-            name = _strip_trailing_punct(target).lstrip("@")
-            if not name:
-                return "Usage: bot sag front an|zu|gegen <user> oder nur: bot sag front"
-            tpl = random.choice(TARGETED_FRONTS)
-            return tpl.format(name=name)
-
-        return "Usage: bot sag front an|zu|gegen <user> oder nur: bot sag front"
-
-    # story
-    if P_STORY_31GG.match(t):
-        return handle_story_31gg()
-
-    # size
-    if P_SIZE.match(t):
-        return handle_size()
-
-    # liebestest (2 args)
-    m = P_LIEBESTEST.match(t)
-    if m:
-        payload = (m.group(1) or "").strip()
-
-        # allow separators: spaces, comma, +, & (keep it simple)
-        payload = payload.replace(",", " ").replace("+", " ").replace("&", " ")
-        parts = [p for p in payload.split() if p]
-
-        if len(parts) < 2:
-            # let handler show its usage (pass empty -> it will return usage)
-            return handle_liebestest("", "")
-
-        user_a = _strip_trailing_punct(parts[0]).lstrip("@")
-        user_b = _strip_trailing_punct(parts[1]).lstrip("@")
-        return handle_liebestest(user_a, user_b)
-
-    # LLM explicit
-    m = P_LLM.match(t)
-    if m:
-        query = m.group(1).strip()
-        if "meinung" in t:
-            return handle_opinion(query)
-        return handle_explain(query)
+    # Case 2: "bot sag front an|zu|gegen <user>" -> targeted front (ignore mode in output)
+    if mode and target:
+        name = _strip_trailing_punct(target).lstrip("@")
+        if not name:
+            return "Usage: bot sag front an|zu|gegen <user> oder nur: bot sag front"
+        tpl = random.choice(TARGETED_FRONTS)
+        return tpl.format(name=name)
+
+    return "Usage: bot sag front an|zu|gegen <user> oder nur: bot sag front"
+
+
+def _cmd_liebestest(args: dict, t: str) -> str:
+    payload = (args.get("liebestest_args") or "").strip()
+
+    # allow separators: spaces, comma, +, & (keep it simple)
+    payload = payload.replace(",", " ").replace("+", " ").replace("&", " ")
+    parts = [p for p in payload.split() if p]
+
+    if len(parts) < 2:
+        # let handler show its usage (pass empty -> it will return usage)
+        return handle_liebestest("", "")
+
+    user_a = _strip_trailing_punct(parts[0]).lstrip("@")
+    user_b = _strip_trailing_punct(parts[1]).lstrip("@")
+    return handle_liebestest(user_a, user_b)
+
+
+def _cmd_llm(args: dict, t: str) -> str:
+    query = args["llm_query"].strip()
+    if "meinung" in t:
+        return handle_opinion(query)
+    return handle_explain(query)
 
-    # fallback "bot sag <x>" -> explain
-    m = P_SAG_ANY.match(t)
-    if m:
-        query = (m.group(1) or "").strip()
-        if query:
-            return handle_explain(query)
 
+def _cmd_sag_any(args: dict, t: str) -> str | None:
+    query = (args.get("sag_query") or "").strip()
+    if query:
+        return handle_explain(query)
     return None
+
+
+# command name -> handler(args, normalized text)
+COMMAND_HANDLERS = {
+    "test": lambda args, t: "bestanden.",
+    "greet": lambda args, t: "moin",
+    "help_1": lambda args, t: _help_text(),
+    "help_2": lambda args, t: _help_text(),
+    # mods list -> handled in bot.py (Forum/listModerators)
+    "mods": lambda args, t: "__MODS__",
+    # BAN marker (handled in bot.py)
+    "ban": _cmd_ban,
+    "joke_1": lambda args, t: handle_joke(),
+    "joke_2": lambda args, t: handle_joke(),
+    "weather": lambda args, t: handle_weather(args["weather_city"].strip()),
+    "front": _cmd_front,
+    "story_31gg": lambda args, t: handle_story_31gg(),
+    "size": lambda args, t: handle_size(),
+    "liebestest": _cmd_liebestest,
+    "llm": _cmd_llm,
+    "sag_any": _cmd_sag_any,
+}
+
+
+def dispatch_command(text: str) -> str | None:
+    matched = match_command(text)
+    if not matched:
+        return None
+    name, args, t = matched
+    if name not in IO_COMMANDS:
+        return COMMAND_HANDLERS[name](args, t)
+
+    budget = COMMAND_DEADLINES.get(name, COMMAND_DEADLINE_SECONDS)
+    missed = False
+    t0 = time.perf_counter()
+    try:
+        with deadline(budget if budget > 0 else None):
+            return COMMAND_HANDLERS[name](args, t)
+    except DeadlineExceeded:
+        missed = True
+        return COMMAND_FALLBACKS.get(name)
+    finally:
+        elapsed = time.perf_counter() - t0
+        COMMAND_LATENCY.record(name, elapsed, missed or (budget > 0 and elapsed > budget))
@@ -1,12 +1,23 @@
-import requests
+import time
 
-def handle_weather(city: str) -> str:
-    city = (city or "").strip()
-    if not city:
-        return "Bitte: bot sag wetter in <stadt>"
+from utils.circuit_breaker import guarded_request, CircuitOpenError
+from utils.deadline import DeadlineExceeded
+from utils.weather_cache import GEO, WEATHER, GEO_STATS, WEATHER_STATS, normalize_city
 
-    # 1) geocode
-    geo = requests.get(
+WEATHER_FALLBACK = "Wetter aktuell nicht verfügbar, zieh zur Sicherheit eine Hose an!"
+
+
+def _geocode(city: str):
+    """(lat, lon, name, country) or None; cached permanently, misses included."""
+    key = normalize_city(city)
+    found, value = GEO.get(key)
+    if found:
+        GEO_STATS.hit()
+        return value
+
+    t0 = time.perf_counter()
+    geo = guarded_request(
+        "GET",
         "https://geocoding-api.open-meteo.com/v1/search",
         params={"name": city, "count": 1, "language": "de", "format": "json"},
         timeout=20,
@@ -14,19 +25,29 @@ def handle_weather(city: str) -> str:
     geo.raise_for_status()
     gj = geo.json()
     results = gj.get("results") or []
-    if not results:
-        return f"Ort nicht gefunden: {city}"
 
-    r0 = results[0]
-    lat = r0["latitude"]
-    lon = r0["longitude"]
-    name = r0.get("name", city)
-    country = r0.get("country", "")
+    value = None
+    if results:
+        r0 = results[0]
+        value = (r0["latitude"], r0["longitude"], r0.get("name", city), r0.get("country", ""))
+    GEO.put(key, value)
+    GEO_STATS.miss((time.perf_counter() - t0) * 1000.0)
+    return value
 
-    # 2) current weather
-    w = requests.get(
+
+def _current_weather(lat: float, lon: float):
+    """(temp, wind) for the rounded coordinate; cached for WEATHER_TTL_SECONDS."""
+    key = WEATHER.key(lat, lon)
+    hit = WEATHER.get(key)
+    if hit is not None:
+        WEATHER_STATS.hit()
+        return hit
+
+    t0 = time.perf_counter()
+    w = guarded_request(
+        "GET",
         "https://api.open-meteo.com/v1/forecast",
-        params={"latitude": lat, "longitude": lon, "current_weather": True},
+        params={"latitude": key[0], "longitude": key[1], "current_weather": True},
         timeout=20,
     )
     w.raise_for_status()
@@ -35,9 +56,35 @@ def handle_weather(city: str) -> str:
     temp = cw.get("temperature")
     wind = cw.get("windspeed")
 
+    if temp is not None:
+        WEATHER.put(key, temp, wind)
+    WEATHER_STATS.miss((time.perf_counter() - t0) * 1000.0)
+    return temp, wind
+
+
+def handle_weather(city: str) -> str:
+    city = (city or "").strip()
+    if not city:
+        return "Bitte: bot sag wetter in <stadt>"
+
+    # 1) geocode
+    try:
+        place = _geocode(city)
+    except (CircuitOpenError, DeadlineExceeded):
+        return WEATHER_FALLBACK
+    if not place:
+        return f"Ort nicht gefunden: {city}"
+    lat, lon, name, country = place
+
+    # 2) current weather
+    try:
+        temp, wind = _current_weather(lat, lon)
+    except (CircuitOpenError, DeadlineExceeded):
+        temp, wind = None, None
+
     where = f"{name}" + (f", {country}" if country else "")
     if temp is None:
-        return f"{where}: Wetter aktuell nicht verfügbar, zieh zur Sicherheit eine Hose an!"
+        return f"{where}: {WEATHER_FALLBACK}"
 
     if wind is not None:
         return f"{where}: {temp}°C, Wind {wind} km/h"
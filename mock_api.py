@@ -1,38 +1,354 @@
-from fastapi import FastAPI, Header, HTTPException
-from pydantic import BaseModel
-from typing import Optional
+"""
+Local stand-in for the Disqus 3.0 endpoints bot.py uses.
 
-app = FastAPI()
+Run:
+  uvicorn mock_api:app --port 8000
+  API_BASE=http://127.0.0.1:8000/api/3.0 python bot.py
+
+Knobs (env):
+  MOCK_LATENCY_MS / MOCK_LATENCY_JITTER_MS   added delay per request
+  MOCK_ERROR_RATE                            0..1, share of requests answered with HTTP 503
+  MOCK_RATELIMIT                             requests per hour per access token
+  MOCK_THREADS                               number of threads created at startup
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import parse_qs
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 
-COMMENTS = [
-    {"id": "1", "text": "Hallo, wie geht das?", "replies": []},
-    {"id": "2", "text": "Nice!", "replies": []},
+MOCK_LATENCY_MS = float(os.environ.get("MOCK_LATENCY_MS", "0"))
+MOCK_LATENCY_JITTER_MS = float(os.environ.get("MOCK_LATENCY_JITTER_MS", "0"))
+MOCK_ERROR_RATE = float(os.environ.get("MOCK_ERROR_RATE", "0"))
+MOCK_RATELIMIT = int(os.environ.get("MOCK_RATELIMIT", "1000"))
+MOCK_THREADS = int(os.environ.get("MOCK_THREADS", "3"))
+
+BOT_USER = {"id": "1000", "username": "disqusbot", "name": "Bot"}
+MODERATORS = [
+    {"id": "2000", "username": "mod_anna", "name": "Anna (Mod)"},
+    {"id": "2001", "username": "mod_ben", "name": "Ben (Mod)"},
 ]
 
-class ReplyIn(BaseModel):
-    text: str
-
-def check_auth(authorization: Optional[str]):
-    if authorization != "Bearer TESTTOKEN":
-        raise HTTPException(status_code=401, detail="Unauthorized")
-
-@app.get("/api/comments")
-def list_comments(authorization: Optional[str] = Header(default=None)):
-    check_auth(authorization)
-    return {"items": COMMENTS}
-
-@app.post("/api/comments/{comment_id}/reply")
-def reply(comment_id: str, payload: ReplyIn, authorization: Optional[str] = Header(default=None)):
-    check_auth(authorization)
-    for c in COMMENTS:
-        if c["id"] == comment_id:
-            c["replies"].append(payload.text)
-            return {"status": "ok", "comment_id": comment_id, "reply_count": len(c["replies"])}
-    raise HTTPException(status_code=404, detail="Comment not found")
-
-@app.post("/api/test/add_comment")
-def add_comment(text: str, authorization: Optional[str] = Header(default=None)):
-    check_auth(authorization)
-    new_id = str(int(COMMENTS[-1]["id"]) + 1) if COMMENTS else "1"
-    COMMENTS.append({"id": new_id, "text": text, "replies": []})
-    return {"status": "ok", "id": new_id}
+app = FastAPI()
+
+_lock = threading.Lock()
+POSTS = {}          # post_id -> post dict
+POST_ORDER = []     # post ids in creation order
+THREADS = {}        # thread_id -> thread dict
+BLACKLIST = {}      # blacklist_id -> entry
+RATE = {}           # access_token -> [window_start, count]
+STATS = {"requests": 0, "errors_injected": 0, "bot_replies": 0, "reply_latency_s": []}
+_ids = {"post": 7000000000, "thread": 10900000000, "blacklist": 92090000}
+
+
+def _next_id(kind: str) -> str:
+    _ids[kind] += 1
+    return str(_ids[kind])
+
+
+def _iso(unix: float) -> str:
+    return datetime.fromtimestamp(int(unix), timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def _ok(response, cursor=None, headers=None):
+    body = {"code": 0, "response": response}
+    if cursor is not None:
+        body["cursor"] = cursor
+    return JSONResponse(body, headers=headers or {})
+
+
+def _err(code: int, msg: str, status: int = 400, headers=None):
+    return JSONResponse({"code": code, "response": msg}, status_code=status, headers=headers or {})
+
+
+async def _params(request: Request) -> dict:
+    """Query + form params as dict of lists (Disqus accepts repeated keys)."""
+    out = {}
+    for k, v in request.query_params.multi_items():
+        out.setdefault(k, []).append(v)
+    if request.method == "POST":
+        body = (await request.body()).decode("utf-8", "replace")
+        for k, vs in parse_qs(body, keep_blank_values=True).items():
+            out.setdefault(k, []).extend(vs)
+    return out
+
+
+def _one(params: dict, key: str, default=None):
+    vs = params.get(key) or []
+    return vs[0] if vs else default
+
+
+def _rate_headers(token: str) -> tuple[dict, bool]:
+    now = time.time()
+    with _lock:
+        win = RATE.setdefault(token or "anon", [now, 0])
+        if now - win[0] >= 3600:
+            win[0], win[1] = now, 0
+        win[1] += 1
+        remaining = max(0, MOCK_RATELIMIT - win[1])
+        reset = int(win[0] + 3600)
+        exceeded = win[1] > MOCK_RATELIMIT
+    return {
+        "X-Ratelimit-Limit": str(MOCK_RATELIMIT),
+        "X-Ratelimit-Remaining": str(remaining),
+        "X-Ratelimit-Reset": str(reset),
+    }, exceeded
+
+
+async def _gate(request: Request):
+    """Auth, latency, error injection, rate limit. Returns (params, headers, error_response)."""
+    params = await _params(request)
+    STATS["requests"] += 1
+
+    if MOCK_LATENCY_MS or MOCK_LATENCY_JITTER_MS:
+        await asyncio.sleep(max(0.0, MOCK_LATENCY_MS + random.uniform(-1, 1) * MOCK_LATENCY_JITTER_MS) / 1000.0)
+
+    if not _one(params, "api_key"):
+        return params, {}, _err(5, "Invalid API key", 400)
+
+    headers, exceeded = _rate_headers(_one(params, "access_token", ""))
+    if exceeded:
+        return params, headers, _err(13, "You have exceeded the rate limit for this resource.", 429, headers)
+
+    if MOCK_ERROR_RATE and random.random() < MOCK_ERROR_RATE:
+        STATS["errors_injected"] += 1
+        return params, headers, _err(15, "Internal server error (injected)", 503, headers)
+
+    return params, headers, None
+
+
+def _new_thread(title: str, created: float | None = None, tid: str | None = None) -> dict:
+    tid = tid or _next_id("thread")
+    th = {
+        "id": tid,
+        "forum": "mockforum",
+        "title": title,
+        "link": f"https://example.org/t/{tid}",
+        "createdAt": _iso(created or time.time()),
+        "isClosed": False,
+        "posts": 0,
+    }
+    THREADS[tid] = th
+    return th
+
+
+def _new_post(thread_id: str, author: dict, message: str, parent: str | None = None) -> dict:
+    now = time.time()
+    pid = _next_id("post")
+    post = {
+        "id": pid,
+        "thread": str(thread_id),
+        "forum": "mockforum",
+        "parent": int(parent) if parent else None,
+        "author": dict(author),
+        "message": f"<p>{message}</p>",
+        "raw_message": message,
+        "createdAt": _iso(now),
+        "isSpam": False,
+        "isDeleted": False,
+        "isApproved": True,
+        "likes": 0,
+        "_created_unix": now,
+    }
+    POSTS[pid] = post
+    POST_ORDER.append(pid)
+    THREADS[str(thread_id)]["posts"] += 1
+    return post
+
+
+def _public(post: dict, related_thread: bool = False) -> dict:
+    out = {k: v for k, v in post.items() if not k.startswith("_")}
+    if related_thread:
+        out["thread"] = dict(THREADS.get(post["thread"]) or {"id": post["thread"]})
+    return out
+
+
+for i in range(MOCK_THREADS):
+    _new_thread(f"Mock thread {i + 1}", created=time.time() - 86400)
+
+
+# -------------------------
+# Disqus 3.0 endpoints
+# -------------------------
+@app.get("/api/3.0/users/details.json")
+async def users_details(request: Request):
+    params, headers, err = await _gate(request)
+    if err:
+        return err
+    return _ok(BOT_USER, headers=headers)
+
+
+@app.get("/api/3.0/forums/listModerators.json")
+async def forums_list_moderators(request: Request):
+    params, headers, err = await _gate(request)
+    if err:
+        return err
+    return _ok([{"id": str(i + 1), "user": u} for i, u in enumerate(MODERATORS)], headers=headers)
+
+
+@app.get("/api/3.0/forums/listThreads.json")
+async def forums_list_threads(request: Request):
+    params, headers, err = await _gate(request)
+    if err:
+        return err
+    limit = min(100, int(_one(params, "limit", "25")))
+    items = sorted(THREADS.values(), key=lambda t: int(t["id"]), reverse=True)[:limit]
+    return _ok(items, cursor={"hasNext": False, "next": None, "hasPrev": False, "prev": None}, headers=headers)
+
+
+@app.get("/api/3.0/forums/listPosts.json")
+async def forums_list_posts(request: Request):
+    params, headers, err = await _gate(request)
+    if err:
+        return err
+
+    limit = max(1, min(100, int(_one(params, "limit", "25"))))
+    order = _one(params, "order", "desc")
+    since = _one(params, "since")
+    offset = int(_one(params, "cursor", "0") or "0")
+    related_thread = "thread" in (params.get("related") or [])
+
+    with _lock:
+        posts = [POSTS[pid] for pid in POST_ORDER]
+    if since is not None:
+        s = float(since)
+        posts = [p for p in posts if p["_created_unix"] >= s] if order == "asc" else [p for p in posts if p["_created_unix"] <= s]
+    if order != "asc":
+        posts = list(reversed(posts))
+
+    page = posts[offset:offset + limit]
+    has_next = offset + limit < len(posts)
+    cursor = {
+        "hasNext": has_next,
+        "next": str(offset + limit) if has_next else None,
+        "hasPrev": offset > 0,
+        "prev": str(max(0, offset - limit)) if offset > 0 else None,
+        "more": has_next,
+    }
+    return _ok([_public(p, related_thread) for p in page], cursor=cursor, headers=headers)
+
+
+@app.get("/api/3.0/posts/details.json")
+async def posts_details(request: Request):
+    params, headers, err = await _gate(request)
+    if err:
+        return err
+    post = POSTS.get(str(_one(params, "post", "")))
+    if not post:
+        return _err(2, "Invalid argument, 'post': Unable to find post", 400, headers)
+    return _ok(_public(post), headers=headers)
+
+
+@app.post("/api/3.0/posts/create.json")
+async def posts_create(request: Request):
+    params, headers, err = await _gate(request)
+    if err:
+        return err
+    thread_id = str(_one(params, "thread", ""))
+    th = THREADS.get(thread_id)
+    if not th:
+        return _err(2, "Invalid argument, 'thread'", 400, headers)
+    if th["isClosed"]:
+        return _err(2, "This thread is closed.", 400, headers)
+
+    parent = _one(params, "parent")
+    with _lock:
+        post = _new_post(thread_id, BOT_USER, _one(params, "message", ""), parent=parent)
+        if parent and str(parent) in POSTS:
+            STATS["bot_replies"] += 1
+            STATS["reply_latency_s"].append(post["_created_unix"] - POSTS[str(parent)]["_created_unix"])
+    return _ok(_public(post), headers=headers)
+
+
+@app.post("/api/3.0/posts/vote.json")
+async def posts_vote(request: Request):
+    params, headers, err = await _gate(request)
+    if err:
+        return err
+    post = POSTS.get(str(_one(params, "post", "")))
+    if not post:
+        return _err(2, "Invalid argument, 'post'", 400, headers)
+    post["likes"] += 1
+    return _ok({"id": post["id"], "vote": int(_one(params, "vote", "1")), "post": _public(post)}, headers=headers)
+
+
+@app.post("/api/3.0/forums/block/banPostAuthor.json")
+async def forums_ban_post_author(request: Request):
+    params, headers, err = await _gate(request)
+    if err:
+        return err
+    post = POSTS.get(str(_one(params, "post", "")))
+    if not post:
+        return _err(2, "Invalid argument, 'post'", 400, headers)
+
+    author = post["author"]
+    updated = []
+    if _one(params, "banUser", "1") == "1":
+        bid = _next_id("blacklist")
+        entry = {"id": int(bid), "type": "user", "value": dict(author), "createdAt": _iso(time.time())}
+        BLACKLIST[bid] = entry
+        updated.append(entry)
+    return _ok({"updated": updated}, headers=headers)
+
+
+@app.post("/api/3.0/blacklists/remove.json")
+async def blacklists_remove(request: Request):
+    params, headers, err = await _gate(request)
+    if err:
+        return err
+    removed = []
+    for bid in params.get("blacklist") or []:
+        if BLACKLIST.pop(str(bid), None) is not None:
+            removed.append(str(bid))
+    return _ok(removed, headers=headers)
+
+
+# -------------------------
+# Test helpers (not part of Disqus)
+# -------------------------
+@app.post("/test/posts")
+async def test_add_post(request: Request):
+    params = await _params(request)
+    thread_id = str(_one(params, "thread") or next(iter(THREADS)))
+    author = {
+        "id": _one(params, "author_id", "3000"),
+        "username": _one(params, "author_username", "user"),
+        "name": _one(params, "author_name", "User"),
+    }
+    with _lock:
+        if thread_id not in THREADS:
+            _new_thread(f"Thread {thread_id}", tid=thread_id)
+        post = _new_post(thread_id, author, _one(params, "message", ""), parent=_one(params, "parent"))
+    return {"status": "ok", "id": post["id"], "thread": post["thread"]}
+
+
+@app.post("/test/threads")
+async def test_add_thread(request: Request):
+    params = await _params(request)
+    with _lock:
+        th = _new_thread(_one(params, "title", "New thread"))
+    return {"status": "ok", "id": th["id"]}
+
+
+@app.get("/test/stats")
+async def test_stats():
+    lat = sorted(STATS["reply_latency_s"])
+
+    def pct(q):
+        return round(lat[min(len(lat) - 1, int(q * len(lat)))], 3) if lat else None
+
+    return {
+        "requests": STATS["requests"],
+        "errors_injected": STATS["errors_injected"],
+        "posts": len(POSTS),
+        "threads": len(THREADS),
+        "bot_replies": STATS["bot_replies"],
+        "reply_latency_p50_s": pct(0.50),
+        "reply_latency_p95_s": pct(0.95),
+        "blacklist": len(BLACKLIST),
+    }
@@ -0,0 +1,96 @@
+"""
+Load generator for mock_api.py: posts N comments per second across M threads.
+
+  uvicorn mock_api:app --port 8000
+  API_BASE=http://127.0.0.1:8000/api/3.0 python bot.py
+  python mock_loadgen.py --rate 5 --threads 10 --duration 60
+
+A share of the comments are bot commands (--command-share), the rest is chatter.
+At the end the stand-in's /test/stats are printed (reply latency p50/p95 etc.).
+"""
+import argparse
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+COMMANDS = (
+    "test", "moin", "bot hilfe", "bot sag mods", "bot sag front", "bot sag front gegen @Heinz",
+    "bot sag liebestest Anna Ben", "bot sag schwanzlänge", "bot erzähl mir die geschichte von 31gg",
+    "bot erzähl einen Witz", "bot sag wetter in Berlin", "bot sag meinung zu Ananas auf Pizza",
+)
+
+CHATTER = (
+    "Das ist doch alles Quatsch.",
+    "Genau so sieht's aus 👍",
+    "Morgen ist Stream um 20 Uhr!",
+    "Kann jemand erklären, warum die Seite so langsam lädt?",
+    "Früher war alles besser.",
+    "Nein, war es nicht.",
+)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--url", default="http://127.0.0.1:8000")
+    ap.add_argument("--rate", type=float, default=2.0, help="comments per second")
+    ap.add_argument("--threads", type=int, default=5, help="number of Disqus threads to spread over")
+    ap.add_argument("--duration", type=float, default=30.0, help="seconds")
+    ap.add_argument("--command-share", type=float, default=0.3)
+    ap.add_argument("--users", type=int, default=50)
+    ap.add_argument("--drain", type=float, default=15.0, help="seconds to wait for replies before stats")
+    ap.add_argument("--seed", type=int, default=None)
+    args = ap.parse_args()
+
+    rnd = random.Random(args.seed)
+    base = args.url.rstrip("/")
+    session = requests.Session()
+
+    thread_ids = []
+    for i in range(args.threads):
+        r = session.post(f"{base}/test/threads", data={"title": f"Load thread {i + 1}"}, timeout=10)
+        r.raise_for_status()
+        thread_ids.append(r.json()["id"])
+
+    def send(thread_id, message, user):
+        try:
+            session.post(
+                f"{base}/test/posts",
+                data={"thread": thread_id, "message": message, "author_id": str(3000 + user),
+                      "author_username": f"user{user}", "author_name": f"User {user}"},
+                timeout=10,
+            ).raise_for_status()
+            return True
+        except Exception as e:
+            print(f"post failed: {e}")
+            return False
+
+    interval = 1.0 / max(0.001, args.rate)
+    sent = 0
+    t0 = time.monotonic()
+    next_at = t0
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = []
+        while time.monotonic() - t0 < args.duration:
+            if rnd.random() < args.command_share:
+                message = rnd.choice(COMMANDS)
+            else:
+                message = rnd.choice(CHATTER)
+            futures.append(pool.submit(send, rnd.choice(thread_ids), message, rnd.randrange(args.users)))
+            sent += 1
+            next_at += interval
+            time.sleep(max(0.0, next_at - time.monotonic()))
+        ok = sum(1 for f in futures if f.result())
+
+    elapsed = time.monotonic() - t0
+    print(f"sent {ok}/{sent} comments over {args.threads} threads in {elapsed:.1f}s ({ok / elapsed:.2f}/s)")
+
+    time.sleep(max(0.0, args.drain))
+    stats = session.get(f"{base}/test/stats", timeout=10).json()
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
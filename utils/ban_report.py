@@ -0,0 +1,112 @@
+from collections import deque
+
+REPORT_WINDOW_SECONDS = 86400
+
+REPORT_QUERY = """
+    SELECT blacklist_id, subject_label, started_at_unix, duration_secs, due_unix, unbanned_at_unix
+    FROM bans_log
+    WHERE started_at_unix >= ?
+      AND subject_type = 'user'
+    ORDER BY started_at_unix DESC
+"""
+
+
+def fmt_secs(secs: int) -> str:
+    secs = int(secs)
+    if secs < 0:
+        secs = 0
+    d, rem = divmod(secs, 86400)
+    h, rem = divmod(rem, 3600)
+    m, s = divmod(rem, 60)
+    if d:
+        return f"{d}d{h:02}h{m:02}m{s:02}s"
+    if h:
+        return f"{h}h{m:02}m{s:02}s"
+    if m:
+        return f"{m}m{s:02}s"
+    return f"{s}s"
+
+
+def format_ban_line(label: str, started: int, dur, due, unbanned, now_unix: int) -> str | None:
+    started = int(started)
+    if unbanned:
+        return f"- {label} — WAR gebannt {fmt_secs(int(unbanned) - started)}"
+    if dur is None and due is None:
+        return f"- {label} — AKTIV PERM (seit {fmt_secs(now_unix - started)})"
+    if due and now_unix < int(due):
+        rest = int(due) - now_unix
+        return f"- {label} — AKTIV REST {fmt_secs(rest)} (seit {fmt_secs(now_unix - started)})"
+    if due and now_unix >= int(due):
+        return f"- {label} — FÄLLIG seit {fmt_secs(now_unix - int(due))}"
+    return None
+
+
+class BanReportWindow:
+    """
+    Rolling 24h window of user bans for the ban report, oldest first.
+    Kept in step with bans_log by log_ban_event / mark_unbanned_in_log;
+    render() walks it from the newest end and stops after `limit` rows.
+
+    Entries are [blacklist_id, label, started, duration_secs, due_unix, unbanned_at_unix].
+    Equal start times keep insertion order, like the rowid order of the
+    (subject_type, started_at_unix) index the SQL report used.
+    """
+
+    def __init__(self, window_s: int = REPORT_WINDOW_SECONDS):
+        self.window_s = int(window_s)
+        self._entries = deque()
+        self._by_id = {}  # blacklist_id -> entry
+
+    def load(self, con, now_unix: int):
+        rows = con.execute(REPORT_QUERY, (int(now_unix) - self.window_s,)).fetchall()
+        self._entries.clear()
+        self._by_id.clear()
+        for bid, label, started, dur, due, unbanned in reversed(rows):
+            self._append([str(bid), label, int(started), dur, due, unbanned])
+
+    def _append(self, entry: list):
+        # bans arrive (almost) in start order: walk back from the newest end
+        i = len(self._entries)
+        while i and self._entries[i - 1][2] > entry[2]:
+            i -= 1
+        self._entries.insert(i, entry)
+        self._by_id[entry[0]] = entry
+
+    def add(self, blacklist_id: str, subject_type: str, label: str, started: int, dur, due):
+        """Mirror of the bans_log INSERT OR REPLACE (unbanned_at_unix survives a replace)."""
+        blacklist_id = str(blacklist_id)
+        old = self._by_id.pop(blacklist_id, None)
+        if old is not None:
+            self._entries.remove(old)
+        if subject_type != "user":
+            return
+        unbanned = old[5] if old is not None else None
+        self._append([blacklist_id, str(label), int(started), int(dur) if dur else None, int(due) if due else None, unbanned])
+
+    def mark_unbanned(self, blacklist_id: str, unbanned_at_unix: int):
+        entry = self._by_id.get(str(blacklist_id))
+        if entry is not None:
+            entry[5] = int(unbanned_at_unix)
+
+    def prune(self, now_unix: int):
+        since = int(now_unix) - self.window_s
+        while self._entries and self._entries[0][2] < since:
+            self._by_id.pop(self._entries.popleft()[0], None)
+
+    def render(self, now_unix: int, limit: int = 15) -> str:
+        self.prune(now_unix)
+        if not self._entries:
+            return "Bans letzte 24h (Bot-Log):\n- (keine)"
+
+        lines = ["Bans letzte 24h (Bot-Log):"]
+        for entry in reversed(self._entries):
+            if len(lines) > limit:
+                break
+            _, label, started, dur, due, unbanned = entry
+            line = format_ban_line(label, started, dur, due, unbanned, now_unix)
+            if line is not None:
+                lines.append(line)
+        return "\n".join(lines)
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,151 @@
+import asyncio
+import time
+
+
+class BanPipeline:
+    """
+    Batched ban execution for moderation bursts.
+    request() only records the ban command (no I/O); run() waits window_s
+    after the first request so the rest of the burst can join, then flushes:
+    - targets are deduped with a set (pending, in flight, banned in the last dedupe_s;
+      load_recent() seeds the last one from bans_log, so a restart keeps it)
+    - target lookups run concurrently, then the ban calls run concurrently
+    - all log rows / scheduled unbans are written in one transaction
+    - every thread gets one combined confirmation (and report) via confirm()
+
+    lookup(target_post_id) -> post dict or None (async, posts/details on index miss)
+    protected(post) -> reason str if the target must not be banned, else None
+    ban(target_post_id) -> list of ban subjects (async)
+    record(con, req, subjects, started_unix) writes bans_log / pending_unbans
+        (ban report window and unban heap follow only once the batch commits)
+    confirm(con, thread_id, done) posts the reply + report for the thread's
+        successful bans (list of (req, subjects)), async
+    """
+
+    def __init__(self, lookup, protected, ban, record, confirm, window_s: float = 1.0, dedupe_s: int = 60, log=print):
+        self._lookup = lookup
+        self._protected = protected
+        self._ban = ban
+        self._record = record
+        self._confirm = confirm
+        self.window_s = float(window_s)
+        self.dedupe_s = int(dedupe_s)
+        self.log = log
+        self._pending = {}  # target_post_id -> request dict, insertion ordered
+        self._inflight = set()
+        self._recent = {}  # target_post_id -> unix of the last successful ban
+        self._wake = asyncio.Event()
+        self.stats = {"requested": 0, "deduped": 0, "rejected": 0, "banned": 0, "failed": 0, "flushes": 0}
+
+    def load_recent(self, con, now_unix: int):
+        """Seeds the dedupe window from bans_log (called once at startup)."""
+        rows = con.execute(
+            "SELECT target_post_id, MAX(started_at_unix) FROM bans_log "
+            "WHERE subject_type = 'user' AND started_at_unix > ? GROUP BY target_post_id",
+            (int(now_unix) - self.dedupe_s,),
+        ).fetchall()
+        for target, started in rows:
+            if target:
+                self._recent[str(target)] = int(started)
+
+    def request(self, req: dict):
+        """req: post_id, thread_id, target_post_id, secs, is_perm."""
+        target = str(req.get("target_post_id") or "").strip()
+        if not target:
+            return
+        self.stats["requested"] += 1
+        now = int(time.time())
+        if target in self._pending or target in self._inflight or now - self._recent.get(target, 0) < self.dedupe_s:
+            self.stats["deduped"] += 1
+            self.log(f"BAN ignored: duplicate target within {self.dedupe_s}s target_post_id={target}")
+            return
+        self._pending[target] = req
+        self._wake.set()
+
+    async def _lookup_all(self, reqs: list[dict]) -> list[dict]:
+        posts = await asyncio.gather(*(self._lookup(r["target_post_id"]) for r in reqs), return_exceptions=True)
+        out = []
+        for req, post in zip(reqs, posts):
+            target = req["target_post_id"]
+            if isinstance(post, BaseException) or not post:
+                self.stats["rejected"] += 1
+                self.log(f"BAN ignored: cannot fetch target post {target}: {post}")
+                continue
+            reason = self._protected(post)
+            if reason:
+                self.stats["rejected"] += 1
+                self.log(f"BAN ignored: {reason} target_post_id={target}")
+                continue
+            out.append(req)
+        return out
+
+    async def flush(self, con) -> int:
+        if not self._pending:
+            return 0
+        batch, self._pending = list(self._pending.values()), {}
+        targets = {r["target_post_id"] for r in batch}
+        self._inflight.update(targets)
+        self.stats["flushes"] += 1
+        try:
+            reqs = await self._lookup_all(batch)
+            started = int(time.time())
+            results = await asyncio.gather(*(self._ban(r["target_post_id"]) for r in reqs), return_exceptions=True)
+        finally:
+            self._inflight.difference_update(targets)
+
+        done = []
+        for req, subjects in zip(reqs, results):
+            target = req["target_post_id"]
+            if isinstance(subjects, BaseException):
+                self.stats["failed"] += 1
+                self.log(f"BAN failed target_post_id={target}: {subjects}")
+            elif not subjects:
+                self.stats["failed"] += 1
+                self.log(f"BAN ignored: no user blacklist entry returned target_post_id={target}")
+            else:
+                done.append((req, subjects))
+
+        if done:
+            with con.batch():
+                for req, subjects in done:
+                    self._record(con, req, subjects, started)
+            for req, _ in done:
+                self._recent[req["target_post_id"]] = started
+                secs = "PERM" if (req.get("is_perm") or not req.get("secs")) else req["secs"]
+                self.log(f"BAN done target_post_id={req['target_post_id']} secs={secs}")
+        self.stats["banned"] += len(done)
+        self._prune_recent(started)
+
+        by_thread = {}
+        for req, subjects in done:
+            by_thread.setdefault(req["thread_id"], []).append((req, subjects))
+        confirms = await asyncio.gather(
+            *(self._confirm(con, thread_id, items) for thread_id, items in by_thread.items()),
+            return_exceptions=True,
+        )
+        for thread_id, res in zip(by_thread, confirms):
+            if isinstance(res, BaseException):
+                self.log(f"BAN confirm failed thread_id={thread_id}: {res}")
+        return len(done)
+
+    def _prune_recent(self, now: int):
+        cutoff = now - self.dedupe_s
+        for target in [t for t, unix in self._recent.items() if unix <= cutoff]:
+            del self._recent[target]
+
+    async def run(self, con):
+        while True:
+            await self._wake.wait()
+            await asyncio.sleep(self.window_s)  # let the rest of the burst join
+            self._wake.clear()
+            try:
+                await self.flush(con)
+            except Exception as e:
+                self.log(f"BAN flush failed: {e}")
+
+    def format_stats(self) -> str:
+        st = self.stats
+        return (
+            f"pending={len(self._pending)} inflight={len(self._inflight)} requested={st['requested']} deduped={st['deduped']} "
+            f"rejected={st['rejected']} banned={st['banned']} failed={st['failed']} flushes={st['flushes']}"
+        )
@@ -0,0 +1,25 @@
+import os
+import sqlite3
+import threading
+
+# Response caches (geocoding, LLM, ...) live apart from the state DB:
+# they are written from command worker threads, the state DB only from the loop.
+CACHE_DB_PATH = os.environ.get("CACHE_DB_PATH", "cache.db")
+
+_lock = threading.Lock()
+_con = None
+
+
+def cache_db() -> tuple[sqlite3.Connection, threading.Lock]:
+    """
+    Shared connection to the cache DB (opened on first use) and the lock
+    every user must hold around execute/commit.
+    """
+    global _con
+    with _lock:
+        if _con is None:
+            con = sqlite3.connect(CACHE_DB_PATH, check_same_thread=False)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            _con = con
+    return _con, _lock
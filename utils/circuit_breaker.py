@@ -0,0 +1,168 @@
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+
+from utils.deadline import bounded_timeout, DeadlineExceeded
+
+# Consecutive failures (errors, timeouts, 5xx/429) that open a breaker
+BREAKER_FAILURES = int(os.environ.get("BREAKER_FAILURES", "3"))
+# Seconds a breaker stays open before one half-open probe is let through
+BREAKER_OPEN_SECONDS = float(os.environ.get("BREAKER_OPEN_SECONDS", "30"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling an upstream whose breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    closed    -> calls pass; BREAKER_FAILURES consecutive failures -> open
+    open      -> calls fail fast until open_s has passed -> half_open
+    half_open -> exactly one probe passes; success -> closed, failure -> open
+    """
+
+    def __init__(self, name: str, failures: int = BREAKER_FAILURES, open_s: float = BREAKER_OPEN_SECONDS, log=print):
+        self.name = name
+        self.failures = max(1, int(failures))
+        self.open_s = float(open_s)
+        self.log = log
+        self.state = CLOSED
+        self._consecutive = 0
+        self._opened_at = 0.0
+        self._tripped_at = 0.0
+        self._probe_running = False
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "failures": 0, "fast_fails": 0, "opened": 0, "open_s": 0.0}
+
+    def _set_state(self, state: str, reason: str):
+        old = self.state
+        now = time.monotonic()
+        if old != CLOSED and state == CLOSED:
+            self.stats["open_s"] += now - self._opened_at
+            reason += f", was open {now - self._opened_at:.0f}s"
+        if state == OPEN and old == CLOSED:
+            self._opened_at = now
+            self.stats["opened"] += 1
+        self.state = state
+        if self.log:
+            self.log(f"BREAKER {self.name}: {old} -> {state} ({reason})")
+
+    def before(self):
+        """Call before the upstream request; raises CircuitOpenError while open."""
+        with self._lock:
+            self.stats["calls"] += 1
+            if self.state == CLOSED:
+                return
+            if self.state == OPEN and time.monotonic() - self._tripped_at >= self.open_s:
+                self._set_state(HALF_OPEN, "probe")
+            if self.state == HALF_OPEN and not self._probe_running:
+                self._probe_running = True
+                return
+            self.stats["fast_fails"] += 1
+        raise CircuitOpenError(f"{self.name} unavailable (circuit open)")
+
+    def success(self):
+        with self._lock:
+            self._consecutive = 0
+            if self.state == HALF_OPEN:
+                self._probe_running = False
+                self._set_state(CLOSED, "probe ok")
+
+    def release(self):
+        """Call neither succeeded nor failed (e.g. cancelled by us): frees a half-open probe slot."""
+        with self._lock:
+            self._probe_running = False
+
+    def failure(self, reason: str = "error"):
+        with self._lock:
+            self.stats["failures"] += 1
+            self._consecutive += 1
+            if self.state == HALF_OPEN:
+                self._probe_running = False
+                self._tripped_at = time.monotonic()
+                self._set_state(OPEN, f"probe failed: {reason}")
+            elif self.state == CLOSED and self._consecutive >= self.failures:
+                self._tripped_at = time.monotonic()
+                self._set_state(OPEN, f"{self._consecutive} consecutive failures, last: {reason}")
+
+    def open_seconds(self) -> float:
+        """Total time spent not closed, including the current open period."""
+        with self._lock:
+            total = self.stats["open_s"]
+            if self.state != CLOSED:
+                total += time.monotonic() - self._opened_at
+            return total
+
+    def format_stats(self) -> str:
+        st = self.stats
+        return (
+            f"{self.name}: {self.state} calls={st['calls']} failures={st['failures']} "
+            f"fast_fails={st['fast_fails']} opened={st['opened']} open_for={self.open_seconds():.0f}s"
+        )
+
+
+class BreakerRegistry:
+    """One CircuitBreaker per upstream host, created on first use."""
+
+    def __init__(self, log=print):
+        self.log = log
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, host: str) -> CircuitBreaker:
+        with self._lock:
+            br = self._breakers.get(host)
+            if br is None:
+                br = self._breakers[host] = CircuitBreaker(host, log=self._log)
+            return br
+
+    def _log(self, msg: str):
+        if self.log:
+            self.log(msg)
+
+    def format_stats(self) -> str:
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return "\n".join(br.format_stats() for br in breakers) or "(no upstream calls yet)"
+
+
+BREAKERS = BreakerRegistry()
+
+
+def guarded_request(method: str, url: str, **kwargs) -> requests.Response:
+    """
+    requests.request behind the breaker of the URL's host.
+    Connection errors, timeouts, 5xx and 429 count as failures; other
+    statuses count as success (the upstream answered). Raises CircuitOpenError
+    without calling out while the breaker is open.
+    The timeout is capped at the remaining command deadline (utils.deadline);
+    a timeout caused by that cap raises DeadlineExceeded instead.
+    """
+    br = BREAKERS.get(urlsplit(url).hostname or url)
+    timeout = kwargs.get("timeout")
+    kwargs["timeout"] = bounded_timeout(timeout)
+    br.before()
+    try:
+        r = requests.request(method, url, **kwargs)
+    except requests.Timeout as e:
+        if kwargs["timeout"] != timeout:
+            # cut short by the command deadline: not the upstream's fault
+            br.release()
+            raise DeadlineExceeded("command deadline exceeded") from e
+        br.failure(type(e).__name__)
+        raise
+    except Exception as e:
+        br.failure(type(e).__name__)
+        raise
+    if r.status_code >= 500 or r.status_code == 429:
+        br.failure(f"HTTP {r.status_code}")
+    else:
+        br.success()
+    return r
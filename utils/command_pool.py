@@ -0,0 +1,114 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class _Job:
+    __slots__ = ("key", "meta", "future", "submitted", "started", "finished")
+
+    def __init__(self, key: str, meta):
+        self.key = key
+        self.meta = meta
+        self.future = None
+        self.submitted = time.perf_counter()
+        self.started = None
+        self.finished = None
+
+
+class KeyedCommandPool:
+    """
+    Runs command handlers on a bounded thread pool.
+    Results are handed out per key (thread_id) in submission order:
+    a finished job is only released once all earlier jobs of the same key
+    are released, so replies in one Disqus thread never reorder.
+
+    submit() / collect() are meant to be called from one thread (the loop).
+    on_done is called from worker threads whenever a job finishes.
+    """
+
+    def __init__(self, max_workers: int = 4, on_done=None):
+        self.max_workers = max(1, int(max_workers))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="cmd")
+        self._queues = {}  # key -> deque[_Job]
+        self._on_done = on_done
+        self._lock = threading.Lock()
+        self._stats = {"submitted": 0, "completed": 0, "errors": 0, "handler_ms": 0.0, "handler_max_ms": 0.0,
+                       "wait_ms": 0.0, "max_depth": 0}
+
+    def _run(self, job: _Job, fn, args):
+        job.started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            job.finished = time.perf_counter()
+
+    def _done(self, _future):
+        if self._on_done:
+            self._on_done()
+
+    def submit(self, key: str, fn, *args, meta=None):
+        job = _Job(str(key), meta)
+        self._queues.setdefault(job.key, deque()).append(job)
+        job.future = self._executor.submit(self._run, job, fn, args)
+        job.future.add_done_callback(self._done)
+
+        with self._lock:
+            self._stats["submitted"] += 1
+            self._stats["max_depth"] = max(self._stats["max_depth"], self.depth())
+        return job
+
+    def collect(self) -> list[tuple]:
+        """
+        Returns released jobs as (key, meta, result, error) in per-key order.
+        """
+        out = []
+        for key in list(self._queues.keys()):
+            q = self._queues[key]
+            while q and q[0].future.done():
+                job = q.popleft()
+                err = job.future.exception()
+                res = None if err else job.future.result()
+                self._note(job, err)
+                out.append((job.key, job.meta, res, err))
+            if not q:
+                del self._queues[key]
+        return out
+
+    def _note(self, job: _Job, err):
+        with self._lock:
+            st = self._stats
+            st["completed"] += 1
+            if err:
+                st["errors"] += 1
+            if job.started is not None:
+                st["wait_ms"] += (job.started - job.submitted) * 1000.0
+            if job.started is not None and job.finished is not None:
+                ms = (job.finished - job.started) * 1000.0
+                st["handler_ms"] += ms
+                st["handler_max_ms"] = max(st["handler_max_ms"], ms)
+
+    def depth(self) -> int:
+        """Jobs submitted but not yet collected."""
+        return sum(len(q) for q in self._queues.values())
+
+    def stats(self) -> dict:
+        with self._lock:
+            st = dict(self._stats)
+        st["depth"] = self.depth()
+        st["keys"] = len(self._queues)
+        st["workers"] = self.max_workers
+        return st
+
+    def format_stats(self) -> str:
+        st = self.stats()
+        n = st["completed"] or 1
+        return (
+            f"workers={st['workers']} depth={st['depth']} (max {st['max_depth']}) keys={st['keys']} "
+            f"done={st['completed']} err={st['errors']} "
+            f"handler_avg={st['handler_ms'] / n:.0f}ms handler_max={st['handler_max_ms']:.0f}ms "
+            f"wait_avg={st['wait_ms'] / n:.0f}ms"
+        )
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
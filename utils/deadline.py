@@ -0,0 +1,47 @@
+import threading
+import time
+from contextlib import contextmanager
+
+_local = threading.local()
+
+
+class DeadlineExceeded(TimeoutError):
+    """The current command's latency budget is used up."""
+
+
+@contextmanager
+def deadline(seconds: float | None):
+    """
+    Sets the latency budget for the code running in this thread.
+    Nested scopes can only shorten the budget, never extend it.
+    """
+    prev = getattr(_local, "at", None)
+    at = None if seconds is None else time.monotonic() + float(seconds)
+    if prev is not None and (at is None or prev < at):
+        at = prev
+    _local.at = at
+    try:
+        yield
+    finally:
+        _local.at = prev
+
+
+def remaining() -> float | None:
+    """Seconds left in the current budget, None without a deadline."""
+    at = getattr(_local, "at", None)
+    if at is None:
+        return None
+    return at - time.monotonic()
+
+
+def bounded_timeout(timeout: float | None) -> float | None:
+    """
+    timeout capped at the remaining budget.
+    Raises DeadlineExceeded if the budget is already used up.
+    """
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded("command deadline exceeded")
+    return left if timeout is None else min(float(timeout), left)
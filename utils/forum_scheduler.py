@@ -0,0 +1,85 @@
+import asyncio
+import heapq
+import itertools
+import time
+
+
+class FairScheduler:
+    """
+    Periodic per-forum jobs (post poll, thread poll / welcome, hourly post,
+    mod cache, pruning) from one loop instead of one sleeping task per
+    forum and job.
+    - min-heap of (due, seq, job): jobs due at the same time run in the
+      order they were queued, so forums that became due together take turns
+    - at most `concurrency` jobs run at once, so N forums do not hit the
+      shared rate limit in one burst
+    - a job is queued again only after it finished, at now + the delay it
+      returned; None drops the job, an exception retries after retry_s
+
+    add(key, name, fn): fn() is the async job body, key names the forum.
+    """
+
+    def __init__(self, concurrency: int = 4, retry_s: float = 5.0, log=print):
+        self.concurrency = max(1, int(concurrency))
+        self.retry_s = float(retry_s)
+        self.log = log
+        self._heap = []
+        self._seq = itertools.count()
+        self._wake = asyncio.Event()
+        self._running = set()
+        self.stats = {}  # job name -> {"runs", "errors", "lag_total_s", "lag_max_s"}
+
+    def add(self, key: str, name: str, fn, delay_s: float = 0.0):
+        self._push((key, name, fn), time.monotonic() + max(0.0, float(delay_s)))
+
+    def _push(self, job: tuple, due: float):
+        heapq.heappush(self._heap, (due, next(self._seq), job))
+        self._wake.set()
+
+    async def _run_job(self, job: tuple, due: float):
+        key, name, fn = job
+        st = self.stats.setdefault(name, {"runs": 0, "errors": 0, "lag_total_s": 0.0, "lag_max_s": 0.0})
+        lag = max(0.0, time.monotonic() - due)
+        st["runs"] += 1
+        st["lag_total_s"] += lag
+        st["lag_max_s"] = max(st["lag_max_s"], lag)
+        try:
+            delay = await fn()
+        except Exception as e:
+            st["errors"] += 1
+            self.log(f"SCHED {name} forum={key} failed: {e}")
+            delay = self.retry_s
+        if delay is not None:
+            self._push(job, time.monotonic() + max(0.0, float(delay)))
+
+    def _finished(self, task):
+        self._running.discard(task)
+        self._wake.set()
+
+    async def run(self):
+        while True:
+            self._wake.clear()
+            now = time.monotonic()
+            while self._heap and self._heap[0][0] <= now and len(self._running) < self.concurrency:
+                due, _, job = heapq.heappop(self._heap)
+                task = asyncio.create_task(self._run_job(job, due))
+                self._running.add(task)
+                task.add_done_callback(self._finished)
+
+            timeout = None
+            if self._heap and len(self._running) < self.concurrency:
+                timeout = max(0.0, self._heap[0][0] - time.monotonic())
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def format_stats(self) -> str:
+        lines = [f"queued={len(self._heap)} running={len(self._running)}/{self.concurrency}"]
+        for name, st in sorted(self.stats.items()):
+            avg = st["lag_total_s"] / st["runs"] if st["runs"] else 0.0
+            lines.append(
+                f"  {name:10} runs={st['runs']} errors={st['errors']} "
+                f"lag_avg={avg * 1000:.0f}ms lag_max={st['lag_max_s'] * 1000:.0f}ms"
+            )
+        return "\n".join(lines)
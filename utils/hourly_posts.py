@@ -62,7 +62,19 @@ def init_hourly_schedule(con, kv_get, kv_set, log=print) -> int:
     return next_unix
 
 
-def tick_hourly_posts(
+async def _send_hourly_post(create_root_post, thread_id: str, msg: str, log=print):
+    try:
+        await create_root_post(thread_id, msg)
+        log(f"Hourly post sent in thread_id={thread_id}")
+    except Exception as e:
+        s = str(e).lower()
+        if "thread" in s and "closed" in s:
+            log(f"Hourly post skipped (thread closed) thread_id={thread_id}")
+        else:
+            log(f"Hourly post error: {e}")
+
+
+async def tick_hourly_posts(
     con,
     next_hourly_post_unix: int,
     kv_set,
@@ -70,10 +82,13 @@ def tick_hourly_posts(
     ensure_not_duplicate,
     create_root_post,
     log=print,
+    spawn=None,
 ) -> int:
     """
     Call this once per main loop.
     If due -> post random message to default thread and reschedule.
+    create_root_post is awaited here, or handed to spawn(coro) if given
+    (the caller then does not wait for the post to go out).
     Returns updated next_hourly_post_unix.
     """
     now = _now_unix()
@@ -87,15 +102,11 @@ def tick_hourly_posts(
         msg = random.choice(messages)
         msg = ensure_not_duplicate(con, thread_id, msg)
 
-        try:
-            create_root_post(thread_id, msg)
-            log(f"Hourly post sent in thread_id={thread_id}")
-        except Exception as e:
-            s = str(e).lower()
-            if "thread" in s and "closed" in s:
-                log(f"Hourly post skipped (thread closed) thread_id={thread_id}")
-            else:
-                log(f"Hourly post error: {e}")
+        send = _send_hourly_post(create_root_post, thread_id, msg, log=log)
+        if spawn is not None:
+            spawn(send)
+        else:
+            await send
     else:
         log("Hourly post skipped (no thread_id yet).")
 
@@ -0,0 +1,110 @@
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Transient statuses worth retrying for idempotent GETs
+RETRY_STATUSES = {500, 502, 503, 504}
+
+
+class HttpClient:
+    """
+    Shared keep-alive session (connection pool) for one API base URL.
+    - GET is retried on timeouts / connection errors / 5xx with jittered backoff
+    - POST is never retried here (not idempotent)
+    - per-endpoint stats: calls, errors, status counts, latency, bytes
+    """
+
+    def __init__(self, base_url: str = "", pool_size: int = 10, retries: int = 2,
+                 backoff_s: float = 0.5, timeout: float = 15, log=print):
+        self.base_url = base_url.rstrip("/")
+        self.retries = max(0, int(retries))
+        self.backoff_s = float(backoff_s)
+        self.timeout = timeout
+        self.log = log
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _url(self, path: str) -> str:
+        if path.startswith("http://") or path.startswith("https://"):
+            return path
+        return f"{self.base_url}{path}"
+
+    def _record(self, endpoint: str, status: int | None, elapsed_s: float, nbytes: int, retried: bool = False):
+        with self._lock:
+            st = self._stats.setdefault(
+                endpoint,
+                {"calls": 0, "errors": 0, "retries": 0, "statuses": {}, "total_ms": 0.0, "max_ms": 0.0, "bytes": 0},
+            )
+            st["calls"] += 1
+            ms = elapsed_s * 1000.0
+            st["total_ms"] += ms
+            st["max_ms"] = max(st["max_ms"], ms)
+            st["bytes"] += int(nbytes)
+            if retried:
+                st["retries"] += 1
+            if status is None or status >= 400:
+                st["errors"] += 1
+            key = str(status) if status is not None else "exc"
+            st["statuses"][key] = st["statuses"].get(key, 0) + 1
+
+    def _sleep_backoff(self, attempt: int):
+        base = self.backoff_s * (2 ** attempt)
+        time.sleep(base * (0.5 + random.random()))
+
+    def get(self, path: str, params: dict | None = None, timeout: float | None = None) -> requests.Response:
+        url = self._url(path)
+        attempt = 0
+        while True:
+            t0 = time.perf_counter()
+            try:
+                r = self.session.get(url, params=params, timeout=timeout or self.timeout)
+            except (requests.Timeout, requests.ConnectionError) as e:
+                self._record(path, None, time.perf_counter() - t0, 0, retried=attempt > 0)
+                if attempt >= self.retries:
+                    raise
+                self.log(f"HTTP GET {path} failed ({type(e).__name__}), retry {attempt + 1}/{self.retries}")
+                self._sleep_backoff(attempt)
+                attempt += 1
+                continue
+
+            self._record(path, r.status_code, time.perf_counter() - t0, len(r.content or b""), retried=attempt > 0)
+            if r.status_code in RETRY_STATUSES and attempt < self.retries:
+                self.log(f"HTTP GET {path} -> {r.status_code}, retry {attempt + 1}/{self.retries}")
+                self._sleep_backoff(attempt)
+                attempt += 1
+                continue
+            return r
+
+    def post(self, path: str, data: dict | None = None, timeout: float | None = None, **kwargs) -> requests.Response:
+        t0 = time.perf_counter()
+        try:
+            r = self.session.post(self._url(path), data=data, timeout=timeout or self.timeout, **kwargs)
+        except Exception:
+            self._record(path, None, time.perf_counter() - t0, 0)
+            raise
+        self._record(path, r.status_code, time.perf_counter() - t0, len(r.content or b""))
+        return r
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {k: {**v, "statuses": dict(v["statuses"])} for k, v in self._stats.items()}
+
+    def format_stats(self) -> str:
+        lines = []
+        for endpoint, st in sorted(self.stats().items()):
+            avg = st["total_ms"] / st["calls"] if st["calls"] else 0.0
+            statuses = ",".join(f"{k}:{v}" for k, v in sorted(st["statuses"].items()))
+            lines.append(
+                f"{endpoint} calls={st['calls']} err={st['errors']} retries={st['retries']} "
+                f"avg={avg:.0f}ms max={st['max_ms']:.0f}ms bytes={st['bytes']} status=[{statuses}]"
+            )
+        return "\n".join(lines) if lines else "(no requests)"
@@ -0,0 +1,83 @@
+import os
+
+# Safety cap for cursor paging within one poll; the rest is picked up next poll
+INGEST_MAX_PAGES = int(os.environ.get("INGEST_MAX_PAGES", "20"))
+
+# After a restart: how far back (seconds) we catch up from the stored high-water mark
+INGEST_MAX_CATCHUP_SECONDS = int(os.environ.get("INGEST_MAX_CATCHUP_SECONDS", "3600"))
+
+# Every poll re-reads this many seconds before the high-water mark, so posts that
+# show up in listPosts late (replication lag, late approval) are still fetched
+INGEST_LOOKBACK_SECONDS = int(os.environ.get("INGEST_LOOKBACK_SECONDS", "300"))
+
+
+def init_ingest_state(con, kv_get, kv_set, start_unix: int, log=print) -> dict:
+    """
+    Load the persisted high-water mark (createdAt unix + post id of the
+    newest processed post). Without one we start at start_unix, so
+    posts from before the first run are never answered.
+    Returns the ingest state dict used by fetch_new_posts(); floor_unix
+    is the oldest createdAt the lookback may reach back to.
+    """
+    stored = kv_get(con, "ingest_hwm_unix")
+    last_id = (kv_get(con, "ingest_hwm_post_id") or "").strip()
+
+    if stored and str(stored).isdigit():
+        since = int(stored)
+        floor = int(start_unix) - INGEST_MAX_CATCHUP_SECONDS
+        if since < floor:
+            log(f"Ingest catch-up capped: hwm={since} -> {floor}")
+            since = floor
+    else:
+        since = floor = int(start_unix)
+        kv_set(con, "ingest_hwm_unix", str(since))
+
+    log(f"Ingest high-water mark unix={since} post_id={last_id or '-'}")
+    return {"since_unix": since, "last_post_id": last_id, "floor_unix": floor}
+
+
+def fetch_new_posts(state: dict, fetch_page, limit: int = 100, log=print) -> tuple[list[dict], int]:
+    """
+    Fetch all posts created at/after the high-water mark minus
+    INGEST_LOOKBACK_SECONDS, oldest first. The overlap returns posts that
+    were already processed; the caller skips them via the seen set.
+    Returns (posts, number of listPosts calls made).
+
+    fetch_page(since_unix, cursor, limit) -> (posts, cursor_dict)
+    must call /forums/listPosts.json with order=asc. If a burst does not
+    fit on one page we follow cursor.next until hasNext is false.
+    """
+    since = int(state.get("since_unix") or 0) - max(0, INGEST_LOOKBACK_SECONDS)
+    since = max(since, int(state.get("floor_unix") or 0))
+    out = []
+    cursor = None
+    pages = 0
+
+    for _ in range(max(1, INGEST_MAX_PAGES)):
+        posts, cur = fetch_page(since, cursor, min(int(limit), 100))
+        pages += 1
+        out.extend(posts or [])
+
+        cur = cur or {}
+        if not cur.get("hasNext") or not cur.get("next"):
+            break
+        cursor = cur["next"]
+    else:
+        log(f"Ingest page cap reached ({INGEST_MAX_PAGES} pages), continuing next poll")
+
+    return out, pages
+
+
+def advance_high_water_mark(con, state: dict, created_unix: int | None, post_id: str, kv_set):
+    """
+    Call when a post is taken for processing (where it is marked seen).
+    Only moves forward, so a crash in the middle of a batch re-fetches
+    the rest of the batch (already seen posts are skipped).
+    """
+    if created_unix is None or int(created_unix) < int(state.get("since_unix") or 0):
+        return
+
+    state["since_unix"] = int(created_unix)
+    state["last_post_id"] = str(post_id)
+    kv_set(con, "ingest_hwm_unix", str(int(created_unix)))
+    kv_set(con, "ingest_hwm_post_id", str(post_id))
@@ -0,0 +1,79 @@
+class KVCache:
+    """
+    Write-behind cache in front of the kv table.
+    - reads are served from memory (whole table is loaded once)
+    - writes to the same key coalesce until flush()
+    - durable keys (exact or by prefix) are written and committed right away
+    Inside a rolled-back con.batch() set() and flush() are undone in memory
+    (old value back, flushed keys dirty again).
+    """
+
+    def __init__(self, con, durable_keys=(), durable_prefixes=()):
+        self.con = con
+        self.durable_keys = set(durable_keys)
+        self.durable_prefixes = tuple(durable_prefixes)
+        self.data = dict(con.execute("SELECT k, v FROM kv").fetchall())
+        self.dirty = set()
+        self.stats = {"reads": 0, "writes": 0, "coalesced": 0, "flushes": 0, "rows_flushed": 0}
+
+    def is_durable(self, k: str) -> bool:
+        return k in self.durable_keys or (bool(self.durable_prefixes) and k.startswith(self.durable_prefixes))
+
+    def get(self, k: str):
+        self.stats["reads"] += 1
+        return self.data.get(k)
+
+    def set(self, k: str, v: str):
+        self.stats["writes"] += 1
+        if self.data.get(k) == v and k not in self.dirty:
+            return
+        self.con.on_rollback(self._restore_fn(k, k in self.data, self.data.get(k), k in self.dirty))
+        self.data[k] = v
+
+        if self.is_durable(k):
+            self.dirty.discard(k)
+            self._write([(k, v)])
+            self.con.commit()
+            return
+
+        if k in self.dirty:
+            self.stats["coalesced"] += 1
+        self.dirty.add(k)
+
+    def _restore_fn(self, k: str, existed: bool, old, was_dirty: bool):
+        def restore():
+            if existed:
+                self.data[k] = old
+            else:
+                self.data.pop(k, None)
+            if was_dirty:
+                self.dirty.add(k)
+            else:
+                self.dirty.discard(k)
+        return restore
+
+    def _write(self, rows):
+        self.con.executemany(
+            "INSERT INTO kv(k, v) VALUES(?, ?) ON CONFLICT(k) DO UPDATE SET v=excluded.v",
+            rows,
+        )
+
+    def flush(self) -> int:
+        if not self.dirty:
+            return 0
+        rows = [(k, self.data[k]) for k in self.dirty]
+        self._write(rows)
+        self.con.commit()
+        flushed = set(self.dirty)
+        self.con.on_rollback(lambda: self.dirty.update(flushed))
+        self.dirty.clear()
+        self.stats["flushes"] += 1
+        self.stats["rows_flushed"] += len(rows)
+        return len(rows)
+
+    def format_stats(self) -> str:
+        st = self.stats
+        return (
+            f"kv: keys={len(self.data)} dirty={len(self.dirty)} reads={st['reads']} writes={st['writes']} "
+            f"coalesced={st['coalesced']} flushes={st['flushes']} rows_flushed={st['rows_flushed']}"
+        )
@@ -0,0 +1,52 @@
+import threading
+from collections import deque
+
+
+class LatencyTracker:
+    """Recent latency samples per name (bounded) -> p50 / p95 / max and deadline misses."""
+
+    def __init__(self, window: int = 500):
+        self.window = max(10, int(window))
+        self._samples = {}  # name -> deque[float seconds]
+        self._counts = {}  # name -> [calls, misses]
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float, missed: bool = False):
+        with self._lock:
+            q = self._samples.get(name)
+            if q is None:
+                q = self._samples[name] = deque(maxlen=self.window)
+                self._counts[name] = [0, 0]
+            q.append(seconds)
+            self._counts[name][0] += 1
+            if missed:
+                self._counts[name][1] += 1
+
+    @staticmethod
+    def _pct(values: list[float], q: float) -> float:
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+    def summary(self) -> dict:
+        """name -> {calls, misses, p50_ms, p95_ms, max_ms} over the recent window."""
+        with self._lock:
+            items = [(name, sorted(q), list(self._counts[name])) for name, q in self._samples.items()]
+        out = {}
+        for name, values, (calls, misses) in items:
+            out[name] = {
+                "calls": calls,
+                "misses": misses,
+                "p50_ms": self._pct(values, 0.50) * 1000.0,
+                "p95_ms": self._pct(values, 0.95) * 1000.0,
+                "max_ms": values[-1] * 1000.0,
+            }
+        return out
+
+    def format_stats(self, show_misses: bool = True) -> str:
+        rows = sorted(self.summary().items())
+        if not rows:
+            return "(no samples yet)"
+        return "\n".join(
+            f"{name}: n={r['calls']} p50={r['p50_ms']:.0f}ms p95={r['p95_ms']:.0f}ms max={r['max_ms']:.0f}ms"
+            + (f" over_budget={r['misses']}" if show_misses else "")
+            for name, r in rows
+        )
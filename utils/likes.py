@@ -0,0 +1,90 @@
+import asyncio
+
+
+class LikePipeline:
+    """
+    Deferred, deduplicated post likes.
+    request() only records the post id (no I/O, safe to call from any handler
+    on the loop); run() sends the collected votes in the background and marks
+    the liked ones in liked_posts with one transaction per flush and state
+    partition (one pipeline serves every forum, each con is one forum's DB).
+
+    liked(con, post_id) / mark_liked(con, post_id) are the state helpers,
+    vote(post_id) is the async vote call.
+    """
+
+    def __init__(self, liked, mark_liked, vote, flush_s: float = 2.0, log=print):
+        self._liked = liked
+        self._mark_liked = mark_liked
+        self._vote = vote
+        self.flush_s = float(flush_s)
+        self.log = log
+        self._pending = {}  # post_id -> (con, reason "self" / "parent"), insertion ordered
+        self._inflight = set()
+        self._kick = asyncio.Event()
+        self.stats = {"requested": 0, "deduped": 0, "sent": 0, "failed": 0, "flushes": 0}
+
+    def request(self, con, post_id: str, reason: str = "self"):
+        post_id = str(post_id or "").strip()
+        if not post_id:
+            return
+        self.stats["requested"] += 1
+        if post_id in self._pending or post_id in self._inflight or self._liked(con, post_id):
+            self.stats["deduped"] += 1
+            return
+        self._pending[post_id] = (con, reason)
+
+    def kick(self):
+        """Flush now instead of waiting for the timer (e.g. at the end of a poll cycle)."""
+        if self._pending:
+            self._kick.set()
+
+    async def flush(self) -> int:
+        if not self._pending:
+            return 0
+        batch, self._pending = self._pending, {}
+        self._inflight.update(batch)
+        try:
+            ids = list(batch)
+            results = await asyncio.gather(*(self._vote(pid) for pid in ids), return_exceptions=True)
+        finally:
+            self._inflight.difference_update(batch)
+
+        done = []
+        by_con = {}
+        for pid, res in zip(ids, results):
+            if isinstance(res, BaseException):
+                self.stats["failed"] += 1
+                self.log(f"LIKE failed ({batch[pid][1]}) post_id={pid}: {res}")
+            else:
+                done.append(pid)
+                by_con.setdefault(batch[pid][0], []).append(pid)
+
+        for con, pids in by_con.items():
+            with con.batch():
+                for pid in pids:
+                    self._mark_liked(con, pid)
+        self.stats["sent"] += len(done)
+        self.stats["flushes"] += 1
+        if done:
+            self.log(f"LIKED {len(done)} posts: " + ", ".join(f"{pid} ({batch[pid][1]})" for pid in done))
+        return len(done)
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._kick.wait(), timeout=self.flush_s)
+            except asyncio.TimeoutError:
+                pass
+            self._kick.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                self.log(f"LIKE flush failed: {e}")
+
+    def format_stats(self) -> str:
+        st = self.stats
+        return (
+            f"pending={len(self._pending)} inflight={len(self._inflight)} requested={st['requested']} "
+            f"deduped={st['deduped']} sent={st['sent']} failed={st['failed']} flushes={st['flushes']}"
+        )
@@ -1,35 +1,310 @@
 import os
+import re
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
 import requests
 
+from utils.cache_db import cache_db
+from utils.circuit_breaker import guarded_request
+from utils.deadline import remaining, DeadlineExceeded
+
 GROQ_BASE_URL = "https://api.groq.com/openai/v1"
 
-def groq_chat(prompt: str, system: str = "", temperature: float = 0.2, max_tokens: int = 220) -> str:
-    api_key = (os.environ.get("GROQ_API_KEY") or "").strip()
-    if not api_key:
-        raise RuntimeError("Missing GROQ_API_KEY env var.")
+# Completion cache: in-memory LRU + cache DB, entries expire after the TTL
+GROQ_CACHE_TTL_SECONDS = int(os.environ.get("GROQ_CACHE_TTL_SECONDS", "86400"))
+GROQ_CACHE_MAX = int(os.environ.get("GROQ_CACHE_MAX", "512"))
 
-    model = (os.environ.get("GROQ_MODEL") or "llama-3.3-70b-versatile").strip()
+# Streaming stops this many seconds before the command deadline (time left to post the reply)
+GROQ_STREAM_MARGIN_SECONDS = float(os.environ.get("GROQ_STREAM_MARGIN_SECONDS", "0.3"))
 
-    url = f"{GROQ_BASE_URL}/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json",
-    }
+_SENTENCE_END_RE = re.compile(r"[.!?…](?=\s|$)")
+
+
+def _cache_key(model: str, system: str, prompt: str, temperature: float, max_tokens: int) -> str:
+    norm_prompt = " ".join((prompt or "").split()).casefold()
+    raw = json.dumps([model, system or "", norm_prompt, round(float(temperature), 3), int(max_tokens)], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class _InFlight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class CompletionCache:
+    """
+    key -> (text, tokens, created_unix)
+    - LRU dict in memory (GROQ_CACHE_MAX entries), cache DB table llm_cache behind it
+    - identical requests running at the same time share one API call
+    Errors and empty answers are not cached.
+    """
+
+    def __init__(self, ttl_s: int = GROQ_CACHE_TTL_SECONDS, max_entries: int = GROQ_CACHE_MAX):
+        self.ttl_s = int(ttl_s)
+        self.max_entries = max(1, int(max_entries))
+        self._mem = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._table_ready = False
+        self.stats = {"mem_hits": 0, "db_hits": 0, "coalesced": 0, "completions": 0, "partial": 0, "errors": 0,
+                      "tokens_used": 0, "tokens_saved": 0}
+
+    def _db(self):
+        con, lock = cache_db()
+        if not self._table_ready:
+            with lock:
+                con.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS llm_cache (
+                        k TEXT PRIMARY KEY,
+                        response TEXT NOT NULL,
+                        tokens INTEGER NOT NULL DEFAULT 0,
+                        created_unix INTEGER NOT NULL
+                    )
+                    """
+                )
+                con.execute("DELETE FROM llm_cache WHERE created_unix < ?", (int(time.time()) - self.ttl_s,))
+                con.commit()
+            self._table_ready = True
+        return con, lock
+
+    def _remember(self, key: str, entry: tuple):
+        self._mem[key] = entry
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+
+    def _mem_lookup(self, key: str):
+        """(text, tokens, created_unix) from the LRU or None. Caller holds self._lock."""
+        entry = self._mem.get(key)
+        if entry is not None:
+            if time.time() - entry[2] < self.ttl_s:
+                self._mem.move_to_end(key)
+                self.stats["mem_hits"] += 1
+                return entry
+            del self._mem[key]
+        return None
+
+    def _db_lookup(self, key: str):
+        """(text, tokens, created_unix) from the cache DB or None. Runs without self._lock."""
+        con, lock = self._db()
+        with lock:
+            row = con.execute("SELECT response, tokens, created_unix FROM llm_cache WHERE k = ?", (key,)).fetchone()
+        if row and time.time() - row[2] < self.ttl_s:
+            return row
+        return None
+
+    def _db_store(self, key: str, entry: tuple):
+        """Runs without self._lock."""
+        con, lock = self._db()
+        with lock:
+            con.execute(
+                "INSERT OR REPLACE INTO llm_cache(k, response, tokens, created_unix) VALUES(?, ?, ?, ?)",
+                (key, *entry),
+            )
+            con.commit()
+
+    def get_or_call(self, key: str, call):
+        """
+        call() -> (text, tokens, complete). Returns text from cache, a shared
+        in-flight call, or a new call. Partial (deadline-cut) answers are not cached.
+        self._lock only guards the LRU, the in-flight dict and the stats; the
+        cache DB is read and written outside it by the request's owner.
+        """
+        with self._lock:
+            entry = self._mem_lookup(key)
+            if entry is not None:
+                self.stats["tokens_saved"] += entry[1]
+                return entry[0]
+            flight = self._inflight.get(key)
+            owner = flight is None
+            if owner:
+                flight = self._inflight[key] = _InFlight()
+            else:
+                self.stats["coalesced"] += 1
+
+        if not owner:
+            if not flight.done.wait(timeout=remaining()):
+                raise DeadlineExceeded("command deadline exceeded")
+            if flight.error is not None:
+                raise flight.error
+            text, tokens = flight.result
+            with self._lock:
+                self.stats["tokens_saved"] += tokens
+            return text
+
+        try:
+            row = self._db_lookup(key)
+            if row is not None:
+                flight.result = (row[0], row[1])
+                with self._lock:
+                    self._remember(key, row)
+                    self.stats["db_hits"] += 1
+                    self.stats["tokens_saved"] += row[1]
+                return row[0]
+
+            text, tokens, complete = call()
+            flight.result = (text, tokens)
+            with self._lock:
+                self.stats["completions"] += 1
+                self.stats["tokens_used"] += tokens
+                if not complete:
+                    self.stats["partial"] += 1
+            if text and complete:
+                entry = (text, int(tokens), int(time.time()))
+                with self._lock:
+                    self._remember(key, entry)
+                self._db_store(key, entry)
+            return text
+        except Exception as e:
+            flight.error = e
+            with self._lock:
+                self.stats["errors"] += 1
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+    def format_stats(self) -> str:
+        with self._lock:
+            st = dict(self.stats)
+            size = len(self._mem)
+        hits = st["mem_hits"] + st["db_hits"] + st["coalesced"]
+        total = hits + st["completions"] + st["errors"]
+        rate = hits / total * 100 if total else 0.0
+        return (
+            f"entries={size} hits={hits} (mem={st['mem_hits']} db={st['db_hits']} coalesced={st['coalesced']}) "
+            f"completions={st['completions']} partial={st['partial']} errors={st['errors']} hit_rate={rate:.0f}% "
+            f"tokens_used={st['tokens_used']} tokens_saved={st['tokens_saved']}"
+        )
+
+
+CACHE = CompletionCache()
 
+
+def trim_to_sentence(text: str) -> str:
+    """Cuts a partial answer after its last complete sentence (or last word + "…")."""
+    text = (text or "").strip()
+    last = None
+    for m in _SENTENCE_END_RE.finditer(text):
+        last = m
+    if last is not None:
+        return text[: last.end()]
+    if " " in text:
+        return text.rsplit(" ", 1)[0].rstrip(",;:-") + " …"
+    return text
+
+
+def _request_payload(model: str, prompt: str, system: str, temperature: float, max_tokens: int) -> dict:
     messages = []
     if system:
         messages.append({"role": "system", "content": system})
     messages.append({"role": "user", "content": prompt})
 
-    payload = {
+    return {
         "model": model,
         "messages": messages,
         "temperature": float(temperature),
         "max_tokens": int(max_tokens),
     }
 
-    r = requests.post(url, headers=headers, json=payload, timeout=20)
+
+def _groq_completion(api_key: str, model: str, prompt: str, system: str, temperature: float, max_tokens: int) -> tuple[str, int, bool]:
+    url = f"{GROQ_BASE_URL}/chat/completions"
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+    }
+    payload = _request_payload(model, prompt, system, temperature, max_tokens)
+
+    r = guarded_request("POST", url, headers=headers, json=payload, timeout=20)
     r.raise_for_status()
     j = r.json()
 
-    return (((j.get("choices") or [])[0].get("message") or {}).get("content") or "").strip()
+    text = (((j.get("choices") or [])[0].get("message") or {}).get("content") or "").strip()
+    tokens = int((j.get("usage") or {}).get("total_tokens") or 0)
+    return text, tokens, True
+
+
+def _groq_stream(api_key: str, model: str, prompt: str, system: str, temperature: float, max_tokens: int) -> tuple[str, int, bool]:
+    """
+    Streaming completion (SSE). Collects deltas until the answer is done or the
+    command deadline is GROQ_STREAM_MARGIN_SECONDS away; a cut answer is trimmed
+    at the last sentence boundary.
+    """
+    url = f"{GROQ_BASE_URL}/chat/completions"
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+    }
+    payload = _request_payload(model, prompt, system, temperature, max_tokens)
+    payload["stream"] = True
+
+    r = guarded_request("POST", url, headers=headers, json=payload, timeout=20, stream=True)
+    r.raise_for_status()
+    # text/event-stream without charset: requests would decode as ISO-8859-1 (SSE is always UTF-8)
+    r.encoding = "utf-8"
+
+    parts = []
+    tokens = 0
+    complete = False
+    try:
+        for line in r.iter_lines(decode_unicode=True):
+            if line and line.startswith("data:"):
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    complete = True
+                    break
+                j = json.loads(data)
+                choice = (j.get("choices") or [{}])[0]
+                parts.append((choice.get("delta") or {}).get("content") or "")
+                usage = (j.get("x_groq") or {}).get("usage") or j.get("usage")
+                if usage:
+                    tokens = int(usage.get("total_tokens") or 0)
+                if choice.get("finish_reason"):
+                    complete = True
+
+            left = remaining()
+            if left is not None and left <= GROQ_STREAM_MARGIN_SECONDS:
+                break
+    except requests.RequestException:
+        # stream stalled until the (deadline-capped) read timeout: keep what we have
+        if not parts:
+            raise DeadlineExceeded("command deadline exceeded")
+    finally:
+        r.close()
+
+    text = "".join(parts).strip()
+    if not complete:
+        text = trim_to_sentence(text)
+    return text, tokens, complete
+
+
+def groq_chat(prompt: str, system: str = "", temperature: float = 0.2, max_tokens: int = 220, stream: bool | None = None) -> str:
+    """
+    stream=None streams whenever a command deadline is set (utils.deadline),
+    so a slow completion still yields a partial answer within the budget.
+    """
+    api_key = (os.environ.get("GROQ_API_KEY") or "").strip()
+    if not api_key:
+        raise RuntimeError("Missing GROQ_API_KEY env var.")
+
+    model = (os.environ.get("GROQ_MODEL") or "llama-3.3-70b-versatile").strip()
+
+    if stream is None:
+        stream = remaining() is not None
+    complete_fn = _groq_stream if stream else _groq_completion
+
+    key = _cache_key(model, system, prompt, temperature, max_tokens)
+    return CACHE.get_or_call(
+        key, lambda: complete_fn(api_key, model, prompt, system, temperature, max_tokens)
+    )
@@ -0,0 +1,195 @@
+import time
+
+# Numbered state DB migrations, tracked in PRAGMA user_version.
+# Each one runs in its own transaction together with the version bump;
+# for a DB at LATEST_VERSION the migration step is one pragma read, no DDL
+# (db_init still loads the in-memory caches, see utils/state_db.py).
+# Migrations spell out their tables instead of using state_db constants:
+# what version N did must not change when the code moves on.
+
+SEEN_TABLES = (("seen_posts", "post_id"), ("seen_threads", "thread_id"), ("liked_posts", "post_id"))
+
+
+def _columns(con, table: str) -> list[str]:
+    return [r[1] for r in con.execute(f"PRAGMA table_info({table})").fetchall()]
+
+
+def _register_backfill(con, name: str):
+    con.execute(
+        "INSERT OR IGNORE INTO schema_backfills(name, added_at_unix, done_at_unix) VALUES(?, ?, NULL)",
+        (name, int(time.time())),
+    )
+
+
+def _m001_baseline(con):
+    """The schema as db_init used to create it, plus the old ad-hoc upgrades."""
+    for table, column in SEEN_TABLES:
+        con.execute(f"CREATE TABLE IF NOT EXISTS {table} ({column} TEXT PRIMARY KEY, seen_at_unix INTEGER)")
+    con.execute("CREATE TABLE IF NOT EXISTS kv (k TEXT PRIMARY KEY, v TEXT)")
+    con.execute("CREATE TABLE IF NOT EXISTS pending_unbans (blacklist_id TEXT PRIMARY KEY, due_unix INTEGER NOT NULL)")
+
+    # Ban history (only what THIS bot triggers)
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS bans_log (
+            blacklist_id TEXT PRIMARY KEY,
+            thread_id TEXT,
+            ban_cmd_post_id TEXT,
+            target_post_id TEXT,
+            subject_type TEXT,
+            subject_label TEXT,
+            started_at_unix INTEGER NOT NULL,
+            duration_secs INTEGER,
+            due_unix INTEGER,
+            unbanned_at_unix INTEGER
+        )
+    """)
+
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS schema_backfills (
+            name TEXT PRIMARY KEY,
+            added_at_unix INTEGER NOT NULL,
+            done_at_unix INTEGER
+        ) WITHOUT ROWID
+    """)
+
+    # Older DBs: id-only tables -> add seen_at_unix; the rows get "now" from an online backfill
+    for table, _ in SEEN_TABLES:
+        if "seen_at_unix" not in _columns(con, table):
+            con.execute(f"ALTER TABLE {table} ADD COLUMN seen_at_unix INTEGER")
+            _register_backfill(con, f"{table}.seen_at_unix")
+        con.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_seen_at ON {table}(seen_at_unix)")
+
+    # Older DBs: pending_unbans with other columns -> rebuild as (blacklist_id, due_unix)
+    cols = _columns(con, "pending_unbans")
+    if cols != ["blacklist_id", "due_unix"]:
+        con.execute("ALTER TABLE pending_unbans RENAME TO pending_unbans_old")
+        con.execute("CREATE TABLE pending_unbans (blacklist_id TEXT PRIMARY KEY, due_unix INTEGER NOT NULL)")
+        old_id_col = next((c for c in ("blacklist_id", "id", "block_id", "blacklist") if c in cols), None)
+        if old_id_col and "due_unix" in cols:
+            con.execute(f"""
+                INSERT OR IGNORE INTO pending_unbans(blacklist_id, due_unix)
+                SELECT CAST({old_id_col} AS TEXT), due_unix FROM pending_unbans_old
+            """)
+        con.execute("DROP TABLE pending_unbans_old")
+
+
+def _rebuild_without_rowid(con, table: str, create_sql: str, columns: str):
+    con.execute(f"ALTER TABLE {table} RENAME TO {table}_old")
+    con.execute(create_sql)
+    con.execute(f"INSERT INTO {table}({columns}) SELECT {columns} FROM {table}_old")
+    con.execute(f"DROP TABLE {table}_old")
+
+
+def _m002_without_rowid(con):
+    """
+    Small rows keyed by a TEXT id: WITHOUT ROWID stores them in the primary
+    key b-tree itself, so a lookup is one b-tree search instead of
+    autoindex + rowid table, and the ids are not stored twice.
+    bans_log keeps its rowid (wide rows, secondary index for the report).
+    """
+    for table, column in SEEN_TABLES:
+        _rebuild_without_rowid(
+            con,
+            table,
+            f"CREATE TABLE {table} ({column} TEXT PRIMARY KEY, seen_at_unix INTEGER) WITHOUT ROWID",
+            f"{column}, seen_at_unix",
+        )
+        con.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_seen_at ON {table}(seen_at_unix)")
+    _rebuild_without_rowid(con, "kv", "CREATE TABLE kv (k TEXT PRIMARY KEY, v TEXT) WITHOUT ROWID", "k, v")
+    _rebuild_without_rowid(
+        con,
+        "pending_unbans",
+        "CREATE TABLE pending_unbans (blacklist_id TEXT PRIMARY KEY, due_unix INTEGER NOT NULL) WITHOUT ROWID",
+        "blacklist_id, due_unix",
+    )
+
+
+def _m003_lookup_indexes(con):
+    # unban scheduler: due ids in due order
+    con.execute("CREATE INDEX IF NOT EXISTS idx_pending_unbans_due ON pending_unbans(due_unix)")
+    # ban report: WHERE subject_type = 'user' AND started_at_unix >= ? ORDER BY started_at_unix DESC
+    con.execute("CREATE INDEX IF NOT EXISTS idx_bans_log_type_started ON bans_log(subject_type, started_at_unix)")
+
+
+MIGRATIONS = [
+    (1, "baseline schema", _m001_baseline),
+    (2, "WITHOUT ROWID for id tables", _m002_without_rowid),
+    (3, "lookup indexes", _m003_lookup_indexes),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(con) -> int:
+    return con.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(con, log=print, before=None) -> int:
+    """
+    Bring the DB to LATEST_VERSION. Returns the number of migrations applied.
+    before(con) runs once ahead of the first pending migration, outside any
+    transaction (for things like VACUUM that cannot run inside one).
+    """
+    version = schema_version(con)
+    if version >= LATEST_VERSION:
+        return 0
+
+    if before is not None:
+        before(con)
+
+    applied = 0
+    for number, name, fn in MIGRATIONS:
+        if number <= version:
+            continue
+        t0 = time.perf_counter()
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            fn(con)
+            con.execute(f"PRAGMA user_version = {int(number)}")
+        except BaseException:
+            con.rollback()
+            raise
+        con.commit()
+        applied += 1
+        log(f"DB MIGRATION {number:03d} {name} ({(time.perf_counter() - t0) * 1000:.0f}ms)")
+    return applied
+
+
+# -------------------------
+# Online backfills
+# -------------------------
+# Data fixes too slow for startup. A migration registers them in
+# schema_backfills; run_backfills() does one chunk per call from a
+# background task until the step function reports nothing left.
+def _backfill_seen_at(table: str, column: str):
+    def step(con, chunk: int) -> int:
+        cur = con.execute(
+            f"""
+            UPDATE {table} SET seen_at_unix = ?
+            WHERE {column} IN (SELECT {column} FROM {table} WHERE seen_at_unix IS NULL LIMIT ?)
+            """,
+            (int(time.time()), int(chunk)),
+        )
+        return cur.rowcount or 0
+    return step
+
+
+BACKFILLS = {f"{table}.seen_at_unix": _backfill_seen_at(table, column) for table, column in SEEN_TABLES}
+
+
+def pending_backfills(con) -> list[str]:
+    rows = con.execute("SELECT name FROM schema_backfills WHERE done_at_unix IS NULL ORDER BY added_at_unix").fetchall()
+    return [name for (name,) in rows if name in BACKFILLS]
+
+
+def run_backfills(con, chunk: int = 1000, log=print) -> int:
+    """One chunk of the first pending backfill (one transaction). Returns rows touched; 0 = all done."""
+    for name in pending_backfills(con):
+        with con.batch():
+            n = BACKFILLS[name](con, chunk)
+            if not n:
+                con.execute("UPDATE schema_backfills SET done_at_unix = ? WHERE name = ?", (int(time.time()), name))
+        if n:
+            return n
+        log(f"DB BACKFILL {name} done")
+    return 0
@@ -0,0 +1,128 @@
+import json
+import time
+
+
+def parse_mods(mods_response: list[dict]) -> dict:
+    mod_ids = set()
+    mod_usernames = set()
+    display_names = []
+
+    for item in mods_response or []:
+        if not isinstance(item, dict):
+            continue
+        user = item.get("user") if isinstance(item.get("user"), dict) else None
+        if not isinstance(user, dict):
+            continue
+
+        uid = str(user.get("id") or "").strip()
+        uname = str(user.get("username") or "").strip().lower()
+        dname = str(user.get("name") or "").strip()
+
+        if uid:
+            mod_ids.add(uid)
+        if uname:
+            mod_usernames.add(uname)
+
+        # Output requirement: ONLY display names
+        if dname:
+            display_names.append(dname)
+
+    uniq = []
+    seen = set()
+    for n in display_names:
+        k = n.lower()
+        if k in seen:
+            continue
+        seen.add(k)
+        uniq.append(n)
+
+    return {
+        "ids": sorted(mod_ids),
+        "usernames": sorted(mod_usernames),
+        "display_names": uniq,
+    }
+
+
+def format_mods_bullets(display_names: list[str]) -> str:
+    if not display_names:
+        return "Mods:\n- (keine Anzeigenamen gefunden)"
+    lines = ["Mods:"]
+    for n in display_names:
+        lines.append(f"- {n}")
+    return "\n".join(lines)
+
+
+class _Snapshot:
+    __slots__ = ("ids", "usernames", "display_names", "bullets")
+
+    def __init__(self, parsed: dict):
+        self.ids = frozenset(parsed.get("ids") or [])
+        self.usernames = frozenset(parsed.get("usernames") or [])
+        self.display_names = tuple(parsed.get("display_names") or [])
+        self.bullets = format_mods_bullets(list(self.display_names))
+
+
+class ModeratorRegistry:
+    """
+    Decoded moderator list, rebuilt once per refresh:
+    frozensets of ids / usernames + the pre-rendered "Mods:" text.
+    The snapshot is swapped as one object, so readers never see half an update.
+    Expiry lives in memory; the caller refreshes when stale().
+    """
+
+    def __init__(self, ttl_s: int, force_min_interval_s: int = 60):
+        self.ttl_s = int(ttl_s)
+        self.force_min_interval_s = int(force_min_interval_s)
+        self._snap = _Snapshot({})
+        self.refreshed_at = 0.0
+        self.last_forced_at = 0.0
+        self.stats = {"checks": 0, "refreshes": 0, "forced": 0, "forced_denied": 0}
+
+    def load_cached(self, raw_json: str | None, refreshed_at: float = 0.0):
+        """Warm start from the persisted kv copy (mods_cache_json)."""
+        try:
+            parsed = json.loads(raw_json) if raw_json else {}
+        except Exception:
+            parsed = {}
+        self._snap = _Snapshot(parsed)
+        self.refreshed_at = float(refreshed_at or 0)
+
+    def apply(self, mods_response: list[dict], now: float | None = None) -> dict:
+        """Install a fresh listModerators response. Returns the parsed dict (for persisting)."""
+        parsed = parse_mods(mods_response)
+        self._snap = _Snapshot(parsed)
+        self.refreshed_at = time.time() if now is None else now
+        self.stats["refreshes"] += 1
+        return parsed
+
+    def stale(self, now: float | None = None) -> bool:
+        now = time.time() if now is None else now
+        return (now - self.refreshed_at) >= self.ttl_s
+
+    def seconds_until_stale(self, now: float | None = None) -> float:
+        now = time.time() if now is None else now
+        return max(0.0, self.refreshed_at + self.ttl_s - now)
+
+    def allow_forced_refresh(self, now: float | None = None) -> bool:
+        """Rate limit for refreshes triggered by a moderator-check miss."""
+        now = time.time() if now is None else now
+        if now - self.last_forced_at < self.force_min_interval_s:
+            self.stats["forced_denied"] += 1
+            return False
+        self.last_forced_at = now
+        self.stats["forced"] += 1
+        return True
+
+    def is_moderator(self, author_id: str, author_username: str) -> bool:
+        self.stats["checks"] += 1
+        snap = self._snap
+        aid = (author_id or "").strip()
+        aun = (author_username or "").strip().lower()
+        return (aid in snap.ids) or (aun in snap.usernames)
+
+    @property
+    def bullets(self) -> str:
+        return self._snap.bullets
+
+    def __len__(self) -> int:
+        return len(self._snap.ids)
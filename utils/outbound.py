@@ -0,0 +1,140 @@
+import asyncio
+import itertools
+import random
+import time
+
+from utils.latency import LatencyTracker
+
+# Priority classes (lower runs first)
+MODERATION = 0   # bans, unbans, ban confirmations / reports
+REPLY = 1        # command replies
+BACKGROUND = 2   # welcomes, hourly posts, likes
+
+PRIORITY_NAMES = {MODERATION: "moderation", REPLY: "reply", BACKGROUND: "background"}
+
+
+class TokenBucket:
+    """rate tokens per second, at most burst tokens saved up."""
+
+    def __init__(self, rate_per_s: float, burst: int):
+        self.rate = max(0.01, float(rate_per_s))
+        self.burst = max(1.0, float(burst))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self) -> float:
+        """Seconds until one token is available (0 if there is one now)."""
+        self._refill()
+        if self.tokens >= 1.0:
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+    def take(self):
+        self._refill()
+        self.tokens -= 1.0
+
+
+class _Write:
+    __slots__ = ("priority", "label", "fn", "args", "idempotent", "future", "enqueued", "attempts")
+
+    def __init__(self, priority: int, label: str, fn, args: tuple, idempotent: bool, future):
+        self.priority = priority
+        self.label = label
+        self.fn = fn
+        self.args = args
+        self.idempotent = idempotent
+        self.future = future
+        self.enqueued = time.monotonic()
+        self.attempts = 0
+
+
+class OutboundQueue:
+    """
+    Single queue for Disqus write calls.
+    - highest priority class is sent first, FIFO within a class
+    - sends are paced by a token bucket, at most `concurrency` in flight
+    - failures for which is_retryable(err, idempotent) is true are re-queued
+      with jittered exponential backoff, up to max_attempts
+
+    submit() awaits the result of the blocking call fn(*args), which runs on
+    the loop's default executor. run() is the dispatcher task.
+    """
+
+    def __init__(self, rate_per_s: float, burst: int, concurrency: int = 4, max_attempts: int = 3,
+                 backoff_s: float = 1.0, is_retryable=None, log=print):
+        self.bucket = TokenBucket(rate_per_s, burst)
+        self.concurrency = max(1, int(concurrency))
+        self.max_attempts = max(1, int(max_attempts))
+        self.backoff_s = float(backoff_s)
+        self.is_retryable = is_retryable or (lambda err, idempotent: False)
+        self.log = log
+        self._queue = asyncio.PriorityQueue()
+        self._seq = itertools.count()
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._sending = set()  # running _send tasks (the loop only keeps weak references)
+        self.wait = LatencyTracker()
+        self.stats = {"sent": 0, "failed": 0, "retries": 0}
+
+    async def submit(self, priority: int, label: str, fn, *args, idempotent: bool = True):
+        future = asyncio.get_running_loop().create_future()
+        self._put(_Write(priority, label, fn, args, idempotent, future))
+        return await future
+
+    def _put(self, w: _Write):
+        self._queue.put_nowait((w.priority, next(self._seq), w))
+
+    async def run(self):
+        while True:
+            await self._slots.acquire()
+            delay = self.bucket.wait_time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            # pick the item only once a token is there, so late high-priority writes still go first
+            _, _, w = await self._queue.get()
+            self.bucket.take()
+            self.wait.record(PRIORITY_NAMES.get(w.priority, str(w.priority)), time.monotonic() - w.enqueued)
+            task = asyncio.create_task(self._send(w))
+            self._sending.add(task)
+            task.add_done_callback(self._sent)
+
+    def _sent(self, task):
+        self._sending.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self.log(f"OUTBOUND send task failed: {task.exception()}")
+
+    async def _send(self, w: _Write):
+        try:
+            w.attempts += 1
+            result = await asyncio.to_thread(w.fn, *w.args)
+        except Exception as e:
+            if w.attempts < self.max_attempts and self.is_retryable(e, w.idempotent):
+                delay = self.backoff_s * (2 ** (w.attempts - 1)) * (0.5 + random.random())
+                self.stats["retries"] += 1
+                self.log(f"OUTBOUND retry {w.label} in {delay:.1f}s (attempt {w.attempts}): {e}")
+                asyncio.get_running_loop().call_later(delay, self._put, w)
+            else:
+                self.stats["failed"] += 1
+                if not w.future.done():
+                    w.future.set_exception(e)
+        else:
+            self.stats["sent"] += 1
+            if not w.future.done():
+                w.future.set_result(result)
+        finally:
+            self._slots.release()
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def format_stats(self) -> str:
+        st = self.stats
+        head = (
+            f"depth={self.depth()} inflight={len(self._sending)} sent={st['sent']} failed={st['failed']} retries={st['retries']} "
+            f"rate={self.bucket.rate:g}/s burst={self.bucket.burst:g}"
+        )
+        return head + "\nqueue wait " + self.wait.format_stats(show_misses=False).replace("\n", "\nqueue wait ")
@@ -0,0 +1,93 @@
+import time
+
+
+class AdaptivePollInterval:
+    """
+    Poll interval that reacts to activity:
+    - new items -> back to floor_s (a burst is likely to continue)
+    - empty poll -> interval grows by backoff (up to ceiling_s)
+    Rate-limit info (X-Ratelimit-Remaining / X-Ratelimit-Reset) can
+    stretch the interval further so the quota lasts until the reset.
+    """
+
+    def __init__(self, name: str, floor_s: float, ceiling_s: float, start_s: float | None = None,
+                 backoff: float = 2.0, log=print):
+        self.name = name
+        self.floor_s = max(0.5, float(floor_s))
+        self.ceiling_s = max(self.floor_s, float(ceiling_s))
+        self.backoff = max(1.0, float(backoff))
+        self.interval_s = self._clamp(start_s if start_s is not None else self.floor_s)
+        self.reason = "start"
+        self.log = log
+        self._last_logged = None
+
+    def _clamp(self, v: float) -> float:
+        return min(self.ceiling_s, max(self.floor_s, float(v)))
+
+    def update(self, new_items: int, rate_limit: dict | None = None, calls_per_cycle: int = 1) -> float:
+        """
+        Feed the result of one poll cycle, returns the next interval (seconds).
+        rate_limit: {"remaining": int|None, "reset": unix|None}
+        """
+        if new_items > 0:
+            self.interval_s = self.floor_s
+            self.reason = f"active new={new_items}"
+        else:
+            self.interval_s = self._clamp(self.interval_s * self.backoff)
+            self.reason = "idle"
+
+        chosen = self.interval_s
+        quota_s = quota_interval(rate_limit, calls_per_cycle)
+        if quota_s is not None and quota_s > chosen:
+            chosen = quota_s
+            self.reason = f"ratelimit remaining={rate_limit.get('remaining')}"
+
+        self._log_if_changed(chosen, rate_limit)
+        return chosen
+
+    def _log_if_changed(self, chosen: float, rate_limit: dict | None):
+        key = round(chosen, 1)
+        if key == self._last_logged:
+            return
+        self._last_logged = key
+        remaining = (rate_limit or {}).get("remaining")
+        self.log(f"POLL {self.name} interval={chosen:.1f}s ({self.reason}) quota_remaining={remaining if remaining is not None else '-'}")
+
+
+def quota_interval(rate_limit: dict | None, calls_per_cycle: int = 1, now: float | None = None) -> float | None:
+    """
+    Seconds per cycle needed so the remaining quota lasts until the reset.
+    None if the API did not send rate-limit headers.
+    """
+    if not rate_limit:
+        return None
+    remaining = rate_limit.get("remaining")
+    reset = rate_limit.get("reset")
+    if remaining is None or reset is None:
+        return None
+
+    now = time.time() if now is None else now
+    window = float(reset) - now
+    if window <= 0:
+        return None
+
+    cycles_left = int(remaining) // max(1, int(calls_per_cycle))
+    if cycles_left <= 0:
+        return window
+    return window / cycles_left
+
+
+def parse_rate_limit_headers(headers) -> dict:
+    """Extract Disqus X-Ratelimit-* headers (missing -> None)."""
+    def _int(name):
+        v = (headers or {}).get(name)
+        try:
+            return int(float(v))
+        except (TypeError, ValueError):
+            return None
+
+    return {
+        "limit": _int("X-Ratelimit-Limit"),
+        "remaining": _int("X-Ratelimit-Remaining"),
+        "reset": _int("X-Ratelimit-Reset"),
+    }
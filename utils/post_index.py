@@ -0,0 +1,76 @@
+from collections import OrderedDict
+
+
+def _slim(p: dict) -> dict:
+    """The fields later lookups need (ban target, likes, reply context), not the message body."""
+    a = p.get("author") or {}
+    t = p.get("thread")
+    if isinstance(t, dict):
+        t = t.get("id")
+    return {
+        "id": str(p.get("id") or "").strip(),
+        "author": {"id": str(a.get("id") or "").strip(), "username": str(a.get("username") or "").strip()},
+        "thread": str(t or "").strip(),
+        "parent": str(p.get("parent") or "").strip() or None,
+        "createdAt": p.get("createdAt"),
+        "isSpam": bool(p.get("isSpam")),
+        "isDeleted": bool(p.get("isDeleted")),
+        "isApproved": bool(p.get("isApproved", True)),
+    }
+
+
+class PostIndex:
+    """
+    Bounded index of recently ingested posts (post id -> slim post dict),
+    filled from every listPosts page and from our own created posts.
+    Lookups check here first and only fall back to posts/details on a miss.
+    """
+
+    def __init__(self, max_posts: int = 5000):
+        self.max_posts = max(100, int(max_posts))
+        self._posts = OrderedDict()
+        self.stats = {"added": 0, "hits": 0, "misses": 0, "fetched": 0}
+
+    def add(self, p: dict):
+        rec = _slim(p or {})
+        pid = rec["id"]
+        if not pid:
+            return
+        self._posts[pid] = rec
+        self._posts.move_to_end(pid)
+        self.stats["added"] += 1
+        if len(self._posts) > self.max_posts:
+            self._posts.popitem(last=False)
+
+    def add_many(self, posts):
+        for p in posts or ():
+            self.add(p)
+
+    def get(self, post_id: str) -> dict | None:
+        rec = self._posts.get(str(post_id or "").strip())
+        self.stats["hits" if rec is not None else "misses"] += 1
+        return rec
+
+    async def lookup(self, post_id: str, fetch) -> dict | None:
+        """Index first, else await fetch(post_id) (posts/details) and remember the result."""
+        rec = self.get(post_id)
+        if rec is not None:
+            return rec
+        p = await fetch(post_id)
+        self.stats["fetched"] += 1
+        if not p:
+            return None
+        self.add(p)
+        return self._posts.get(str(post_id).strip()) or _slim(p)
+
+    def __len__(self) -> int:
+        return len(self._posts)
+
+    def format_stats(self) -> str:
+        st = self.stats
+        looked_up = st["hits"] + st["misses"]
+        rate = (st["hits"] / looked_up * 100.0) if looked_up else 0.0
+        return (
+            f"size={len(self._posts)}/{self.max_posts} added={st['added']} hits={st['hits']} "
+            f"misses={st['misses']} hit_rate={rate:.0f}% details_fetched={st['fetched']}"
+        )
@@ -0,0 +1,121 @@
+import hashlib
+import math
+import time
+from collections import OrderedDict
+
+
+class BloomFilter:
+    """Plain bit-array Bloom filter (double hashing over blake2b)."""
+
+    def __init__(self, capacity: int, fp_rate: float = 0.001):
+        self.capacity = max(1000, int(capacity))
+        self.fp_rate = fp_rate
+        self.m = int(-self.capacity * math.log(fp_rate) / (math.log(2) ** 2))
+        self.k = max(1, round(self.m / self.capacity * math.log(2)))
+        self.bits = bytearray((self.m + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        d = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(d[:8], "little")
+        h2 = int.from_bytes(d[8:], "little") | 1
+        for i in range(self.k):
+            yield (h1 + i * h2) % self.m
+
+    def add(self, key: str):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        for pos in self._positions(key):
+            if not self.bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+
+class SeenSet:
+    """
+    Membership for one id table (seen_posts / seen_threads / liked_posts).
+    - recent ids: bounded insertion-ordered dict, answers hot checks
+    - Bloom filter over all ids in the table: a miss means "definitely new"
+    - only Bloom hits outside the recent set fall back to a SELECT
+    Rows carry seen_at_unix (createdAt of the post, else insert time) for pruning.
+    add() inside a rolled-back batch takes the id out of the recent set again;
+    its Bloom bits stay (a Bloom hit only costs a SELECT, which then says no).
+    """
+
+    def __init__(self, con, table: str, column: str, recent_max: int = 5000, bloom_capacity: int = 200000):
+        self.con = con
+        self.table = table
+        self.column = column
+        self.recent_max = max(100, int(recent_max))
+        self.bloom_capacity = int(bloom_capacity)
+        self.recent = OrderedDict()
+        self.bloom = None
+        self.stats = {"recent_hits": 0, "bloom_negatives": 0, "sql_checks": 0, "bloom_false_positives": 0, "pruned": 0}
+        self.reload()
+
+    def reload(self):
+        total = self.con.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        self.bloom = BloomFilter(max(self.bloom_capacity, total * 2))
+        for (key,) in self.con.execute(f"SELECT {self.column} FROM {self.table}"):
+            self.bloom.add(str(key))
+
+        self.recent.clear()
+        rows = self.con.execute(
+            f"SELECT {self.column} FROM {self.table} ORDER BY seen_at_unix DESC LIMIT ?",
+            (self.recent_max,),
+        ).fetchall()
+        for (key,) in reversed(rows):
+            self.recent[str(key)] = True
+
+    def _remember(self, key: str):
+        self.recent[key] = True
+        self.recent.move_to_end(key)
+        if len(self.recent) > self.recent_max:
+            self.recent.popitem(last=False)
+
+    def contains(self, key: str) -> bool:
+        key = str(key)
+        if key in self.recent:
+            self.stats["recent_hits"] += 1
+            return True
+        if key not in self.bloom:
+            self.stats["bloom_negatives"] += 1
+            return False
+
+        self.stats["sql_checks"] += 1
+        cur = self.con.execute(f"SELECT 1 FROM {self.table} WHERE {self.column} = ?", (key,))
+        if cur.fetchone() is None:
+            self.stats["bloom_false_positives"] += 1
+            return False
+        return True
+
+    def add(self, key: str, seen_at_unix: int | None = None):
+        key = str(key)
+        self.con.execute(
+            f"INSERT OR IGNORE INTO {self.table}({self.column}, seen_at_unix) VALUES(?, ?)",
+            (key, int(seen_at_unix) if seen_at_unix is not None else int(time.time())),
+        )
+        if self.bloom.count >= self.bloom.capacity:
+            self.reload()
+        self.bloom.add(key)
+        if key not in self.recent:
+            self.con.on_rollback(lambda: self.recent.pop(key, None))
+        self._remember(key)
+
+    def prune(self, older_than_unix: int) -> int:
+        """Delete rows with seen_at_unix < older_than_unix. The Bloom filter keeps them (SQL says no)."""
+        cur = self.con.execute(f"DELETE FROM {self.table} WHERE seen_at_unix < ?", (int(older_than_unix),))
+        n = cur.rowcount or 0
+        self.stats["pruned"] += n
+        return n
+
+    def format_stats(self) -> str:
+        st = self.stats
+        return (
+            f"{self.table}: recent={len(self.recent)} bloom={self.bloom.count} "
+            f"recent_hits={st['recent_hits']} bloom_neg={st['bloom_negatives']} sql={st['sql_checks']} "
+            f"fp={st['bloom_false_positives']} pruned={st['pruned']}"
+        )
@@ -0,0 +1,237 @@
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+from utils.ban_report import BanReportWindow
+from utils.kv_cache import KVCache
+from utils.migrations import migrate
+from utils.seen_store import SeenSet
+
+STATE_DB_PATH = "disqus_state.db"
+
+# Seen-set retention (relative to the ingest high-water mark) and in-memory size
+SEEN_RETENTION_DAYS = float(os.environ.get("SEEN_RETENTION_DAYS", "30"))
+SEEN_THREAD_RETENTION_DAYS = float(os.environ.get("SEEN_THREAD_RETENTION_DAYS", "180"))
+SEEN_RECENT_MAX = int(os.environ.get("SEEN_RECENT_MAX", "5000"))
+
+# Pages released per incremental vacuum run
+VACUUM_PAGES = int(os.environ.get("VACUUM_PAGES", "500"))
+
+# kv keys that bypass the write-behind cache (committed on every kv_set)
+KV_DURABLE_KEYS = {
+    "next_hourly_post_unix",
+    "start_unix",
+}
+KV_DURABLE_PREFIXES = ()
+
+# id tables backed by a SeenSet: table -> id column
+SEEN_TABLES = {
+    "seen_posts": "post_id",
+    "seen_threads": "thread_id",
+    "liked_posts": "post_id",
+}
+
+
+class StateConnection(sqlite3.Connection):
+    """
+    sqlite3 connection with a unit-of-work: inside `with con.batch():`
+    every con.commit() from the state helpers is deferred and the whole
+    batch is committed once at the end (rolled back on error).
+    In-memory state that mirrors the DB follows the batch: on_rollback(fn)
+    undoes a change if the batch rolls back, after_commit(fn) applies one
+    only once the batch is committed.
+    commits counts real commits (for benchmarks / stats).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._batch_depth = 0
+        self._undo = []
+        self._after_commit = []
+        self.commits = 0
+        self.seen = {}  # table -> SeenSet (see attach_seen_sets)
+        self.kv_cache = None  # KVCache (see db_init); None -> kv helpers hit SQL directly
+        self.forum = ""  # forum shortname this DB holds the state of (see db_init)
+        self.ban_report = BanReportWindow()  # last 24h of bans_log (loaded in db_init)
+
+    def commit(self):
+        if self._batch_depth:
+            return
+        self.commits += 1
+        super().commit()
+
+    def on_rollback(self, fn):
+        """Inside a batch: fn() runs if the batch rolls back. Outside a batch the write is already committed."""
+        if self._batch_depth:
+            self._undo.append(fn)
+
+    def after_commit(self, fn):
+        """Inside a batch: fn() runs once the batch is committed. Outside a batch: right away."""
+        if self._batch_depth:
+            self._after_commit.append(fn)
+        else:
+            fn()
+
+    def _abort(self):
+        self.rollback()
+        undo, self._undo, self._after_commit = self._undo, [], []
+        for fn in reversed(undo):
+            fn()
+
+    @contextmanager
+    def batch(self):
+        self._batch_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self._abort()
+            raise
+        self._batch_depth -= 1
+        if self._batch_depth:
+            return
+        try:
+            self.commit()
+        except BaseException:
+            self._abort()
+            raise
+        self._undo.clear()
+        done, self._after_commit = self._after_commit, []
+        for fn in done:
+            fn()
+
+
+def open_state_db(path: str = STATE_DB_PATH, wal: bool = True, synchronous: str = "NORMAL") -> StateConnection:
+    """
+    WAL + synchronous=NORMAL: commits only append to the WAL, fsync happens
+    at checkpoints. A power loss can drop the last commits but never
+    corrupts the DB, which is fine for dedupe state.
+    """
+    con = sqlite3.connect(path, factory=StateConnection)
+    if wal:
+        con.execute("PRAGMA journal_mode=WAL")
+    con.execute(f"PRAGMA synchronous={synchronous}")
+    return con
+
+
+# -------------------------
+# DB helpers
+# -------------------------
+def forum_db_path(forum: str, primary: bool) -> str:
+    """
+    One state DB per forum. The first configured forum keeps STATE_DB_PATH,
+    so a single-forum install keeps its state when more forums are added.
+    """
+    if primary:
+        return STATE_DB_PATH
+    root, ext = os.path.splitext(STATE_DB_PATH)
+    return f"{root}.{forum}{ext}"
+
+
+def db_init(path: str = STATE_DB_PATH, forum: str = "", log=print):
+    """
+    Open the state DB; schema changes only run when user_version is behind
+    (see utils/migrations.py). A current schema skips the DDL, but every
+    start still reads all seen/liked ids into the Bloom filters, the whole
+    kv table and the ban report window. The seen tables are bounded by
+    prune_seen's retention, so that cost stays bounded too.
+    """
+    con = open_state_db(path)
+    con.forum = forum
+    migrate(con, log=log, before=lambda c: enable_incremental_vacuum(c, log=log))
+    attach_seen_sets(con)
+    con.kv_cache = KVCache(con, durable_keys=KV_DURABLE_KEYS, durable_prefixes=KV_DURABLE_PREFIXES)
+    con.ban_report.load(con, int(time.time()))
+    return con
+
+
+def enable_incremental_vacuum(con, log=print):
+    """auto_vacuum can only change via a full VACUUM; do that once, later runs are incremental."""
+    if con.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+        return
+    con.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    con.execute("VACUUM")
+    log("DB: auto_vacuum set to INCREMENTAL")
+
+
+def attach_seen_sets(con):
+    for table, column in SEEN_TABLES.items():
+        con.seen[table] = SeenSet(con, table, column, recent_max=SEEN_RECENT_MAX)
+
+
+def prune_seen(con, hwm_unix: int, log=print) -> int:
+    """
+    Drop seen/liked rows older than the retention horizon, counted back from
+    the ingest high-water mark (not wall clock: after a long downtime we still
+    have the rows the catch-up needs). Then release free pages incrementally.
+    """
+    post_cutoff = int(hwm_unix - SEEN_RETENTION_DAYS * 86400)
+    thread_cutoff = int(hwm_unix - SEEN_THREAD_RETENTION_DAYS * 86400)
+
+    with con.batch():
+        n = con.seen["seen_posts"].prune(post_cutoff)
+        n += con.seen["liked_posts"].prune(post_cutoff)
+        n += con.seen["seen_threads"].prune(thread_cutoff)
+
+    if n:
+        free_before = con.execute("PRAGMA freelist_count").fetchone()[0]
+        # executescript steps the pragma to completion (execute() frees a single page)
+        con.executescript(f"PRAGMA incremental_vacuum({VACUUM_PAGES});")
+        free_after = con.execute("PRAGMA freelist_count").fetchone()[0]
+        log(f"DB PRUNE rows={n} pages_released={free_before - free_after} freelist={free_after}")
+    return n
+
+
+def kv_get(con, k: str):
+    if con.kv_cache is not None:
+        return con.kv_cache.get(k)
+    cur = con.execute("SELECT v FROM kv WHERE k = ?", (k,))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+def kv_set(con, k: str, v: str):
+    if con.kv_cache is not None:
+        con.kv_cache.set(k, v)
+        return
+    con.execute(
+        "INSERT INTO kv(k, v) VALUES(?, ?) ON CONFLICT(k) DO UPDATE SET v=excluded.v",
+        (k, v),
+    )
+    con.commit()
+
+
+def flush_kv(con) -> int:
+    """Write dirty kv keys (call once per loop iteration and on shutdown)."""
+    if con.kv_cache is None:
+        return 0
+    return con.kv_cache.flush()
+
+
+def seen_post(con, post_id: str) -> bool:
+    return con.seen["seen_posts"].contains(post_id)
+
+
+def mark_seen_post(con, post_id: str, created_unix: int | None = None):
+    con.seen["seen_posts"].add(post_id, created_unix)
+    con.commit()
+
+
+def seen_thread(con, thread_id: str) -> bool:
+    return con.seen["seen_threads"].contains(thread_id)
+
+
+def mark_seen_thread(con, thread_id: str, created_unix: int | None = None):
+    con.seen["seen_threads"].add(thread_id, created_unix)
+    con.commit()
+
+
+def liked(con, post_id: str) -> bool:
+    return con.seen["liked_posts"].contains(post_id)
+
+
+def mark_liked(con, post_id: str):
+    con.seen["liked_posts"].add(post_id)
+    con.commit()
@@ -1,4 +1,5 @@
 import re
+from datetime import datetime, timezone
 
 _TAG_RE = re.compile(r"<[^>]+>")
 
@@ -9,3 +10,24 @@ def strip_html(text: str) -> str:
     t = _TAG_RE.sub(" ", text)
     t = " ".join(t.split())
     return t.strip()
+
+
+def normalize_post_text(raw: str) -> str:
+    """Disqus message HTML -> single-spaced plain text (what the router sees)."""
+    text = strip_html(raw or "").replace("\u00a0", " ")
+    return " ".join(text.split())
+
+
+def created_at_to_unix(created_at: str) -> int | None:
+    if not created_at:
+        return None
+    try:
+        s = created_at.strip()
+        if s.endswith("Z"):
+            s = s[:-1] + "+00:00"
+        dt = datetime.fromisoformat(s)
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return int(dt.timestamp())
+    except Exception:
+        return None
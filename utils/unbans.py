@@ -0,0 +1,167 @@
+import asyncio
+import heapq
+import time
+
+
+class UnbanScheduler:
+    """
+    Timed unbans without polling: a min-heap of (due_unix, forum, blacklist_id)
+    mirrors pending_unbans of every forum's state DB. run() sleeps until the
+    earliest due time (or until schedule() adds an earlier one), then removes
+    everything due with one batched call and one transaction per forum.
+    A failed batch is retried per id; ids that still fail are pushed back
+    by retry_s. If the DB update fails after a successful remove call, the
+    ids are pushed back too and the retry only repeats the DB update.
+    schedule() inside a con.batch() enters the heap once the batch commits.
+
+    remove(forum, ids) is the async blacklists/remove call (list of ids),
+    mark_unbanned(con, blacklist_id, unix) updates bans_log.
+    """
+
+    def __init__(self, remove, mark_unbanned, batch_max: int = 100, retry_s: int = 60, log=print):
+        self._remove = remove
+        self._mark_unbanned = mark_unbanned
+        self.batch_max = max(1, int(batch_max))
+        self.retry_s = int(retry_s)
+        self.log = log
+        self._heap = []
+        self._due = {}  # (forum, blacklist_id) -> due_unix (heap entries not matching are stale)
+        self._cons = {}  # forum -> state connection
+        self._removed = set()  # (forum, blacklist_id) removed at Disqus, DB update still pending
+        self._wake = asyncio.Event()
+        self.stats = {"scheduled": 0, "removed": 0, "batches": 0, "batch_failures": 0, "item_failures": 0, "db_failures": 0}
+
+    def load(self, con):
+        """Adds the pending unbans of one forum's state DB (called once per forum)."""
+        forum = con.forum
+        self._cons[forum] = con
+        rows = con.execute("SELECT blacklist_id, due_unix FROM pending_unbans").fetchall()
+        for bid, due in rows:
+            self._due[(forum, str(bid))] = int(due)
+            self._heap.append((int(due), forum, str(bid)))
+        heapq.heapify(self._heap)
+        self.log(f"UNBANS loaded forum={forum} pending={len(rows)} next_due={self.next_due()}")
+
+    def schedule(self, con, blacklist_id: str, due_unix: int):
+        blacklist_id, due_unix = str(blacklist_id), int(due_unix)
+        con.execute(
+            "INSERT OR REPLACE INTO pending_unbans(blacklist_id, due_unix) VALUES(?, ?)",
+            (blacklist_id, due_unix),
+        )
+        con.commit()
+        self._cons[con.forum] = con
+        con.after_commit(lambda: self._scheduled(con.forum, blacklist_id, due_unix))
+
+    def _scheduled(self, forum: str, blacklist_id: str, due_unix: int):
+        self._removed.discard((forum, blacklist_id))
+        self._push(forum, blacklist_id, due_unix)
+        self.stats["scheduled"] += 1
+
+    def _push(self, forum: str, blacklist_id: str, due_unix: int):
+        self._due[(forum, blacklist_id)] = due_unix
+        heapq.heappush(self._heap, (due_unix, forum, blacklist_id))
+        if self._heap[0] == (due_unix, forum, blacklist_id):
+            self._wake.set()
+
+    def next_due(self) -> int | None:
+        while self._heap and self._due.get(self._heap[0][1:]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def _pop_due(self, now: int) -> dict[str, list[str]]:
+        """Due ids (at most batch_max over all forums), grouped by forum."""
+        by_forum = {}
+        n = 0
+        while n < self.batch_max:
+            due = self.next_due()
+            if due is None or due > now:
+                break
+            _, forum, bid = heapq.heappop(self._heap)
+            by_forum.setdefault(forum, []).append(bid)
+            n += 1
+        return by_forum
+
+    def _done(self, forum: str, ids: list[str], now: int):
+        con = self._cons[forum]
+        with con.batch():
+            con.executemany("DELETE FROM pending_unbans WHERE blacklist_id = ?", [(bid,) for bid in ids])
+            for bid in ids:
+                self._mark_unbanned(con, bid, now)
+        for bid in ids:
+            self._due.pop((forum, bid), None)
+            self._removed.discard((forum, bid))
+        self.stats["removed"] += len(ids)
+
+    def _record(self, forum: str, ids: list[str], now: int):
+        """_done(), or on a DB error back into the heap (ids are no longer in it once popped)."""
+        try:
+            self._done(forum, ids, now)
+        except Exception as e:
+            self.stats["db_failures"] += 1
+            for bid in ids:
+                self._removed.add((forum, bid))
+                self._push(forum, bid, now + self.retry_s)
+            self.log(f"UNBAN db update failed forum={forum} ids={len(ids)} (retry in {self.retry_s}s): {e}")
+
+    async def tick(self):
+        now = int(time.time())
+        for forum, ids in self._pop_due(now).items():
+            await self._tick_forum(forum, ids, now)
+
+    async def _tick_forum(self, forum: str, ids: list[str], now: int):
+        # already removed at Disqus, only the DB update is left
+        removed = [bid for bid in ids if (forum, bid) in self._removed]
+        ids = [bid for bid in ids if (forum, bid) not in self._removed]
+        if ids:
+            removed += await self._remove_ids(forum, ids, now)
+        if removed:
+            self._record(forum, removed, now)
+
+    async def _remove_ids(self, forum: str, ids: list[str], now: int) -> list[str]:
+        """Returns the ids removed at Disqus; the others are pushed back by retry_s."""
+        self.stats["batches"] += 1
+        try:
+            await self._remove(forum, ids)
+        except Exception as e:
+            self.stats["batch_failures"] += 1
+            self.log(f"UNBAN batch of {len(ids)} failed forum={forum}, retrying one by one: {e}")
+        else:
+            self.log(f"UNBANNED forum={forum} blacklist_ids={','.join(ids)}")
+            return ids
+
+        removed = []
+        for bid in ids:
+            try:
+                await self._remove(forum, [bid])
+            except Exception as e:
+                self.stats["item_failures"] += 1
+                self._push(forum, bid, now + self.retry_s)
+                self.log(f"UNBAN failed forum={forum} blacklist_id={bid} (retry in {self.retry_s}s): {e}")
+            else:
+                removed.append(bid)
+                self.log(f"UNBANNED forum={forum} blacklist_id={bid}")
+        return removed
+
+    async def run(self):
+        while True:
+            due = self.next_due()
+            timeout = None if due is None else max(0.0, due - time.time())
+            self._wake.clear()
+            if timeout is None or timeout > 0:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+                    continue  # earlier entry scheduled: recompute
+                except asyncio.TimeoutError:
+                    pass
+            try:
+                await self.tick()
+            except Exception as e:
+                self.log(f"UNBAN tick failed: {e}")
+                await asyncio.sleep(self.retry_s)
+
+    def format_stats(self) -> str:
+        st = self.stats
+        return (
+            f"pending={len(self._due)} next_due={self.next_due()} scheduled={st['scheduled']} removed={st['removed']} "
+            f"batches={st['batches']} batch_fail={st['batch_failures']} item_fail={st['item_failures']} db_fail={st['db_failures']}"
+        )
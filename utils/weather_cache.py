@@ -0,0 +1,139 @@
+import os
+import threading
+import time
+
+from utils.cache_db import cache_db
+
+# Current weather per rounded coordinate (open-meteo updates every 15 min)
+WEATHER_TTL_SECONDS = int(os.environ.get("WEATHER_TTL_SECONDS", "600"))
+# Rounding for the weather key: 2 decimals ~ 1 km
+WEATHER_COORD_DECIMALS = 2
+
+
+def normalize_city(city: str) -> str:
+    return " ".join((city or "").split()).strip(" .,!?;:").casefold()
+
+
+class GeoCache:
+    """
+    city (normalized) -> (lat, lon, name, country), or None for unknown places.
+    Stored permanently in the cache DB, mirrored in a dict for hot lookups.
+    """
+
+    def __init__(self):
+        self._mem = {}
+        self._loaded = False
+        self._mem_lock = threading.Lock()
+
+    def _load(self):
+        con, lock = cache_db()
+        with lock:
+            con.execute(
+                """
+                CREATE TABLE IF NOT EXISTS geocode (
+                    city_key TEXT PRIMARY KEY,
+                    lat REAL,
+                    lon REAL,
+                    name TEXT,
+                    country TEXT,
+                    created_unix INTEGER NOT NULL
+                )
+                """
+            )
+            con.commit()
+            rows = con.execute("SELECT city_key, lat, lon, name, country FROM geocode").fetchall()
+        for key, lat, lon, name, country in rows:
+            self._mem[key] = None if lat is None else (lat, lon, name, country)
+        self._loaded = True
+
+    def get(self, key: str):
+        """Returns (found, value); value is None for a cached negative result."""
+        with self._mem_lock:
+            if not self._loaded:
+                self._load()
+            if key in self._mem:
+                return True, self._mem[key]
+        return False, None
+
+    def put(self, key: str, value):
+        lat, lon, name, country = value if value else (None, None, None, None)
+        con, lock = cache_db()
+        with lock:
+            con.execute(
+                "INSERT OR REPLACE INTO geocode(city_key, lat, lon, name, country, created_unix) VALUES(?, ?, ?, ?, ?, ?)",
+                (key, lat, lon, name, country, int(time.time())),
+            )
+            con.commit()
+        with self._mem_lock:
+            self._mem[key] = value
+
+    def __len__(self) -> int:
+        return len(self._mem)
+
+
+class WeatherCache:
+    """Current weather per rounded (lat, lon), kept in memory for WEATHER_TTL_SECONDS."""
+
+    def __init__(self, ttl_s: int = WEATHER_TTL_SECONDS):
+        self.ttl_s = ttl_s
+        self._mem = {}  # (lat, lon) -> (expires_at, temp, wind)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(lat: float, lon: float) -> tuple:
+        return round(float(lat), WEATHER_COORD_DECIMALS), round(float(lon), WEATHER_COORD_DECIMALS)
+
+    def get(self, key: tuple):
+        with self._lock:
+            hit = self._mem.get(key)
+            if hit is None:
+                return None
+            if hit[0] <= time.monotonic():
+                del self._mem[key]
+                return None
+            return hit[1], hit[2]
+
+    def put(self, key: tuple, temp, wind):
+        with self._lock:
+            self._mem[key] = (time.monotonic() + self.ttl_s, temp, wind)
+
+    def __len__(self) -> int:
+        return len(self._mem)
+
+
+class _TierStats:
+    """Hit/miss counters; saved time = hits * average miss latency."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.miss_ms = 0.0
+        self._lock = threading.Lock()
+
+    def hit(self):
+        with self._lock:
+            self.hits += 1
+
+    def miss(self, ms: float):
+        with self._lock:
+            self.misses += 1
+            self.miss_ms += ms
+
+    def format(self, name: str) -> str:
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0.0
+        avg = self.miss_ms / self.misses if self.misses else 0.0
+        return f"{name} hits={self.hits} misses={self.misses} hit_rate={rate:.0f}% saved~{self.hits * avg / 1000:.1f}s"
+
+
+GEO = GeoCache()
+WEATHER = WeatherCache()
+GEO_STATS = _TierStats()
+WEATHER_STATS = _TierStats()
+
+
+def format_stats() -> str:
+    return (
+        f"{GEO_STATS.format('geocode')} (cached={len(GEO)}) | "
+        f"{WEATHER_STATS.format('current')} (cached={len(WEATHER)})"
+    )